@@ -0,0 +1,88 @@
+"""Load test: hundreds of concurrent persona requests on one event loop.
+
+Every request scrapes a user from the asyncio mock Reddit server and
+generates a persona with the stub LLM (through the rate-limited
+ScheduledModel), all in this process. The blocking pipeline would need
+one thread per in-flight request; here the thread count stays at the
+size of the default executor however many requests are in flight. A
+second round checks that a per-stage timeout cancels slow LLM calls.
+
+Run from the repository root:
+    python -m benchmarks.bench_async_pipeline
+"""
+import asyncio
+import statistics
+import threading
+import time
+
+from benchmarks.mock_reddit import AsyncMockReddit, AsyncMockRedditServer, make_history
+from benchmarks.stub_llm import StubModel
+from src.async_pipeline import generate_persona_for_user_async
+from src.rate_limiter import RateLimitScheduler, ScheduledModel
+
+USERS = 300
+ITEMS_PER_LISTING = 150
+PAGE_LATENCY = 0.05
+LLM_OVERHEAD = 1.0
+TIMEOUT_USERS = 20
+
+
+async def _sample_threads(peak, stop):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.01)
+
+
+async def _timed(reddit, username, model, **kwargs):
+    start = time.perf_counter()
+    await generate_persona_for_user_async(reddit, username, None, model=model, **kwargs)
+    return time.perf_counter() - start
+
+
+async def run():
+    usernames = [f'load_user_{i}' for i in range(USERS)]
+    histories = {username: make_history(username, ITEMS_PER_LISTING) for username in usernames}
+    scheduler = RateLimitScheduler(reddit_rpm=10 ** 6, gemini_rpm=10 ** 6, gemini_tpm=10 ** 9)
+    stub = StubModel(overhead=LLM_OVERHEAD)
+    model = ScheduledModel(stub, scheduler, 'bench-key')
+
+    async with AsyncMockRedditServer(histories, latency=PAGE_LATENCY) as server:
+        reddit = AsyncMockReddit(server.base_url)
+        peak = [threading.active_count()]
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_threads(peak, stop))
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(_timed(reddit, username, model) for username in usernames))
+        elapsed = time.perf_counter() - start
+
+        timeout_start = time.perf_counter()
+        timeout_results = await asyncio.gather(
+            *(_timed(reddit, username, StubModel(overhead=5.0), llm_timeout=0.2) for username in usernames[:TIMEOUT_USERS]),
+            return_exceptions=True
+        )
+        timeout_elapsed = time.perf_counter() - timeout_start
+        stop.set()
+        await sampler
+
+    latencies.sort()
+    print(f"{USERS} concurrent requests, {ITEMS_PER_LISTING} items per listing, "
+          f"{PAGE_LATENCY * 1000:.0f} ms per page, {LLM_OVERHEAD:.1f}s per LLM call")
+    print(f"Wall time:  {elapsed:.2f}s ({USERS / elapsed:.0f} personas/s)")
+    print(f"Latency:    median {statistics.median(latencies):.2f}s, p95 {latencies[int(USERS * 0.95) - 1]:.2f}s")
+    print(f"Reddit pages served: {server.request_count}, LLM calls: {stub.calls}")
+    print(f"Peak threads: {peak[0]} (a thread per request would need {USERS})")
+    timed_out = sum(isinstance(result, TimeoutError) for result in timeout_results)
+    print(f"Timeout round: {timed_out}/{TIMEOUT_USERS} requests cancelled after the 0.2s LLM timeout "
+          f"in {timeout_elapsed:.2f}s")
+    assert stub.calls == USERS
+    assert timed_out == TIMEOUT_USERS
+    assert peak[0] < USERS // 4, "thread count grew with the number of requests"
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+"""Compares single-shot and chunked (map-reduce) persona generation with a stub LLM.
+
+Run from the repository root:
+    python -m benchmarks.bench_chunked_generation
+"""
+import time
+
+from benchmarks.mock_reddit import make_history
+from benchmarks.stub_llm import StubModel
+from src.enhanced_persona_generator import generate_enhanced_persona
+
+ITEMS_PER_LISTING = 2000
+
+
+def _run(scraped_data, **kwargs):
+    model = StubModel()
+    start = time.perf_counter()
+    generate_enhanced_persona(scraped_data, 'bench_user', None, model=model, **kwargs)
+    return time.perf_counter() - start, model
+
+
+def main():
+    history = make_history('bench_user', ITEMS_PER_LISTING)
+    scraped_data = {'comments': history['comments'], 'posts': history['submitted']}
+
+    single_time, single_model = _run(scraped_data, token_budget=10 ** 7)
+    chunked_time, chunked_model = _run(scraped_data, chunked=True, chunk_tokens=8000, max_concurrency=4)
+
+    print(f"Items: {2 * ITEMS_PER_LISTING}")
+    print(f"Single-shot: {single_time:.2f}s, {single_model.calls} call(s), {single_model.prompt_tokens} prompt tokens")
+    print(f"Chunked:     {chunked_time:.2f}s, {chunked_model.calls} call(s), {chunked_model.prompt_tokens} prompt tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Build time and per-statement retrieval latency of the BM25 citation index.
+
+Uses a 5,000-item synthetic history with a Zipf-distributed vocabulary so
+that common terms have long postings lists, as in real Reddit text.
+
+Run from the repository root:
+    python -m benchmarks.bench_citation_index
+"""
+import random
+import statistics
+import time
+
+from src.citation_index import CitationIndex
+
+ITEMS = 5000
+VOCABULARY = 5000
+STATEMENTS = [
+    "Frequently discusses mechanical keyboards and custom switches",
+    "Wants to improve their home espresso brewing",
+    "Frustrated by slow customer support from airlines",
+    "Plays strategy games on weekends with friends",
+    "Regularly shares budgeting tips and personal finance advice",
+]
+
+
+def synthetic_history(seed=7):
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(VOCABULARY)]
+    # Place the statements' words in the mid-frequency range (the very top ranks
+    # of real text are stopwords, which the index drops) so queries have matches
+    statement_words = " ".join(STATEMENTS).lower().split()
+    words[50:50 + len(statement_words)] = statement_words
+    weights = [1 / (rank + 1) for rank in range(VOCABULARY)]
+
+    def text(length):
+        return " ".join(rng.choices(words, weights, k=length))
+
+    comments = [
+        {'id': f'c{i}', 'body': text(rng.randint(10, 80)), 'score': rng.randint(0, 500),
+         'created_utc': 1700000000 - i * 600, 'permalink': f'/r/sub{i % 30}/comments/x{i}/_/c{i}/'}
+        for i in range(ITEMS * 4 // 5)
+    ]
+    posts = [
+        {'id': f'p{i}', 'title': text(8), 'selftext': text(rng.randint(0, 120)), 'score': rng.randint(0, 2000),
+         'created_utc': 1700000000 - i * 3000, 'permalink': f'/r/sub{i % 30}/comments/p{i}/_/',
+         'url': f'https://www.reddit.com/r/sub{i % 30}/comments/p{i}/_/'}
+        for i in range(ITEMS // 5)
+    ]
+    return {'comments': comments, 'posts': posts}
+
+
+def main():
+    scraped_data = synthetic_history()
+    start = time.perf_counter()
+    index = CitationIndex(scraped_data)
+    build_time = time.perf_counter() - start
+
+    latencies = []
+    for _ in range(20):
+        for statement in STATEMENTS:
+            start = time.perf_counter()
+            index.search(statement, k=3)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"Index build over {ITEMS} items: {build_time * 1000:.1f} ms")
+    print(f"Search per statement: median {statistics.median(latencies) * 1000:.2f} ms, p95 {p95 * 1000:.2f} ms")
+    assert p95 < 0.010, "retrieval exceeded the 10 ms per statement target"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Per-request latency with pooled (warm) versus freshly built (cold) clients from src.clients.
+
+Reddit: clients.get_reddit's PRAW instance scrapes one listing page of
+each kind from the mock Reddit server. A cold run follows
+clients.invalidate_all(), so the new instance opens new connections and
+fetches an OAuth token before its first page; a warm run reuses both.
+
+Gemini: clients.get_gemini_model's model sends one generate_content call
+to a local gRPC stub of the GenerativeService. A cold model opens a new
+channel (TCP and HTTP/2 setup) on its first call, a warm one reuses it.
+The stub runs in plaintext, so the TLS handshake a cold client pays
+against Google is not included and the real gap is larger.
+
+Both servers wait LATENCY seconds per response. Requests go through the
+real clients (PRAW with the scraper's rate-limited requestor, the
+google-generativeai model with its own client), only pointed at the
+local servers.
+
+Run from the repository root:
+    python -m benchmarks.bench_client_reuse
+"""
+import functools
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import grpc
+from google.ai import generativelanguage as glm
+from google.ai.generativelanguage_v1beta.services.generative_service.transports.grpc import GenerativeServiceGrpcTransport
+
+from benchmarks.mock_reddit import MockRedditServer, make_history
+from benchmarks.stub_llm import CANNED_PERSONA
+from src import clients
+from src.rate_limiter import configure_default_scheduler
+from src.reddit_scraper import initialize_reddit, scrape_redditor_data
+
+USERNAME = 'bench_user'
+CREDENTIALS = ('bench-id', 'bench-secret', 'PersonaGenerator/bench')
+GOOGLE_API_KEY = 'bench-key'
+RUNS = 20
+LATENCY = 0.02
+GENERATE_CONTENT = '/google.ai.generativelanguage.v1beta.GenerativeService/GenerateContent'
+
+
+class _StubGenerativeService(grpc.GenericRpcHandler):
+    """Answers GenerateContent with the canned persona after LATENCY seconds."""
+
+    def __init__(self):
+        response = glm.GenerateContentResponse(candidates=[{
+            'content': {'role': 'model', 'parts': [{'text': json.dumps(CANNED_PERSONA)}]},
+            'finish_reason': 'STOP'
+        }])
+        self.response = glm.GenerateContentResponse.serialize(response)
+
+    def service(self, handler_call_details):
+        if handler_call_details.method != GENERATE_CONTENT:
+            return None
+        return grpc.unary_unary_rpc_method_handler(self._generate)
+
+    def _generate(self, request, context):
+        time.sleep(LATENCY)
+        return self.response
+
+
+def _stub_glm(address):
+    """Stands in for src.clients' glm module, building real clients whose channels go to the stub."""
+    def transport(**kwargs):
+        kwargs['channel'] = lambda host, **_: grpc.insecure_channel(address)
+        return GenerativeServiceGrpcTransport(**kwargs)
+
+    return SimpleNamespace(
+        GenerativeServiceClient=lambda client_options: glm.GenerativeServiceClient(
+            client_options=client_options, transport=transport),
+        GenerativeServiceAsyncClient=glm.GenerativeServiceAsyncClient
+    )
+
+
+def _scrape():
+    reddit = clients.get_reddit(*CREDENTIALS)
+    return scrape_redditor_data(reddit, USERNAME, limit=100)
+
+
+def _generate():
+    clients.get_gemini_model(GOOGLE_API_KEY).generate_content("Describe bench_user.")
+
+
+def _latency(request, cold):
+    samples = []
+    request()
+    for _ in range(RUNS):
+        if cold:
+            clients.invalidate_all()
+        start = time.perf_counter()
+        request()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    configure_default_scheduler(reddit_rpm=10 ** 7, gemini_rpm=10 ** 7, gemini_tpm=10 ** 12)
+    server = grpc.server(ThreadPoolExecutor(max_workers=4))
+    server.add_generic_rpc_handlers((_StubGenerativeService(),))
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    real_initialize, real_glm = clients.initialize_reddit, clients.glm
+    try:
+        with MockRedditServer({USERNAME: make_history(USERNAME, 100)}, latency=LATENCY) as reddit_server:
+            clients.initialize_reddit = functools.partial(
+                initialize_reddit, oauth_url=reddit_server.base_url, reddit_url=reddit_server.base_url,
+                check_for_updates=False, check_for_async=False)
+            clients.glm = _stub_glm(f'127.0.0.1:{port}')
+            rows = [
+                ('Reddit scrape (2 pages)', _latency(_scrape, cold=True), _latency(_scrape, cold=False)),
+                ('Gemini generate_content', _latency(_generate, cold=True), _latency(_generate, cold=False))
+            ]
+    finally:
+        clients.initialize_reddit, clients.glm = real_initialize, real_glm
+        clients.invalidate_all()
+        server.stop(None)
+
+    print(f"Median latency per request over {RUNS} runs, {LATENCY * 1000:.0f} ms server latency:")
+    print(f"  {'request':<26}{'cold':>10}{'warm':>10}{'saved':>10}")
+    for name, cold, warm in rows:
+        print(f"  {name:<26}{cold:>8.1f}ms{warm:>8.1f}ms{cold - warm:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
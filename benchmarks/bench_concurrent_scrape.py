@@ -0,0 +1,38 @@
+"""Compares sequential and concurrent scraping against the mock listing server.
+
+Run from the repository root:
+    python -m benchmarks.bench_concurrent_scrape
+"""
+import time
+
+from benchmarks.mock_reddit import MockReddit, MockRedditServer, make_history
+from src.reddit_scraper import scrape_redditor_data
+
+USERNAME = 'bench_user'
+LIMIT = 500
+LATENCY = 0.05
+
+
+def _time_scrape(reddit, concurrent):
+    start = time.perf_counter()
+    data = scrape_redditor_data(reddit, USERNAME, limit=LIMIT, concurrent=concurrent)
+    elapsed = time.perf_counter() - start
+    return elapsed, data
+
+
+def main():
+    histories = {USERNAME: make_history(USERNAME, LIMIT)}
+    with MockRedditServer(histories, latency=LATENCY) as server:
+        reddit = MockReddit(server.base_url)
+        sequential_time, sequential_data = _time_scrape(reddit, concurrent=False)
+        concurrent_time, concurrent_data = _time_scrape(reddit, concurrent=True)
+
+    assert sequential_data == concurrent_data, "concurrent scrape returned different data"
+    print(f"Items per listing: {LIMIT}, page latency: {LATENCY * 1000:.0f} ms")
+    print(f"Sequential: {sequential_time:.3f}s")
+    print(f"Concurrent: {concurrent_time:.3f}s")
+    print(f"Speedup:    {sequential_time / concurrent_time:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
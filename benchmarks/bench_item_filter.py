@@ -0,0 +1,104 @@
+"""Spam and near-duplicate filtering (src.item_filter) on spammy synthetic histories.
+
+A synthetic history is made spammy: a share of the comments become
+reposts of earlier comments, some verbatim with other casing,
+punctuation or link, some with a word changed; others get a bot footer,
+are [deleted]/[removed] or carry nothing but a link. filter_items is
+timed from 1k to 100k items to show the cost per item stays flat, with
+the items and prompt tokens it removes. Then a 300-item history, which
+fits the default token budget whole, goes through
+generate_enhanced_persona with and without the filter against the stub
+LLM, whose latency grows with the prompt.
+
+Run from the repository root:
+    python -m benchmarks.bench_item_filter
+"""
+import random
+import time
+
+from benchmarks.stub_llm import StubModel
+from benchmarks.synthetic import scraped_data_from_history, synthetic_history
+from src.enhanced_persona_generator import generate_enhanced_persona
+from src.item_filter import filter_items
+
+USERNAME = 'bench_user'
+SIZES = (1_000, 10_000, 100_000)
+GENERATION_ITEMS = 300
+REPOST_RATE = 0.15
+EDITED_REPOST_RATE = 0.1
+FOOTER_RATE = 0.1
+DELETED_RATE = 0.05
+LINK_ONLY_RATE = 0.05
+FOOTER = "\n\n^(I am a bot, and this action was performed automatically. Contact the moderators with questions.)"
+
+
+def _edited(rng, body):
+    words = body.split(' ')
+    if len(words) < 20:
+        return body.upper()
+    words[rng.randrange(len(words))] = 'spam'
+    return ' '.join(words)
+
+
+def spammy_history(items, seed=0):
+    """synthetic_history with reposts, bot footers, deleted and link-only comments mixed in; returns (history, injected)."""
+    history = synthetic_history(USERNAME, items, seed=seed)
+    rng = random.Random(seed)
+    injected = {'reposts': 0, 'edited_reposts': 0, 'deleted': 0, 'link_only': 0}
+    comments = history['comments']
+    for i, comment in enumerate(comments):
+        roll = rng.random()
+        if roll < REPOST_RATE and i:
+            original = comments[rng.randrange(i)]['body']
+            comment['body'] = original.replace('.', '!').lower() + f" https://spam.example/{rng.randrange(10 ** 6)}"
+            injected['reposts'] += 1
+        elif roll < REPOST_RATE + EDITED_REPOST_RATE and i:
+            comment['body'] = _edited(rng, comments[rng.randrange(i)]['body'])
+            injected['edited_reposts'] += 1
+        elif roll < REPOST_RATE + EDITED_REPOST_RATE + DELETED_RATE:
+            comment['body'] = rng.choice(('[deleted]', '[removed]'))
+            injected['deleted'] += 1
+        elif roll < REPOST_RATE + EDITED_REPOST_RATE + DELETED_RATE + LINK_ONLY_RATE:
+            comment['body'] = f"https://spam.example/{rng.randrange(10 ** 6)}"
+            injected['link_only'] += 1
+        elif roll < REPOST_RATE + EDITED_REPOST_RATE + DELETED_RATE + LINK_ONLY_RATE + FOOTER_RATE:
+            comment['body'] += FOOTER
+    return history, injected
+
+
+def _timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    print(f"{'items':>8}{'time':>9}{'us/item':>9}{'kept':>8}{'dup':>7}{'near':>7}{'deleted':>9}{'link':>6}"
+          f"{'tokens before':>15}{'removed':>10}")
+    for size in SIZES:
+        history, injected = spammy_history(size)
+        scraped_data = scraped_data_from_history(history)
+        (_, stats), elapsed = _timed(lambda: filter_items(scraped_data), repeat=3 if size < 100_000 else 1)
+        removed = stats['removed']
+        print(f"{size:>8}{elapsed:>8.2f}s{elapsed / size * 1e6:>9.0f}{stats['kept']:>8}{removed.get('duplicate', 0):>7}"
+              f"{removed.get('near_duplicate', 0):>7}{removed.get('deleted', 0):>9}{removed.get('link_only', 0):>6}"
+              f"{stats['tokens_before']:>15}{stats['tokens_removed'] / stats['tokens_before']:>10.0%}")
+    print(f"Injected into the 100k history: {injected}")
+
+    scraped_data = scraped_data_from_history(spammy_history(GENERATION_ITEMS)[0])
+    print(f"\ngenerate_enhanced_persona on {GENERATION_ITEMS} spammy items:")
+    rows = []
+    for label, dedupe in (('unfiltered', False), ('filtered', True)):
+        model = StubModel(overhead=0.3, seconds_per_1k_tokens=0.05)
+        start = time.perf_counter()
+        generate_enhanced_persona(scraped_data, USERNAME, None, model=model, dedupe=dedupe)
+        rows.append((label, time.perf_counter() - start, model.prompt_tokens))
+        print(f"  {label:<12}{rows[-1][1]:>7.2f}s{model.prompt_tokens:>8} prompt tokens")
+    print(f"Filtering sends {1 - rows[1][2] / rows[0][2]:.0%} fewer prompt tokens")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""CPU time per 1,000 scraped items: direct JSON listing client versus PRAW.
+
+Both clients page the same synthetic history from the local mock server
+(no added latency) through scrape_redditor_data. CPU time is measured
+with time.thread_time on the scraping thread, so the mock server's own
+work in its threads is not counted. The direct client is timed with
+orjson and with the standard json module. The PRAW path needs praw
+installed; MockReddit, which builds one namespace object per item the way
+PRAW builds model objects but without PRAW's other work, is timed either
+way as a lower bound for any object-per-item client.
+
+Run from the repository root:
+    python -m benchmarks.bench_listing_client
+"""
+import json
+import time
+
+from benchmarks.mock_reddit import MockReddit, MockRedditServer
+from benchmarks.synthetic import synthetic_history
+from src import reddit_listings
+from src.rate_limiter import RateLimitScheduler
+from src.reddit_listings import ListingClient
+from src.reddit_scraper import scrape_redditor_data
+
+USERNAME = 'bench_user'
+ITEMS = 4000
+RUNS = 3
+
+
+def _cpu_per_1k(reddit):
+    best = float('inf')
+    data = None
+    for _ in range(RUNS):
+        start = time.thread_time()
+        data = scrape_redditor_data(reddit, USERNAME, limit=None)
+        best = min(best, time.thread_time() - start)
+    items = len(data['comments']) + len(data['posts'])
+    # Seconds per item times 1,000 items, in milliseconds
+    return best / items * 1000 * 1000, data
+
+
+def _praw_client(base_url):
+    import praw
+    reddit = praw.Reddit(client_id='bench', client_secret='bench', user_agent='bench', oauth_url=base_url,
+                         reddit_url=base_url, check_for_updates=False, check_for_async=False)
+    reddit.redditor(USERNAME).comments
+    return reddit
+
+
+def main():
+    histories = {USERNAME: synthetic_history(USERNAME, ITEMS)}
+    scheduler = RateLimitScheduler(reddit_rpm=10 ** 7)
+    results = {}
+    with MockRedditServer(histories, latency=0) as server:
+        client = ListingClient('bench', 'bench', 'bench', scheduler=scheduler, oauth_url=server.base_url,
+                               token_url=server.base_url + '/api/v1/access_token')
+        results['direct (orjson)' if reddit_listings._loads is not json.loads else 'direct (json)'] = _cpu_per_1k(client)
+        if reddit_listings._loads is not json.loads:
+            fast_loads = reddit_listings._loads
+            reddit_listings._loads = json.loads
+            try:
+                results['direct (json)'] = _cpu_per_1k(client)
+            finally:
+                reddit_listings._loads = fast_loads
+        results['namespace objects'] = _cpu_per_1k(MockReddit(server.base_url))
+        try:
+            reddit = _praw_client(server.base_url)
+        except ImportError:
+            print("PRAW path skipped: praw is not installed")
+        else:
+            results['PRAW'] = _cpu_per_1k(reddit)
+
+    reference = results['namespace objects'][1]
+    print(f"{ITEMS} items, CPU time per 1,000 items on the scraping thread (best of {RUNS}):")
+    for name, (cpu_ms, data) in results.items():
+        print(f"  {name:<18} {cpu_ms:6.1f} ms")
+        assert data == reference, f"{name} returned different items"
+    if 'PRAW' in results:
+        print(f"Direct client uses {results['PRAW'][0] / min(r[0] for n, r in results.items() if n.startswith('direct')):.1f}x "
+              f"less CPU than PRAW")
+
+
+if __name__ == '__main__':
+    main()
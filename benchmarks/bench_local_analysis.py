@@ -0,0 +1,31 @@
+"""Times the local pre-analysis stage on 1,000 items.
+
+Run from the repository root:
+    python -m benchmarks.bench_local_analysis
+"""
+import time
+
+from benchmarks.mock_reddit import make_history
+from src.local_analysis import analyze_history, get_sentiment_lexicon
+
+RUNS = 20
+
+
+def main():
+    history = make_history('bench_user', 500)
+    for comment in history['comments']:
+        comment['body'] += " I really love this, though the last update was terrible and not helpful at all."
+    scraped_data = {'comments': history['comments'], 'posts': history['submitted']}
+
+    # Loading the lexicon is a one-time cost per process
+    get_sentiment_lexicon()
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        features = analyze_history(scraped_data)
+    elapsed = (time.perf_counter() - start) / RUNS
+    print(f"analyze_history on {features['activity']['items']} items: {elapsed * 1000:.1f} ms")
+    print(f"Topics: {features['common_topics']}, sentiment: {features['sentiment']}, tier: {features['tier']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Persona cache (src.persona_cache) on its memory, SQLite and Redis backends.
+
+Each backend caches generate_enhanced_persona results for a few users
+against the stub LLM: the first pass misses and generates, the second is
+served from the cache without an LLM call. The Redis backend runs on
+FakeRedis, an in-process stand-in with 0.2 ms per command for the network
+round trip. Before timing, every backend is checked for the behaviour
+the cache relies on: a hit returns the stored persona, entries expire
+after their TTL and the least recently used entry is evicted first.
+
+Run from the repository root:
+    python -m benchmarks.bench_persona_cache
+"""
+import os
+import tempfile
+import time
+
+from benchmarks.fake_redis import FakeRedis
+from benchmarks.stub_llm import StubModel
+from benchmarks.synthetic import scraped_data_from_history, synthetic_history
+from src.enhanced_persona_generator import generate_enhanced_persona
+from src.persona_cache import DiskBackend, MemoryBackend, PersonaCache, RedisBackend
+
+USERS = 5
+ITEMS = 300
+REDIS_LATENCY = 0.0002
+
+
+def _backends(directory, max_entries=1000):
+    return {
+        'memory': MemoryBackend(max_entries=max_entries),
+        'sqlite': DiskBackend(os.path.join(directory, f'personas-{max_entries}.sqlite3'), max_entries=max_entries),
+        'redis (fake)': RedisBackend(FakeRedis(latency=REDIS_LATENCY), max_entries=max_entries)
+    }
+
+
+def _check(name, backend):
+    """Round trip, TTL expiry and LRU eviction on a backend holding at most 2 entries."""
+    cache = PersonaCache(backend, ttl=1)
+    cache.put('a', {'name': 'a'})
+    assert cache.get('a') == {'name': 'a'}, f"{name}: stored persona not returned"
+    time.sleep(1.1)
+    assert cache.get('a') is None, f"{name}: entry outlived its TTL"
+    cache = PersonaCache(backend)
+    for key in ('a', 'b'):
+        cache.put(key, {'name': key})
+    cache.get('a')
+    cache.put('c', {'name': 'c'})
+    assert cache.get('b') is None and cache.get('a') and cache.get('c'), f"{name}: LRU entry not evicted first"
+
+
+def main():
+    histories = [scraped_data_from_history(synthetic_history(f'user{i}', ITEMS, seed=i)) for i in range(USERS)]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, backend in _backends(directory, max_entries=2).items():
+            _check(name, backend)
+        print("All backends: hits return the stored persona, TTL expiry and LRU eviction hold")
+
+        print(f"\n{USERS} users x 2 passes of generate_enhanced_persona ({ITEMS} items each):")
+        print(f"  {'backend':<14}{'miss':>10}{'hit':>10}{'LLM calls':>11}{'hit rate':>10}")
+        for name, backend in _backends(directory).items():
+            cache = PersonaCache(backend)
+            model = StubModel(overhead=0.3)
+            passes = []
+            for _ in range(2):
+                personas = []
+                start = time.perf_counter()
+                for i, scraped_data in enumerate(histories):
+                    personas.append(generate_enhanced_persona(scraped_data, f'user{i}', None, model=model, cache=cache))
+                passes.append(((time.perf_counter() - start) / USERS, personas))
+            assert passes[0][1] == passes[1][1], f"{name}: cached personas differ from the generated ones"
+            stats = cache.stats()
+            print(f"  {name:<14}{passes[0][0] * 1000:>8.1f}ms{passes[1][0] * 1000:>8.2f}ms{model.calls:>11}"
+                  f"{stats['hit_rate']:>10.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Cost of recovering from a malformed persona answer: targeted repair versus a full retry.
+
+The first answer of the stub LLM is broken in a different way per case
+(wrapped in a fence and prose, cut off mid-object, one field of the
+wrong type). The tolerant parser keeps every field that did parse and
+only the missing or invalid ones are asked for again, with a small
+prompt; the old behaviour was to fail and pay for a whole new
+generation. Also times parse_persona_text against plain json.loads.
+
+Run from the repository root:
+    python -m benchmarks.bench_persona_repair
+"""
+import json
+import timeit
+import time
+
+from benchmarks.mock_reddit import make_history
+from benchmarks.stub_llm import CANNED_PERSONA, StubModel
+from src.enhanced_persona_generator import generate_enhanced_persona
+from src.persona_schema import parse_persona_text, validate_persona
+
+VALID_TEXT = json.dumps(CANNED_PERSONA)
+CASES = {
+    'fence + prose': "```json\n" + VALID_TEXT + "\n```\nLet me know if you need anything else {:}",
+    'truncated': VALID_TEXT[:int(len(VALID_TEXT) * 0.6)],
+    'invalid field': json.dumps(dict(CANNED_PERSONA, motivations="high")),
+}
+
+
+class BrokenFirstModel(StubModel):
+    """Answers the first call with broken_text, later ones with just the fields their schema asks for."""
+
+    def __init__(self, broken_text, **kwargs):
+        super().__init__(**kwargs)
+        self.broken_text = broken_text
+
+    def generate_content(self, prompt, **kwargs):
+        if self.calls == 0:
+            self.response_text = self.broken_text
+        else:
+            fields = kwargs['generation_config']['response_schema']['properties']
+            self.response_text = json.dumps({field: CANNED_PERSONA[field] for field in fields})
+        return super().generate_content(prompt, **kwargs)
+
+
+def _run(model, scraped_data):
+    start = time.perf_counter()
+    persona = generate_enhanced_persona(scraped_data, 'bench_user', None, model=model)
+    return persona, time.perf_counter() - start
+
+
+def main():
+    history = make_history('bench_user', 200)
+    scraped_data = {'comments': history['comments'], 'posts': history['submitted']}
+    options = {'overhead': 0.3, 'seconds_per_output_chunk': 0.02}
+
+    # What the old code paid on any malformed answer: the failed call plus a full regeneration
+    full_model = StubModel(**options)
+    _, full_time = _run(full_model, scraped_data)
+    print(f"Full generation: {full_time:.2f}s, ~{full_model.prompt_tokens} prompt tokens")
+
+    for name, broken_text in CASES.items():
+        model = BrokenFirstModel(broken_text, **options)
+        persona, elapsed = _run(model, scraped_data)
+        _, problems = validate_persona(persona)
+        extra_tokens = model.prompt_tokens - full_model.prompt_tokens
+        print(f"{name:>14}: {model.calls} calls, {elapsed:.2f}s total, "
+              f"+{elapsed - full_time:.2f}s / +~{extra_tokens} prompt tokens for recovery "
+              f"(full retry: +{full_time:.2f}s / +~{full_model.prompt_tokens})")
+        assert not problems, problems
+
+    loads_time = timeit.timeit(lambda: json.loads(VALID_TEXT), number=10000) / 10000
+    parse_time = timeit.timeit(lambda: parse_persona_text(VALID_TEXT), number=10000) / 10000
+    fallback_time = timeit.timeit(lambda: parse_persona_text(CASES['truncated']), number=2000) / 2000
+    print(f"Parsing a valid answer: json.loads {loads_time * 1e6:.1f} us, parse_persona_text {parse_time * 1e6:.1f} us; "
+          f"truncated answer (field-by-field fallback) {fallback_time * 1e6:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
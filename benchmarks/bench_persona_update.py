@@ -0,0 +1,107 @@
+"""Weekly refresh of a stored persona: full regeneration versus an update from new activity only.
+
+A user with a synthetic history of LIMIT items gets a week of new
+activity. The full refresh scrapes up to LIMIT items again and resends
+them all to the stub LLM. The incremental refresh (refresh_persona with a
+stored version) pages only the listing items newer than the stored
+persona and sends those with the stored persona in one small prompt.
+The stub model's latency grows with prompt size like a real model's, so
+both prompt tokens and time are compared, together with the Reddit page
+requests. A last case adds too little activity and skips the LLM call.
+
+Run from the repository root:
+    python -m benchmarks.bench_persona_update
+"""
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.mock_reddit import MockReddit, MockRedditServer
+from benchmarks.stub_llm import CANNED_PERSONA, StubModel
+from benchmarks.synthetic import START_UTC, scraped_data_from_history, synthetic_history
+from src.enhanced_persona_generator import generate_enhanced_persona
+from src.persona_history import PersonaHistory, newest_item_utc, refresh_persona
+from src.reddit_scraper import scrape_redditor_data
+
+USERNAME = 'bench_user'
+LIMIT = 1000
+NEW_ITEMS = 60
+FEW_ITEMS = 3
+WEEK = 7 * 24 * 3600
+
+
+class DeltaAwareModel(StubModel):
+    """Answers update prompts (whose schema has no required fields) with a couple of changed fields."""
+
+    def generate_content(self, prompt, **kwargs):
+        schema = kwargs['generation_config']['response_schema']
+        if 'required' in schema:
+            self.response_text = json.dumps(CANNED_PERSONA)
+        else:
+            self.response_text = json.dumps({'frustrations': ['Slow tooling', 'Flaky CI'],
+                                              'common_topics': ['python', 'coffee', 'cycling']})
+        return super().generate_content(prompt, **kwargs)
+
+
+def _with_new_activity(history, items, seed):
+    """history plus `items` newer items, with ids that cannot clash with the old ones."""
+    new = synthetic_history(USERNAME, items, seed=seed, start_utc=START_UTC + WEEK)
+    for kind in new:
+        for item in new[kind]:
+            item['id'] = f"n{seed}{item['id']}"
+            item['name'] = f"{item['name'][:3]}{item['id']}"
+    return {kind: new[kind] + history[kind] for kind in history}
+
+
+def _stored_history(path, scraped_data):
+    """A history database holding the persona generated last week."""
+    history = PersonaHistory(path)
+    persona = generate_enhanced_persona(scraped_data, USERNAME, None, model=DeltaAwareModel(overhead=0, seconds_per_1k_tokens=0))
+    items = len(scraped_data['comments']) + len(scraped_data['posts'])
+    history.add(USERNAME, persona, newest_item_utc(scraped_data), 'full', items)
+    return history
+
+
+def _run(histories, refresh):
+    model = DeltaAwareModel(overhead=0.3, seconds_per_1k_tokens=0.05)
+    with MockRedditServer(histories, latency=0.02) as server:
+        start = time.perf_counter()
+        result = refresh(MockReddit(server.base_url), model)
+        elapsed = time.perf_counter() - start
+        requests = server.request_count
+    return result, elapsed, model, requests
+
+
+def main():
+    old = synthetic_history(USERNAME, LIMIT)
+    old_data = scraped_data_from_history(old)
+    with tempfile.TemporaryDirectory() as directory:
+        rows = []
+        for label, items in (('full regeneration', NEW_ITEMS), ('update', NEW_ITEMS), ('update, too little new', FEW_ITEMS)):
+            histories = {USERNAME: _with_new_activity(old, items, seed=items)}
+            if label == 'full regeneration':
+                def refresh(reddit, model):
+                    data = scrape_redditor_data(reddit, USERNAME, limit=LIMIT)
+                    return generate_enhanced_persona(data, USERNAME, None, model=model)
+            else:
+                history = _stored_history(os.path.join(directory, f'{items}.sqlite3'), old_data)
+
+                def refresh(reddit, model, history=history):
+                    return refresh_persona(reddit, USERNAME, None, history=history, limit=LIMIT, model=model)
+            result, elapsed, model, requests = _run(histories, refresh)
+            rows.append((label, elapsed, model, requests))
+            if label.startswith('update'):
+                print(f"{label}: version {result['version']} ({result['mode']}), changed: {', '.join(result['changed']) or '-'}")
+
+    print(f"{NEW_ITEMS} new items on top of {LIMIT}:")
+    print(f"  {'refresh':<24}{'time':>8}{'LLM calls':>11}{'prompt tokens':>15}{'page requests':>15}")
+    for label, elapsed, model, requests in rows:
+        print(f"  {label:<24}{elapsed:>7.2f}s{model.calls:>11}{model.prompt_tokens:>15}{requests:>15}")
+    full, update = rows[0], rows[1]
+    print(f"Update sends {full[2].prompt_tokens / max(1, update[2].prompt_tokens):.1f}x fewer prompt tokens "
+          f"and is {full[1] / update[1]:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Memory of 100k scraped items as plain dicts versus slotted Comment/Post records.
+
+Both representations hold the same freshly built field values, so the
+difference is the per-item container overhead. Also times
+analyze_history and a score column read on each representation.
+
+Run from the repository root:
+    python -m benchmarks.bench_record_memory
+"""
+import gc
+import time
+import tracemalloc
+
+from src.local_analysis import analyze_history, get_sentiment_lexicon
+from src.records import Comment, Post, column
+
+ITEMS = 100_000
+
+
+def _comment_fields(i):
+    return (f'c{i}', f'Comment {i} about python, coffee and the weekend.', i % 50, 1700000000.0 - i * 600,
+            f'/r/sub{i % 7}/comments/x{i}/_/c{i}/')
+
+
+def _post_fields(i):
+    return (f'p{i}', f'Post {i} title', f'Body of post {i}.', i % 80, 1700000000.0 - i * 600,
+            f'/r/sub{i % 5}/comments/p{i}/_/', f'https://www.reddit.com/r/sub{i % 5}/comments/p{i}/_/')
+
+
+def as_dicts(count):
+    comments = [dict(zip(Comment.__slots__, _comment_fields(i))) for i in range(count // 2)]
+    posts = [dict(zip(Post.__slots__, _post_fields(i))) for i in range(count // 2)]
+    return {'comments': comments, 'posts': posts}
+
+
+def as_records(count):
+    comments = [Comment(*_comment_fields(i)) for i in range(count // 2)]
+    posts = [Post(*_post_fields(i)) for i in range(count // 2)]
+    return {'comments': comments, 'posts': posts}
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    data = build(ITEMS)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return data, size
+
+
+def _timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    get_sentiment_lexicon()
+    dict_data, dict_size = _measure(as_dicts)
+    record_data, record_size = _measure(as_records)
+    print(f"{ITEMS} items: dicts {dict_size / 2**20:.1f} MiB, records {record_size / 2**20:.1f} MiB "
+          f"({(dict_size - record_size) / ITEMS:.0f} bytes saved per item, {1 - record_size / dict_size:.0%} less)")
+
+    for name, data in (('dicts', dict_data), ('records', record_data)):
+        items = data['comments'] + data['posts']
+        column_time = _timed(lambda: column(items, 'score'))
+        keyed_time = _timed(lambda: [item['score'] for item in items])
+        analysis_time = _timed(lambda: analyze_history(data), repeat=1)
+        print(f"{name:>8}: score column {column_time * 1000:.1f} ms (item['score'] loop {keyed_time * 1000:.1f} ms), "
+              f"analyze_history {analysis_time:.2f}s")
+
+    assert analyze_history(dict_data) == analyze_history(record_data)
+    assert record_size < dict_size * 0.8
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Peak RSS of list-based versus streaming scraping as history size grows.
+
+Each measurement runs in a fresh subprocess so ru_maxrss reflects only that
+run. "lists" scrapes the full history with scrape_redditor_data and then
+builds the prompt; "stream" feeds iter_redditor_items into
+select_from_stream, which keeps only what fits in the prompt budget.
+
+Run from the repository root:
+    python -m benchmarks.bench_stream_memory
+"""
+import resource
+import subprocess
+import sys
+
+from benchmarks.mock_reddit import MockReddit, MockRedditServer, make_history
+
+SIZES = (1000, 5000, 20000)
+USERNAME = 'bench_user'
+
+
+def _child(mode, base_url, size):
+    from src.prompt_builder import build_prompt_content, select_from_stream
+    from src.reddit_scraper import iter_redditor_items, scrape_redditor_data
+
+    reddit = MockReddit(base_url)
+    if mode == 'lists':
+        scraped_data = scrape_redditor_data(reddit, USERNAME, limit=size, concurrent=True)
+    else:
+        scraped_data, _ = select_from_stream(iter_redditor_items(reddit, USERNAME, limit=size, concurrent=True))
+    build_prompt_content(scraped_data)
+    # ru_maxrss is in KiB on Linux
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _measure(mode, base_url, size):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_stream_memory', '--child', mode, base_url, str(size)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return int(output.split()[-1]) / 1024
+
+
+def main():
+    if sys.argv[1:2] == ['--child']:
+        _child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    histories = {USERNAME: make_history(USERNAME, max(SIZES))}
+    # Pad the bodies so each item is closer to a real comment's size
+    for comment in histories[USERNAME]['comments']:
+        comment['body'] *= 10
+    with MockRedditServer(histories, latency=0) as server:
+        print(f"{'items/listing':>14} {'lists MiB':>10} {'stream MiB':>11}")
+        for size in SIZES:
+            lists_rss = _measure('lists', server.base_url, size)
+            stream_rss = _measure('stream', server.base_url, size)
+            print(f"{size:>14} {lists_rss:>10.1f} {stream_rss:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
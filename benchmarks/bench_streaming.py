@@ -0,0 +1,37 @@
+"""Time to first persona field with streaming versus waiting for the full response.
+
+The stub LLM takes 100 ms per 40-character output chunk, roughly the pace of
+a real model writing a persona, so the gap between the two numbers shows how
+much earlier the page can start rendering.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming
+"""
+import time
+
+from benchmarks.mock_reddit import make_history
+from benchmarks.stub_llm import StubModel
+from src.enhanced_persona_generator import generate_enhanced_persona, stream_enhanced_persona
+
+
+def main():
+    history = make_history('bench_user', 200)
+    scraped_data = {'comments': history['comments'], 'posts': history['submitted']}
+
+    start = time.perf_counter()
+    generate_enhanced_persona(scraped_data, 'bench_user', None, model=StubModel(seconds_per_output_chunk=0.1))
+    blocking_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_field_time = None
+    for field, value in stream_enhanced_persona(scraped_data, 'bench_user', None, model=StubModel(seconds_per_output_chunk=0.1)):
+        if first_field_time is None:
+            first_field_time = time.perf_counter() - start
+    streaming_time = time.perf_counter() - start
+
+    print(f"Blocking:  first content after {blocking_time:.2f}s")
+    print(f"Streaming: first field after {first_field_time:.2f}s, complete after {streaming_time:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""In-process stand-in for a redis-py client, for running RedisBackend without a Redis server.
+
+FakeRedis implements the commands src.persona_cache.RedisBackend uses
+(get, set with ex, delete, zadd, zrem, zcard, zrange) with redis-py's
+return types: values and sorted-set members come back as bytes, and keys
+set with ex expire after that many seconds. Every call takes
+`latency` seconds, to stand in for a network round trip.
+"""
+import threading
+import time
+
+
+def _bytes(value):
+    return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+
+class FakeRedis:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.values = {}
+        self.sorted_sets = {}
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _call(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _live(self, key):
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self.values[key]
+            return None
+        return value
+
+    def get(self, key):
+        with self.lock:
+            self._call()
+            return self._live(key)
+
+    def set(self, key, value, ex=None):
+        with self.lock:
+            self._call()
+            self.values[key] = (_bytes(value), time.time() + ex if ex else None)
+            return True
+
+    def delete(self, *keys):
+        with self.lock:
+            self._call()
+            deleted = 0
+            for key in keys:
+                deleted += (self._live(key) is not None) + (self.sorted_sets.pop(key, None) is not None)
+                self.values.pop(key, None)
+            return deleted
+
+    def zadd(self, key, mapping):
+        with self.lock:
+            self._call()
+            members = self.sorted_sets.setdefault(key, {})
+            added = sum(_bytes(member) not in members for member in mapping)
+            members.update({_bytes(member): score for member, score in mapping.items()})
+            return added
+
+    def zrem(self, key, *members):
+        with self.lock:
+            self._call()
+            existing = self.sorted_sets.get(key, {})
+            return sum(existing.pop(_bytes(member), None) is not None for member in members)
+
+    def zcard(self, key):
+        with self.lock:
+            self._call()
+            return len(self.sorted_sets.get(key, {}))
+
+    def zrange(self, key, start, end):
+        with self.lock:
+            self._call()
+            ordered = sorted(self.sorted_sets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+            end = len(ordered) if end == -1 else end + 1
+            return [member for member, _ in ordered[start:end]]
@@ -0,0 +1,199 @@
+"""Record/replay fixtures for the Reddit listings and Gemini responses of a real run.
+
+Recording scrapes a real user once with PRAW and generates their persona
+with the real Gemini model, and saves both to a JSON file (gzipped when
+the name ends in .gz):
+
+    REDDIT_CLIENT_ID=... REDDIT_CLIENT_SECRET=... GOOGLE_API_KEY=... \\
+        python -m benchmarks.fixtures record some_user --limit 500 --out fixtures/some_user.json.gz
+
+Replaying needs no credentials or network: the history is served by
+MockRedditServer in Reddit's listing format, so scrape_redditor_data
+pages it exactly as it paged the real API, and ReplayModel answers each
+prompt with the response recorded for it. Because prompts are built
+deterministically from the items and options, a replayed run sends the
+same prompts and gets the same answers as the recorded one.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from types import SimpleNamespace
+
+from src.prompt_builder import subreddit_of
+
+FIXTURE_VERSION = 1
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def save_fixture(path, fixture):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _open(path, 'w') as f:
+        json.dump(fixture, f)
+
+
+def load_fixture(path):
+    with _open(path, 'r') as f:
+        fixture = json.load(f)
+    if fixture.get('version') != FIXTURE_VERSION:
+        raise ValueError(f"{path} is a version {fixture.get('version')} fixture, expected {FIXTURE_VERSION}")
+    return fixture
+
+
+def history_from_scraped(scraped_data):
+    """Converts scraped records back into the listing items MockRedditServer serves."""
+    comments = [dict(comment, name=f"t1_{comment['id']}", subreddit=subreddit_of(comment))
+                for comment in scraped_data['comments']]
+    posts = [dict(post, name=f"t3_{post['id']}", subreddit=subreddit_of(post)) for post in scraped_data['posts']]
+    return {'comments': comments, 'submitted': posts}
+
+
+def request_key(prompt, generation_config=None):
+    """Identifies an LLM request by its prompt and generation config; streaming does not change the answer."""
+    config = json.dumps(generation_config, sort_keys=True, default=str)
+    return hashlib.sha256(f"{config}\0{prompt}".encode('utf-8')).hexdigest()
+
+
+def _usage_dict(response):
+    usage = getattr(response, 'usage_metadata', None)
+    if usage is None:
+        return None
+    return {name: getattr(usage, name, None)
+            for name in ('prompt_token_count', 'candidates_token_count', 'total_token_count')}
+
+
+class RecordingModel:
+    """Wraps a Gemini model and keeps every response, keyed by request_key, in .responses."""
+
+    def __init__(self, model):
+        self.model = model
+        self.responses = {}
+
+    def generate_content(self, prompt, **kwargs):
+        key = request_key(prompt, kwargs.get('generation_config'))
+        start = time.perf_counter()
+        response = self.model.generate_content(prompt, **kwargs)
+        if kwargs.get('stream'):
+            return self._record_stream(key, response, start)
+        self.responses[key] = {'text': response.text, 'usage': _usage_dict(response),
+                               'seconds': round(time.perf_counter() - start, 3)}
+        return response
+
+    def _record_stream(self, key, chunks, start):
+        text = []
+        usage = None
+        for chunk in chunks:
+            text.append(chunk.text)
+            usage = _usage_dict(chunk) or usage
+            yield chunk
+        self.responses[key] = {'text': ''.join(text), 'usage': usage, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+class ReplayModel:
+    """Answers prompts with recorded responses, without network access.
+
+    latency is 'recorded' to sleep as long as the original call took, or a
+    fixed number of seconds (0 by default, for timing local work only).
+    A prompt that was never recorded raises KeyError, unless a fallback
+    response text is given.
+    """
+
+    def __init__(self, responses, latency=0.0, fallback=None, stream_chunk_chars=40):
+        self.responses = responses
+        self.latency = latency
+        self.fallback = fallback
+        self.stream_chunk_chars = stream_chunk_chars
+        self.calls = 0
+        self.misses = 0
+
+    def _lookup(self, prompt, generation_config):
+        self.calls += 1
+        recorded = self.responses.get(request_key(prompt, generation_config))
+        if recorded is None:
+            if self.fallback is None:
+                raise KeyError("No recorded response for this prompt; re-record the fixture after prompt changes")
+            self.misses += 1
+            return {'text': self.fallback, 'usage': None, 'seconds': 0.0}
+        return recorded
+
+    def _response(self, text, usage):
+        return SimpleNamespace(text=text, usage_metadata=SimpleNamespace(**usage) if usage else None)
+
+    def generate_content(self, prompt, **kwargs):
+        recorded = self._lookup(prompt, kwargs.get('generation_config'))
+        time.sleep(recorded['seconds'] if self.latency == 'recorded' else self.latency)
+        if kwargs.get('stream'):
+            return self._stream(recorded)
+        return self._response(recorded['text'], recorded['usage'])
+
+    def _stream(self, recorded):
+        text = recorded['text']
+        starts = range(0, len(text), self.stream_chunk_chars)
+        for i, start in enumerate(starts):
+            # Like Gemini, only the final chunk reports the usage of the whole call
+            yield self._response(text[start:start + self.stream_chunk_chars],
+                                 recorded['usage'] if i == len(starts) - 1 else None)
+
+
+def replay_model(fixture, **kwargs):
+    return ReplayModel(fixture['llm_responses'], **kwargs)
+
+
+def record(username, limit, options, client_id, client_secret, user_agent, google_api_key):
+    """Scrapes and generates one real persona, returning the fixture that replays it."""
+    from src.clients import get_gemini_model, get_reddit
+    from src.enhanced_persona_generator import generate_enhanced_persona
+    from src.reddit_scraper import scrape_redditor_data
+
+    scraped_data = scrape_redditor_data(get_reddit(client_id, client_secret, user_agent), username, limit=limit)
+    model = RecordingModel(get_gemini_model(google_api_key))
+    persona = generate_enhanced_persona(scraped_data, username, google_api_key, model=model, **options)
+    return {
+        'version': FIXTURE_VERSION,
+        'username': username,
+        'limit': limit,
+        'options': options,
+        'recorded_at': int(time.time()),
+        'histories': {username: history_from_scraped(scraped_data)},
+        'llm_responses': model.responses,
+        'persona': persona
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record a replayable fixture from a real user.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record')
+    record_parser.add_argument('username')
+    record_parser.add_argument('--limit', type=int, default=500)
+    record_parser.add_argument('--out', required=True)
+    record_parser.add_argument('--token-budget', type=int, default=None)
+    record_parser.add_argument('--ranking', default='score')
+    args = parser.parse_args()
+
+    credentials = [os.environ.get(name) for name in
+                   ('REDDIT_CLIENT_ID', 'REDDIT_CLIENT_SECRET', 'REDDIT_USER_AGENT', 'GOOGLE_API_KEY')]
+    credentials[2] = credentials[2] or 'PersonaGenerator/2.0'
+    if not all(credentials):
+        parser.error("REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET and GOOGLE_API_KEY must be set")
+    options = {'ranking': args.ranking}
+    if args.token_budget is not None:
+        options['token_budget'] = args.token_budget
+    fixture = record(args.username, args.limit, options, *credentials)
+    save_fixture(args.out, fixture)
+    history = fixture['histories'][args.username]
+    print(f"Recorded {len(history['comments'])} comments, {len(history['submitted'])} posts and "
+          f"{len(fixture['llm_responses'])} LLM responses to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
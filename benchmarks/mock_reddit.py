@@ -0,0 +1,276 @@
+"""Local stand-in for the Reddit user listing endpoints used by the benchmarks.
+
+The server answers /user/<name>/comments(.json) and /user/<name>/submitted(.json)
+with Reddit-shaped Listing JSON, paged with the same `after` cursor and
+`limit` parameters as the real API, and sleeps for a fixed latency before each
+page so that pagination costs are visible. MockReddit is a tiny PRAW look-alike
+that pages those endpoints so scrape_redditor_data can run against it unchanged.
+
+AsyncMockRedditServer and AsyncMockReddit are the asyncio equivalents, for
+load-testing the async pipeline without a thread per connection.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+PAGE_SIZE = 100
+
+
+def make_history(username, count, start_utc=1700000000):
+    """Builds `count` synthetic comments and posts for a user, newest first."""
+    comments = []
+    posts = []
+    for i in range(count):
+        created = start_utc - i * 3600
+        comments.append({
+            'name': f't1_c{i}', 'id': f'c{i}', 'body': f'Comment {i} from {username} about python and coffee.',
+            'score': i % 50, 'created_utc': created, 'subreddit': f'sub{i % 7}',
+            'permalink': f'/r/sub{i % 7}/comments/x{i}/_/c{i}/'
+        })
+        posts.append({
+            'name': f't3_p{i}', 'id': f'p{i}', 'title': f'Post {i} by {username}',
+            'selftext': f'Body of post {i}.', 'score': i % 80, 'created_utc': created,
+            'subreddit': f'sub{i % 5}', 'permalink': f'/r/sub{i % 5}/comments/p{i}/_/',
+            'url': f'https://www.reddit.com/r/sub{i % 5}/comments/p{i}/_/'
+        })
+    return {'comments': comments, 'submitted': posts}
+
+
+def listing_page(histories, path):
+    """Returns the Listing JSON for a /user/<name>/<listing> request path, or None for a 404."""
+    parsed = urlparse(path)
+    parts = [part for part in parsed.path.split('/') if part]
+    if len(parts) != 3 or parts[0] != 'user':
+        return None
+    username, listing = parts[1], parts[2].replace('.json', '')
+    history = histories.get(username)
+    if history is None or listing not in history:
+        return None
+
+    query = parse_qs(parsed.query)
+    limit = min(int(query.get('limit', [PAGE_SIZE])[0]), PAGE_SIZE)
+    after = query.get('after', [None])[0]
+    items = history[listing]
+    start = 0
+    if after:
+        start = next((i + 1 for i, item in enumerate(items) if item['name'] == after), len(items))
+    page = items[start:start + limit]
+    next_after = page[-1]['name'] if start + limit < len(items) and page else None
+    kind = 't1' if listing == 'comments' else 't3'
+    return {
+        'kind': 'Listing',
+        'data': {
+            'after': next_after,
+            'children': [{'kind': kind, 'data': item} for item in page]
+        }
+    }
+
+
+class _ListingHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients that reuse connections skip the TCP handshake like they would against Reddit
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; without this, delayed ACKs add ~40 ms per response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        # Stand-in for the OAuth token endpoint PRAW calls when a client is first used
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if urlparse(self.path).path != '/api/v1/access_token':
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency)
+        self._send_json({'access_token': 'mock-token', 'token_type': 'bearer', 'expires_in': 86400, 'scope': '*'})
+
+    def do_GET(self):
+        payload = listing_page(self.server.histories, self.path)
+        if payload is None:
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency)
+        self.server.request_count += 1
+        self._send_json(payload)
+
+
+class MockRedditServer:
+    """Runs the mock listing server on a background thread."""
+
+    def __init__(self, histories, latency=0.05):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _ListingHandler)
+        self.httpd.histories = histories
+        self.httpd.latency = latency
+        self.httpd.request_count = 0
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}'
+
+    @property
+    def request_count(self):
+        return self.httpd.request_count
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _MockListing:
+    def __init__(self, base_url, username, listing):
+        self.base_url = base_url
+        self.username = username
+        self.listing = listing
+
+    def new(self, limit=None):
+        fetched = 0
+        after = None
+        while limit is None or fetched < limit:
+            page_size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - fetched)
+            url = f'{self.base_url}/user/{self.username}/{self.listing}.json?limit={page_size}'
+            if after:
+                url += f'&after={after}'
+            with urllib.request.urlopen(url) as response:
+                data = json.load(response)['data']
+            for child in data['children']:
+                yield SimpleNamespace(**child['data'])
+                fetched += 1
+            after = data['after']
+            if not after or not data['children']:
+                break
+
+
+class MockReddit:
+    """Duck-typed replacement for praw.Reddit backed by MockRedditServer."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+
+    def redditor(self, username):
+        return SimpleNamespace(
+            comments=_MockListing(self.base_url, username, 'comments'),
+            submissions=_MockListing(self.base_url, username, 'submitted')
+        )
+
+
+class AsyncMockRedditServer:
+    """Serves the same listings as MockRedditServer from the running event loop."""
+
+    def __init__(self, histories, latency=0.05):
+        self.histories = histories
+        self.latency = latency
+        self.request_count = 0
+        self.server = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f'http://{host}:{port}'
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b''):
+                pass
+            path = request_line.decode('latin-1').split(' ')[1]
+            payload = listing_page(self.histories, path)
+            await asyncio.sleep(self.latency)
+            if payload is None:
+                writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+            else:
+                self.request_count += 1
+                body = json.dumps(payload).encode('utf-8')
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             + f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('ascii') + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0, backlog=1024)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class _AsyncMockListing(_MockListing):
+    def __init__(self, client, username, listing):
+        super().__init__(client.base_url, username, listing)
+        self.client = client
+
+    async def new(self, limit=None):
+        fetched = 0
+        after = None
+        while limit is None or fetched < limit:
+            page_size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - fetched)
+            path = f'/user/{self.username}/{self.listing}.json?limit={page_size}'
+            if after:
+                path += f'&after={after}'
+            data = (await self.client.get_json(path))['data']
+            for child in data['children']:
+                yield SimpleNamespace(**child['data'])
+                fetched += 1
+            after = data['after']
+            if not after or not data['children']:
+                break
+
+
+class AsyncMockReddit:
+    """Duck-typed replacement for asyncpraw.Reddit backed by AsyncMockRedditServer.
+
+    Like aiohttp's default connector, at most max_connections requests are
+    open at once; the rest wait for a free slot.
+    """
+
+    def __init__(self, base_url, max_connections=100):
+        self.base_url = base_url
+        self.host, port = urlparse(base_url).netloc.split(':')
+        self.port = int(port)
+        self.connections = asyncio.Semaphore(max_connections)
+
+    async def get_json(self, path):
+        async with self.connections:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+            try:
+                writer.write(f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: close\r\n\r\n'.encode('ascii'))
+                await writer.drain()
+                response = await reader.read()
+            finally:
+                writer.close()
+        head, _, body = response.partition(b'\r\n\r\n')
+        status = int(head.split(b' ', 2)[1])
+        if status != 200:
+            raise RuntimeError(f'mock Reddit returned HTTP {status} for {path}')
+        return json.loads(body)
+
+    async def redditor(self, username):
+        return SimpleNamespace(
+            comments=_AsyncMockListing(self, username, 'comments'),
+            submissions=_AsyncMockListing(self, username, 'submitted')
+        )
@@ -0,0 +1,95 @@
+"""Stub Gemini model for offline benchmarks.
+
+StubModel.generate_content sleeps for a fixed overhead plus a per-token
+cost, mimicking how LLM latency grows with prompt size, and answers with a
+canned persona JSON; generate_content_async waits the same time on the
+event loop. Prompt tokens are counted with the same estimate the
+prompt builder uses.
+"""
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from src.prompt_builder import estimate_tokens
+
+CANNED_PERSONA = {
+    "name": "Bench_user",
+    "age": "25-30",
+    "occupation": "Software Engineer",
+    "status": "Single",
+    "location": "North America",
+    "tier": "Power User",
+    "archetype": "The Analyst",
+    "personality": {
+        "extrovert_introvert": "introvert",
+        "thinking_feeling": "thinking",
+        "judging_perceiving": "perceiving",
+        "sensing_intuition": "intuition"
+    },
+    "motivations": {
+        "convenience": 60, "wellness": 40, "speed": 70,
+        "preferences": 55, "comfort": 50, "dietary_needs": 10
+    },
+    "behaviors_habits": ["Posts late at night", "Answers programming questions"],
+    "goals_needs": ["Improve coding skills"],
+    "frustrations": ["Slow tooling"],
+    "common_topics": ["python", "coffee"],
+    "sentiment": "Positive",
+    "quote": "Python and coffee, every day.",
+    "citations": []
+}
+
+
+class StubModel:
+    """Counts calls and tokens; thread-safe so it can back concurrent benchmarks."""
+
+    def __init__(self, overhead=0.2, seconds_per_1k_tokens=0.05, response=None, output_chunk_chars=40,
+                 seconds_per_output_chunk=0.0):
+        self.overhead = overhead
+        self.seconds_per_1k_tokens = seconds_per_1k_tokens
+        self.output_chunk_chars = output_chunk_chars
+        self.seconds_per_output_chunk = seconds_per_output_chunk
+        self.response_text = json.dumps(response or CANNED_PERSONA)
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt, **kwargs):
+        tokens = estimate_tokens(prompt)
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+        time.sleep(self.overhead + tokens / 1000 * self.seconds_per_1k_tokens)
+        chunks = [self.response_text[start:start + self.output_chunk_chars]
+                  for start in range(0, len(self.response_text), self.output_chunk_chars)]
+        if kwargs.get('stream'):
+            return self._stream(chunks, tokens)
+        # Without streaming the caller waits for the whole output to be generated
+        time.sleep(len(chunks) * self.seconds_per_output_chunk)
+        return SimpleNamespace(text=self.response_text, usage_metadata=self._usage(tokens))
+
+    async def generate_content_async(self, prompt, **kwargs):
+        """Same timing as generate_content, spent waiting on the event loop."""
+        tokens = estimate_tokens(prompt)
+        with self.lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+        chunks = [self.response_text[start:start + self.output_chunk_chars]
+                  for start in range(0, len(self.response_text), self.output_chunk_chars)]
+        await asyncio.sleep(self.overhead + tokens / 1000 * self.seconds_per_1k_tokens
+                            + len(chunks) * self.seconds_per_output_chunk)
+        return SimpleNamespace(text=self.response_text, usage_metadata=self._usage(tokens))
+
+    def _usage(self, prompt_tokens):
+        response_tokens = estimate_tokens(self.response_text)
+        return SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=response_tokens,
+                               total_token_count=prompt_tokens + response_tokens)
+
+    def _stream(self, chunks, prompt_tokens):
+        for i, chunk in enumerate(chunks):
+            time.sleep(self.seconds_per_output_chunk)
+            # Like Gemini, the final chunk reports the usage of the whole call
+            usage = self._usage(prompt_tokens) if i == len(chunks) - 1 else None
+            yield SimpleNamespace(text=chunk, usage_metadata=usage)
@@ -0,0 +1,190 @@
+"""Offline benchmark suite: times each pipeline stage on histories of 10 to 100k items.
+
+Every stage runs without credentials or network access, against replayed
+data:
+
+    scrape      scrape_redditor_data paging MockRedditServer (no added latency)
+    analysis    analyze_history
+    filter      filter_items (spam and near-duplicate filtering)
+    prompt      build_persona_prompt, with the features precomputed
+    parse       parse_persona_text + validate_persona on the recorded answer
+    citations   citation building (BM25 index and lookups)
+    report      render_report in every format
+    end_to_end  scrape, generate_enhanced_persona with ReplayModel, render_report
+
+Histories come from benchmarks.synthetic (fixed seeds, so every run sees
+the same items) or, with --fixture, from a recording made with
+benchmarks.fixtures. For synthetic histories the LLM answers are
+recorded once from the stub model and then replayed, so the replay path
+is exercised even without a real recording.
+
+Each timing is the median of several runs. --save writes the results to
+JSON and --baseline compares against an earlier file, exiting with
+status 1 when a stage got slower than --max-slowdown allows, so the suite
+can gate changes in CI:
+
+    python -m benchmarks.suite --save baseline.json
+    ... change the code ...
+    python -m benchmarks.suite --baseline baseline.json
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+
+from benchmarks.fixtures import RecordingModel, ReplayModel, load_fixture
+from benchmarks.mock_reddit import MockReddit, MockRedditServer
+from benchmarks.stub_llm import CANNED_PERSONA, StubModel
+from benchmarks.synthetic import scraped_data_from_history, synthetic_history
+from src.enhanced_persona_generator import build_citations, build_persona_prompt, generate_enhanced_persona
+from src.item_filter import filter_items
+from src.local_analysis import analyze_history, get_sentiment_lexicon
+from src.persona_schema import parse_persona_text, validate_persona
+from src.reddit_scraper import scrape_redditor_data
+from src.report import REPORT_FORMATS, render_report
+
+DEFAULT_SIZES = (10, 1000, 10000, 100000)
+STAGES = ('scrape', 'analysis', 'filter', 'prompt', 'parse', 'citations', 'report', 'end_to_end')
+USERNAME = 'bench_user'
+# Stop repeating a stage once its runs add up to this many seconds
+TARGET_SECONDS = 1.0
+MIN_RUNS = 3
+MAX_RUNS = 7
+# Differences below this are noise whatever the ratio
+NOISE_FLOOR = 0.002
+
+
+def _time(fn):
+    """Median and best of MIN_RUNS to MAX_RUNS runs of fn, repeating until TARGET_SECONDS have been spent."""
+    samples = []
+    while len(samples) < MAX_RUNS and (len(samples) < MIN_RUNS or sum(samples) < TARGET_SECONDS):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {'median': statistics.median(samples), 'min': min(samples), 'runs': len(samples)}
+
+
+def synthetic_case(items):
+    """A synthetic history plus LLM answers recorded from the stub model for its prompts."""
+    history = synthetic_history(USERNAME, items)
+    recorder = RecordingModel(StubModel(overhead=0, seconds_per_1k_tokens=0))
+    generate_enhanced_persona(scraped_data_from_history(history), USERNAME, None, model=recorder)
+    return {
+        'username': USERNAME, 'options': {}, 'histories': {USERNAME: history},
+        'llm_responses': recorder.responses, 'fallback': json.dumps(CANNED_PERSONA)
+    }
+
+
+def fixture_case(path):
+    fixture = load_fixture(path)
+    fixture['fallback'] = None
+    return fixture
+
+
+def _scrape(server, username):
+    return scrape_redditor_data(MockReddit(server.base_url), username, concurrent=True)
+
+
+def run_case(case, stages):
+    """Times the selected stages on one history; returns {stage: timing}."""
+    username = case['username']
+    history = case['histories'][username]
+    scraped_data = scraped_data_from_history(history)
+    features = analyze_history(scraped_data)
+    options = case['options']
+    model = ReplayModel(case['llm_responses'], fallback=case['fallback'])
+    answer = next(iter(case['llm_responses'].values()))['text']
+    persona = generate_enhanced_persona(scraped_data, username, None, model=model, **options)
+
+    def end_to_end():
+        data = _scrape(server, username)
+        result = generate_enhanced_persona(data, username, None, model=model, **options)
+        render_report(result, username, 'txt')
+
+    benchmarks = {
+        'scrape': lambda: _scrape(server, username),
+        'analysis': lambda: analyze_history(scraped_data),
+        'filter': lambda: filter_items(scraped_data),
+        'prompt': lambda: build_persona_prompt(scraped_data, username, features=features, **options),
+        'parse': lambda: validate_persona(parse_persona_text(answer)),
+        'citations': lambda: build_citations(persona, scraped_data),
+        'report': lambda: [render_report(persona, username, fmt) for fmt in REPORT_FORMATS],
+        'end_to_end': end_to_end
+    }
+    results = {}
+    with MockRedditServer(case['histories'], latency=0) as server:
+        for stage in stages:
+            results[stage] = _time(benchmarks[stage])
+    if model.misses:
+        print(f"warning: {model.misses} prompts had no recorded answer", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, max_slowdown):
+    """Returns (key, baseline, current) for every timing slower than max_slowdown times its baseline."""
+    regressions = []
+    for key, timing in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if timing['median'] > before['median'] * max_slowdown and timing['median'] - before['median'] > NOISE_FLOOR:
+            regressions.append((key, before['median'], timing['median']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for every persona pipeline stage.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated synthetic history sizes (items)")
+    parser.add_argument('--stages', default=','.join(STAGES), help="Comma-separated stages to run")
+    parser.add_argument('--fixture', help="Benchmark a recorded fixture instead of synthetic histories")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare with results saved by an earlier run")
+    parser.add_argument('--max-slowdown', type=float, default=1.3,
+                        help="Fail when a stage's median exceeds this multiple of its baseline")
+    args = parser.parse_args()
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    get_sentiment_lexicon()
+    if args.fixture:
+        cases = [('fixture', fixture_case(args.fixture))]
+    else:
+        # Built one at a time so only one large history is in memory
+        cases = ((size, synthetic_case(int(size))) for size in args.sizes.split(',') if size)
+
+    results = {}
+    print(f"{'stage':<12}{'items':>10}{'median ms':>12}{'min ms':>10}{'runs':>6}")
+    for label, case in cases:
+        history = case['histories'][case['username']]
+        items = len(history['comments']) + len(history['submitted'])
+        for stage, timing in run_case(case, stages).items():
+            results[f"{stage}/{label}"] = timing
+            print(f"{stage:<12}{items:>10}{timing['median'] * 1000:>12.2f}{timing['min'] * 1000:>10.2f}{timing['runs']:>6}")
+
+    if args.save:
+        meta = {'python': platform.python_version(), 'machine': platform.machine(), 'created': int(time.time())}
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.max_slowdown)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({after / before:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage slower than {args.max_slowdown:.2f}x its baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Reproducible synthetic Reddit histories, from a handful of items up to 100k.
+
+Unlike make_history, which repeats one sentence, these histories look
+enough like real activity to exercise the text paths: words follow a
+Zipf-like distribution over a fixed vocabulary, items vary in length and
+carry markdown, links, quoted replies and the odd duplicate, scores are
+heavy-tailed and activity is spread unevenly over subreddits and hours.
+The same (username, items, seed) always yields the same history.
+
+synthetic_history returns the mock server's listing format (see
+benchmarks.mock_reddit); scraped_data_from_history turns it into the
+records scrape_redditor_data would return, without any HTTP.
+"""
+import random
+from itertools import accumulate
+
+from src.records import Comment, Post
+
+VOCABULARY = """
+python code coffee game games build team work job weekend music movie book books history city travel food
+recipe kitchen garden bike run running gym sleep morning night coffee tea data model server bug release update
+linux laptop phone camera photo photos paint design art story stories school class exam study research paper
+market price prices rent house apartment car train bus weather rain summer winter dog cat kids family friend
+friends project idea question answer thread post subreddit mod rules community league season match player
+""".split()
+SENTIMENT_WORDS = ('love', 'great', 'awesome', 'helpful', 'thanks', 'terrible', 'annoying', 'disappointed',
+                   'hate', 'broken', 'not', 'never', 'really', 'pretty')
+FILLER = ('the', 'a', 'and', 'i', 'it', 'is', 'this', 'that', 'for', 'with', 'my', 'you', 'to', 'of', 'in')
+SUBREDDITS = ('python', 'coffee', 'gaming', 'books', 'cycling', 'cooking', 'linux', 'AskReddit', 'history',
+              'photography', 'personalfinance', 'soccer')
+
+# Share of items that are comments; the rest are posts
+COMMENT_SHARE = 0.75
+DUPLICATE_RATE = 0.02
+START_UTC = 1700000000
+
+
+def _cum_weights(count, exponent=0.9):
+    """Cumulative Zipf weights; precomputed because random.choices would otherwise rebuild them per call."""
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def _sentence(rng, words, weights):
+    length = max(3, int(rng.gauss(14, 6)))
+    tokens = rng.choices(words, cum_weights=weights, k=length)
+    tokens[::4] = rng.choices(FILLER, k=len(range(0, length, 4)))
+    if rng.random() < 0.3:
+        tokens.insert(rng.randrange(len(tokens)), rng.choice(SENTIMENT_WORDS))
+    return " ".join(tokens).capitalize() + rng.choice('..!?')
+
+
+def _text(rng, words, weights, max_sentences):
+    sentences = [_sentence(rng, words, weights) for _ in range(rng.randint(1, max_sentences))]
+    roll = rng.random()
+    if roll < 0.1:
+        sentences.insert(0, f"> {_sentence(rng, words, weights)}\n\n")
+    elif roll < 0.18:
+        sentences.append(f"[{rng.choice(words)}](https://example.com/{rng.randrange(10 ** 6)})")
+    elif roll < 0.22:
+        sentences.append(f"**{rng.choice(words)}** &amp; `code`")
+    return " ".join(sentences)
+
+
+def synthetic_history(username, items, seed=0, start_utc=START_UTC):
+    """Builds a history of `items` comments and posts in total, newest first, in mock server format."""
+    rng = random.Random(f"{username}:{items}:{seed}")
+    words = VOCABULARY[:]
+    rng.shuffle(words)
+    weights = _cum_weights(len(words))
+    subreddit_weights = _cum_weights(len(SUBREDDITS), exponent=1.4)
+
+    comments = []
+    posts = []
+    created = start_utc
+    for _ in range(items):
+        # Bursty activity: mostly short gaps, sometimes days of silence
+        created -= int(rng.expovariate(1 / 5400)) + 1
+        subreddit = rng.choices(SUBREDDITS, cum_weights=subreddit_weights)[0]
+        score = int(rng.paretovariate(1.3)) - 1 - (rng.random() < 0.05) * rng.randint(1, 20)
+        if rng.random() < COMMENT_SHARE:
+            n = len(comments)
+            if comments and rng.random() < DUPLICATE_RATE:
+                body = rng.choice(comments)['body']
+            else:
+                body = _text(rng, words, weights, max_sentences=4)
+            comments.append({
+                'name': f't1_c{n}', 'id': f'c{n}', 'body': body, 'score': score, 'created_utc': float(created),
+                'subreddit': subreddit, 'permalink': f'/r/{subreddit}/comments/t{n}/_/c{n}/'
+            })
+        else:
+            n = len(posts)
+            permalink = f'/r/{subreddit}/comments/p{n}/_/'
+            posts.append({
+                'name': f't3_p{n}', 'id': f'p{n}', 'title': _sentence(rng, words, weights)[:120],
+                'selftext': _text(rng, words, weights, max_sentences=8) if rng.random() < 0.7 else '',
+                'score': score, 'created_utc': float(created), 'subreddit': subreddit, 'permalink': permalink,
+                'url': f'https://www.reddit.com{permalink}'
+            })
+    return {'comments': comments, 'submitted': posts}
+
+
+def scraped_data_from_history(history):
+    """The records scrape_redditor_data would return for a mock server history."""
+    return {
+        'comments': [Comment.from_mapping(item) for item in history['comments']],
+        'posts': [Post.from_mapping(item) for item in history['submitted']]
+    }
@@ -1,12 +1,19 @@
 import streamlit as st
+import json
 import os
+import time
 from datetime import datetime
 import plotly.graph_objects as go
 import plotly.express as px
-import sys
-from io import StringIO
-from src.reddit_scraper import initialize_reddit, extract_username_from_url, scrape_redditor_data
-from src.enhanced_persona_generator import generate_enhanced_persona
+from src.clients import MODEL_NAME, invalidate_all
+from src.reddit_scraper import extract_username_from_url
+from src.metrics import prometheus_text
+from src.run_log import stage
+from src.job_queue import FAILED, QUEUED, RUNNING
+from src.persona_cache import CACHE_URL, PersonaCache, backend_from_url
+from src.persona_jobs import REPORT_DIR, PersonaJobs
+from src.prompt_builder import DEFAULT_TOKEN_BUDGET, RANKINGS
+from src.report import DEFAULT_KEEP, MIME_TYPES, REPORT_FORMATS, render_report, report_filename
 
 # Streamlit app configuration
 st.set_page_config(
@@ -78,6 +85,20 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_persona_cache():
+    """Returns the persona cache (on disk unless PERSONA_CACHE_URL says otherwise) shared by every session of this process."""
+    return PersonaCache(backend_from_url(CACHE_URL))
+
+@st.cache_resource
+def get_persona_jobs():
+    """Returns the job queue and worker pool shared by every session of this process.
+
+    Runs survive browser refreshes and closed tabs because they belong to
+    the pool, not to the session that submitted them.
+    """
+    return PersonaJobs(persona_cache=get_persona_cache()).start()
+
 def create_motivation_chart(motivations):
     """Create a horizontal bar chart for motivations."""
     labels = list(motivations.keys())
@@ -164,83 +185,266 @@ def create_personality_chart(personality):
     
     return fig
 
-def save_enhanced_persona_to_file(persona, username):
-    """Saves the enhanced persona to a formatted text file."""
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"enhanced_persona_{username}_{timestamp}.txt"
+CHART_BUILDERS = {
+    'motivations': create_motivation_chart,
+    'personality': create_personality_chart
+}
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def chart_png(kind, chart_data_json):
+    """Renders a chart to PNG with Kaleido, memoized on the chart's data so reruns and repeat personas reuse it."""
+    fig = CHART_BUILDERS[kind](json.loads(chart_data_json))
+    with stage('chart_png', chart=kind):
+        return fig.to_image(format="png")
+
+@st.fragment
+def render_chart_download(kind, chart_data, label, file_name):
+    """Offers a PNG download, rendered only once asked for.
+
+    Being a fragment, clicking here reruns just this block instead of the
+    whole page. Without a working Kaleido the page still renders and the
+    chart's own camera button saves the image from the browser.
+    """
+    if not st.button(f"🖼️ Prepare {label} Chart PNG", key=f"prepare_{kind}_png"):
+        return
+    try:
+        png = chart_png(kind, json.dumps(chart_data, sort_keys=True))
+    except Exception as e:
+        st.caption(f"PNG export is unavailable here ({e}). Use the camera icon on the chart to save it from your browser.")
+        return
+    st.download_button(
+        label=f"📥 Download {label} Chart as PNG",
+        data=png,
+        file_name=file_name,
+        mime="image/png",
+        key=f"download_{kind}_png"
+    )
+
+def create_persona_layout():
+    """Lays out empty placeholders for every persona section, in page order."""
+    slots = {}
+    col1, col2, col3 = st.columns([1, 2, 1])
+    slots['header'] = col2.empty()
+    col_left, col_right = st.columns([1, 2])
+    slots['basic_info'] = col_left.empty()
+    slots['lists'] = col_right.empty()
+    col_viz1, col_viz2 = st.columns(2)
+    slots['motivations'] = col_viz1.empty()
+    slots['personality'] = col_viz2.empty()
+    slots['quote'] = st.empty()
+    slots['summary'] = st.empty()
+    slots['citations'] = st.empty()
+    return slots
+
+def render_header(persona, counts):
+    st.markdown(f'<div class="persona-header">{persona["name"]}</div>', unsafe_allow_html=True)
+
+def render_basic_info(persona, counts):
+    st.markdown('<div class="persona-card">', unsafe_allow_html=True)
+    st.markdown("**BASIC INFORMATION**")
+    for field in ('age', 'occupation', 'status', 'location', 'tier', 'archetype'):
+        if field in persona:
+            st.write(f"**{field.title()}:** {persona[field]}")
     
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write("=" * 80 + "\n")
-        f.write(f"REDDIT USER PERSONA REPORT\n")
-        f.write("=" * 80 + "\n\n")
-        
-        f.write(f"USERNAME: {persona['name']}\n")
-        f.write(f"GENERATED ON: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
-        # Basic Information
-        f.write("BASIC INFORMATION\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"Age: {persona['age']}\n")
-        f.write(f"Occupation: {persona['occupation']}\n")
-        f.write(f"Status: {persona['status']}\n")
-        f.write(f"Location: {persona['location']}\n")
-        f.write(f"Tier: {persona['tier']}\n")
-        f.write(f"Archetype: {persona['archetype']}\n\n")
-        
-        # Personality
-        f.write("PERSONALITY\n")
-        f.write("-" * 40 + "\n")
+    # Personality traits as tags
+    if 'personality' in persona:
+        st.markdown("**PERSONALITY TRAITS**")
+        traits_html = ""
         for trait, value in persona['personality'].items():
-            f.write(f"{trait.replace('_', ' ').title()}: {value.title()}\n")
-        f.write("\n")
-        
-        # Motivations
-        f.write("MOTIVATIONS\n")
-        f.write("-" * 40 + "\n")
-        for motivation, score in persona['motivations'].items():
-            f.write(f"{motivation.replace('_', ' ').title()}: {score}/100\n")
-        f.write("\n")
-        
-        # Behavior & Habits
-        f.write("BEHAVIOR & HABITS\n")
-        f.write("-" * 40 + "\n")
-        for behavior in persona['behaviors_habits']:
-            f.write(f"• {behavior}\n")
-        f.write("\n")
-        
-        # Goals & Needs
-        f.write("GOALS & NEEDS\n")
-        f.write("-" * 40 + "\n")
-        for goal in persona['goals_needs']:
-            f.write(f"• {goal}\n")
-        f.write("\n")
-        
-        # Frustrations
-        f.write("FRUSTRATIONS\n")
-        f.write("-" * 40 + "\n")
-        for frustration in persona['frustrations']:
-            f.write(f"• {frustration}\n")
-        f.write("\n")
-        
-        # Common Topics
-        f.write("COMMON TOPICS\n")
-        f.write("-" * 40 + "\n")
-        f.write(f"{', '.join(persona['common_topics'])}\n\n")
-        
-        # Quote
-        f.write("REPRESENTATIVE QUOTE\n")
-        f.write("-" * 40 + "\n")
-        f.write(f'"{persona["quote"]}"\n\n')
-        
-        # Citations
-        f.write("CITATIONS & SOURCES\n")
-        f.write("-" * 40 + "\n")
-        for citation in persona['citations']:
-            f.write(f"[{citation['id']}] ({citation['type'].upper()}) Score: {citation['score']}\n")
-            f.write(f"Content: {citation['content'][:150]}...\n")
-            f.write(f"Source: {citation['permalink']}\n\n")
+            traits_html += f'<span class="personality-trait">{value.title()}</span> '
+        st.markdown(traits_html, unsafe_allow_html=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+def render_lists(persona, counts):
+    for field, title in (('behaviors_habits', 'BEHAVIOUR & HABITS'), ('goals_needs', 'GOALS & NEEDS'), ('frustrations', 'FRUSTRATIONS')):
+        if field in persona:
+            st.markdown(f'<div class="section-header">{title}</div>', unsafe_allow_html=True)
+            for entry in persona[field]:
+                st.write(f"• {entry}")
+
+def render_motivations(persona, counts):
+    if persona.get('motivations'):
+        fig_motivations = create_motivation_chart(persona['motivations'])
+        st.plotly_chart(fig_motivations, use_container_width=True, config={'toImageButtonOptions': {'filename': 'motivation_chart'}})
+        render_chart_download('motivations', persona['motivations'], "Motivation", "motivation_chart.png")
+
+def render_personality(persona, counts):
+    if not persona.get('personality'):
+        return
+    fig_personality = create_personality_chart(persona['personality'])
+    st.plotly_chart(fig_personality, use_container_width=True, config={'toImageButtonOptions': {'filename': 'personality_chart'}})
+    render_chart_download('personality', persona['personality'], "Personality", "personality_chart.png")
+
+def render_quote(persona, counts):
+    if persona.get('quote'):
+        st.markdown(f'<div class="quote-box">"{persona["quote"]}"</div>', unsafe_allow_html=True)
+
+def render_summary(persona, counts):
+    st.markdown("### Activity Summary")
+    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
     
-    return filename
+    with col_m1:
+        st.metric("Comments Analyzed", counts['comments'])
+    with col_m2:
+        st.metric("Posts Analyzed", counts['posts'])
+    with col_m3:
+        st.metric("Common Topics", len(persona.get('common_topics', [])))
+    with col_m4:
+        st.metric("Overall Sentiment", persona.get('sentiment', '…'))
+
+def render_citations(persona, counts):
+    with st.expander("📚 View Citations & Sources"):
+        st.markdown("### Citations")
+        for citation in persona['citations']:
+            with st.container():
+                st.write(f"**[{citation['id']}] {citation['type'].upper()}** (Score: {citation['score']})")
+                if citation.get('statement'):
+                    st.caption(f"Supports: {citation['statement']}")
+                st.write(f"Content: {citation['content'][:200]}...")
+                st.write(f"[View on Reddit]({citation['permalink']})")
+                st.divider()
+
+PERSONA_SECTIONS = {
+    'header': render_header,
+    'basic_info': render_basic_info,
+    'lists': render_lists,
+    'motivations': render_motivations,
+    'personality': render_personality,
+    'quote': render_quote,
+    'summary': render_summary,
+    'citations': render_citations
+}
+
+# Sections to redraw when a streamed persona field arrives
+FIELD_SECTIONS = {
+    'name': ('header',),
+    'age': ('basic_info',),
+    'occupation': ('basic_info',),
+    'status': ('basic_info',),
+    'location': ('basic_info',),
+    'tier': ('basic_info',),
+    'archetype': ('basic_info',),
+    'personality': ('basic_info', 'personality'),
+    'motivations': ('motivations',),
+    'behaviors_habits': ('lists',),
+    'goals_needs': ('lists',),
+    'frustrations': ('lists',),
+    'common_topics': ('summary',),
+    'sentiment': ('summary',),
+    'quote': ('quote',),
+    'citations': ('citations',)
+}
+
+def render_persona_section(slots, section, persona, counts):
+    """Draws one section into its placeholder, replacing what was there."""
+    with stage('render', section=section), slots[section].container():
+        PERSONA_SECTIONS[section](persona, counts)
+
+# Jobs each browser session remembers for the Generate button; the oldest is dropped first
+MAX_SESSION_JOBS = 20
+# Seconds between status checks while a job is queued or running
+POLL_SECONDS = 1.0
+# Jobs listed in the sidebar's job panel
+RECENT_JOBS = 10
+
+def render_partial_persona(persona):
+    """Draws the sections whose fields a running job has already streamed in."""
+    slots = create_persona_layout()
+    ready = {section for field in persona for section in FIELD_SECTIONS.get(field, ())}
+    # The activity summary needs the item counts, which only the finished result has
+    for section in PERSONA_SECTIONS:
+        if section in ready and section != 'summary':
+            render_persona_section(slots, section, persona, None)
+
+def render_job(jobs, job_id, report_format):
+    """Shows a job's status, its partial persona while it runs and the result once it is done.
+
+    Returns True while the job is still queued or running, so the caller
+    knows to poll again.
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        st.warning("This job is no longer available. Please generate the persona again.")
+        return False
+    username = job['params']['username']
+    if job['status'] == QUEUED:
+        ahead = jobs.store.position(job_id)
+        st.info(f"Analysis of {username} is queued" + (f" behind {ahead} other jobs." if ahead else " and starts shortly."))
+        return True
+    if job['status'] == RUNNING:
+        st.progress(min(1.0, job['progress']), text=f"Analyzing user: {username} ({job['stage'] or 'starting'})...")
+        if job['partial']:
+            render_partial_persona(job['partial'])
+        return True
+    if job['status'] == FAILED:
+        st.error(f"An error occurred: {job['error']}")
+        st.info("Please check your Reddit API credentials and try again.")
+        return False
+
+    result = job['result']
+    st.success(f"Enhanced persona of {username} generated successfully!")
+    if result.get('report_path'):
+        st.success(f"Enhanced persona saved to file: {result['report_path']}")
+    st.caption(f"Generated at {datetime.fromtimestamp(result['generated_at']).strftime('%H:%M:%S')} · use Refresh to regenerate")
+    slots = create_persona_layout()
+    for section in PERSONA_SECTIONS:
+        render_persona_section(slots, section, result['persona'], result['counts'])
+    render_result_footer(username, result, report_format)
+    return False
+
+def render_result_footer(username, result, report_format):
+    """Download button, timing panel and logs shown under a persona."""
+    generated_at = datetime.fromtimestamp(result['generated_at'])
+    # Rendered in memory on every draw, so switching the format needs no regeneration
+    st.download_button(
+        label="📄 Download Enhanced Persona Report",
+        data=render_report(result['persona'], username, report_format, generated_at),
+        file_name=report_filename(username, report_format, generated_at),
+        mime=MIME_TYPES[report_format]
+    )
+    render_timing_panel(result['timings'], result['seconds'])
+
+    # Display captured logs
+    with st.expander("View Logs"):
+        st.code(format_run_log(result['log'], result['timings']))
+
+def render_job_list(jobs, session_jobs, current_job_id):
+    """Sidebar panel of this session's recent jobs, each of which can be opened."""
+    st.sidebar.subheader("Jobs")
+    recent = jobs.recent(RECENT_JOBS, session_jobs.values())
+    if not recent:
+        st.sidebar.caption("No jobs yet.")
+    for job in recent:
+        label = f"{job['params']['username']} · {job['status']}"
+        if job['status'] == RUNNING:
+            label += f" {job['progress']:.0%}"
+        if st.sidebar.button(label, key=f"job-{job['id']}", disabled=job['id'] == current_job_id):
+            st.query_params['job'] = job['id']
+            st.rerun()
+
+def format_run_log(log, timings):
+    """Captured log lines followed by the time spent in each pipeline stage."""
+    lines = "\n".join(f"{name:<16}{total['calls']:>4}x {total['seconds'] * 1000:>9.0f} ms"
+                      for name, total in timings.items())
+    return f"{log}\n\nStage timings:\n{lines}" if lines else log
+
+def render_timing_panel(timings, total_seconds):
+    """Compact per-run breakdown: headline numbers plus a table of every stage."""
+    llm = timings.get('llm', {})
+    scrape = timings.get('scrape', {})
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Total", f"{total_seconds:.1f}s")
+    col2.metric("Scrape", f"{scrape.get('seconds', 0.0):.1f}s", help=f"{timings.get('reddit_request', {}).get('calls', 0)} Reddit requests, {scrape.get('items', 0)} items")
+    col3.metric("LLM", f"{llm.get('seconds', 0.0):.1f}s")
+    tokens = sum(total.get('prompt_tokens', 0) + total.get('response_tokens', 0) for total in timings.values())
+    col4.metric("Tokens", f"{tokens:,}")
+    with st.expander("⏱️ Stage timings"):
+        st.dataframe(
+            [{'stage': name, 'calls': total['calls'], 'ms': round(total['seconds'] * 1000),
+              **{field: value for field, value in total.items() if field not in ('calls', 'seconds')}}
+             for name, total in timings.items()],
+            use_container_width=True
+        )
 
 def main():
     st.title("🔍 Reddit User Persona Generator")
@@ -262,6 +466,28 @@ def main():
     # Data scraping options
     st.sidebar.subheader("Scraping Options")
     limit = st.sidebar.slider("Number of posts/comments to analyze", min_value=10, max_value=500, value=100, step=10, help="Select how many posts and comments to analyze for persona generation.")
+    token_budget = st.sidebar.number_input("Prompt token budget", min_value=1000, max_value=500000, value=DEFAULT_TOKEN_BUDGET, step=1000, help="Upper bound on the tokens spent on the user's content in the LLM prompt.")
+    ranking = st.sidebar.selectbox("Item ranking", RANKINGS, help="How to choose items when the history does not fit in the token budget.")
+    chunked = st.sidebar.checkbox("Chunked analysis", value=False, help="Split large histories into chunks analyzed in parallel, then merge the results.")
+    dedupe = st.sidebar.checkbox("Filter spam and duplicates", value=True, help="Leave deleted, link-only and repeated (or nearly repeated) items out of the prompt; statistics still count every item.")
+    fast_mode = st.sidebar.checkbox("Fast mode (no LLM)", value=False, help="Compute topics, sentiment, activity tier and a quote locally in milliseconds, without calling Gemini.")
+    stream_output = st.sidebar.checkbox("Stream results", value=True, help="Show each part of the persona as soon as the model has written it (not available with chunked analysis).")
+    direct_listings = st.sidebar.checkbox("Direct listing client", value=False, help="Read listings from Reddit's JSON API directly instead of through PRAW, which uses less CPU per item.")
+    use_scrape_cache = st.sidebar.checkbox("Reuse cached history", value=True, help="Keep scraped histories on disk and only fetch activity that is newer than the cached copy.")
+    use_persona_cache = st.sidebar.checkbox("Reuse cached personas", value=True, help="Skip the LLM call when the same history was already analyzed with the same settings.")
+    st.sidebar.subheader("Report Options")
+    report_format = st.sidebar.selectbox("Report format", REPORT_FORMATS, help="Format of the downloadable report.")
+    # The folder is server configuration (PERSONA_REPORT_DIR), never taken from the visitor
+    save_report = REPORT_DIR is not None and st.sidebar.checkbox("Save reports on the server", value=False, help=f"Also keep each report in the server's report folder; only the newest {DEFAULT_KEEP} are kept.")
+    if st.sidebar.button("Reset API clients", help="Drop pooled Reddit and Gemini clients, e.g. after changing credentials."):
+        invalidate_all()
+    persona_cache = get_persona_cache()
+    cache_stats = persona_cache.stats()
+    st.sidebar.caption(f"Persona cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    jobs = get_persona_jobs()
+    job_counts = jobs.store.counts()
+    st.sidebar.caption(f"Jobs: {job_counts.get(RUNNING, 0)} running, {job_counts.get(QUEUED, 0)} queued")
+    st.sidebar.download_button("Download metrics (Prometheus)", data=prometheus_text(), file_name="persona_metrics.prom", mime="text/plain", help="Stage durations, item, byte and token counts for every run in this process.")
     
     # Main content area
     st.header("Enter Reddit User Profile URL")
@@ -271,8 +497,15 @@ def main():
         help="Enter the full URL of the Reddit user profile you want to analyze, e.g., https://www.reddit.com/user/kojied/"
     )
     
-    if st.button("Generate Enhanced Persona", type="primary"):
-        if not all([client_id, client_secret, user_agent, google_api_key]):
+    generate = st.button("Generate Enhanced Persona", type="primary")
+    refresh = st.button("🔄 Refresh", help="Scrape again and regenerate, instead of reusing the result already shown in this session.")
+    username = extract_username_from_url(user_url) if user_url else None
+    # Everything that changes the persona; other widgets only change how it is displayed
+    result_key = (username.lower(), limit, MODEL_NAME, token_budget, ranking, chunked, dedupe, fast_mode) if username else None
+    session_jobs = st.session_state.setdefault('persona_jobs', {})
+
+    if generate or refresh:
+        if not all([client_id, client_secret, user_agent]) or not (google_api_key or fast_mode):
             st.error("Please provide all required Reddit API credentials in the sidebar to proceed.")
             return
         
@@ -280,172 +513,37 @@ def main():
             st.error("Please enter a valid Reddit user profile URL to proceed.")
             return
         
-        username = extract_username_from_url(user_url)
         if not username:
             st.error("Invalid Reddit user URL format detected. Please ensure the URL matches 'https://www.reddit.com/user/username/'.")
             return
-        
-        try:
-            import sys
-            from io import StringIO
-
-            # Create a StringIO object to capture output
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-            redirected_output = StringIO()
-            sys.stdout = redirected_output
-            sys.stderr = redirected_output
-
-            with st.spinner(f"Analyzing user: {username}..."):
-                # Initialize Reddit instance
-                reddit = initialize_reddit(client_id, client_secret, user_agent)
-                
-                # Scrape user data
-                st.info("Scraping user data...")
-                scraped_data = scrape_redditor_data(reddit, username, limit=limit)
-                
-                if not scraped_data['comments'] and not scraped_data['posts']:
-                    st.warning("No data found for this user. They might have no posts/comments or their profile might be private.")
-                    return
-                
-                # Generate enhanced persona
-                st.info("Generating enhanced persona...")
-                persona = generate_enhanced_persona(scraped_data, username, google_api_key)
-                
-                # Display results in professional format
-                st.success("Enhanced persona generated successfully!")
-            
-            # Restore stdout and stderr
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
-            
-            # Display captured logs
-            with st.expander("View Logs"):
-                st.code(redirected_output.getvalue())
-                
-                # Main persona display
-                col1, col2, col3 = st.columns([1, 2, 1])
-                
-                with col2:
-                    st.markdown(f'<div class="persona-header">{persona["name"]}</div>', unsafe_allow_html=True)
-                
-                # Basic information section
-                col_left, col_right = st.columns([1, 2])
-                
-                with col_left:
-                    st.markdown('<div class="persona-card">', unsafe_allow_html=True)
-                    st.markdown("**BASIC INFORMATION**")
-                    st.write(f"**Age:** {persona['age']}")
-                    st.write(f"**Occupation:** {persona['occupation']}")
-                    st.write(f"**Status:** {persona['status']}")
-                    st.write(f"**Location:** {persona['location']}")
-                    st.write(f"**Tier:** {persona['tier']}")
-                    st.write(f"**Archetype:** {persona['archetype']}")
-                    
-                    # Personality traits as tags
-                    st.markdown("**PERSONALITY TRAITS**")
-                    traits_html = ""
-                    for trait, value in persona['personality'].items():
-                        traits_html += f'<span class="personality-trait">{value.title()}</span> '
-                    st.markdown(traits_html, unsafe_allow_html=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                
-                with col_right:
-                    # Behavior & Habits
-                    st.markdown('<div class="section-header">BEHAVIOUR & HABITS</div>', unsafe_allow_html=True)
-                    for behavior in persona['behaviors_habits']:
-                        st.write(f"• {behavior}")
-                    
-                    # Goals & Needs
-                    st.markdown('<div class="section-header">GOALS & NEEDS</div>', unsafe_allow_html=True)
-                    for goal in persona['goals_needs']:
-                        st.write(f"• {goal}")
-                    
-                    # Frustrations
-                    st.markdown('<div class="section-header">FRUSTRATIONS</div>', unsafe_allow_html=True)
-                    for frustration in persona['frustrations']:
-                        st.write(f"• {frustration}")
-                
-                # Visualizations
-                col_viz1, col_viz2 = st.columns(2)
-                
-                with col_viz1:
-                    # Motivations chart
-                    if persona['motivations']:
-                        fig_motivations = create_motivation_chart(persona['motivations'])
-                        st.plotly_chart(fig_motivations, use_container_width=True)
-                        # Add download button for motivation chart
-                        img_bytes = fig_motivations.to_image(format="png")
-                        st.download_button(
-                            label="📥 Download Motivation Chart as PNG",
-                            data=img_bytes,
-                            file_name="motivation_chart.png",
-                            mime="image/png"
-                        )
-                
-                with col_viz2:
-                    # Personality chart
-                    fig_personality = create_personality_chart(persona['personality'])
-                    st.plotly_chart(fig_personality, use_container_width=True)
-                    # Add download button for personality chart
-                    img_bytes_personality = fig_personality.to_image(format="png")
-                    st.download_button(
-                        label="📥 Download Personality Chart as PNG",
-                        data=img_bytes_personality,
-                        file_name="personality_chart.png",
-                        mime="image/png"
-                    )
-                
-                # Quote section
-                if persona.get('quote'):
-                    st.markdown(f'<div class="quote-box">"{persona["quote"]}"</div>', unsafe_allow_html=True)
-                
-                # Activity metrics
-                st.markdown("### Activity Summary")
-                col_m1, col_m2, col_m3, col_m4 = st.columns(4)
-                
-                with col_m1:
-                    st.metric("Comments Analyzed", len(scraped_data['comments']))
-                with col_m2:
-                    st.metric("Posts Analyzed", len(scraped_data['posts']))
-                with col_m3:
-                    st.metric("Common Topics", len(persona['common_topics']))
-                with col_m4:
-                    st.metric("Overall Sentiment", persona['sentiment'])
-                
-                # Citations section
-                with st.expander("📚 View Citations & Sources"):
-                    st.markdown("### Citations")
-                    for citation in persona['citations']:
-                        with st.container():
-                            st.write(f"**[{citation['id']}] {citation['type'].upper()}** (Score: {citation['score']})")
-                            st.write(f"Content: {citation['content'][:200]}...")
-                            st.write(f"[View on Reddit]({citation['permalink']})")
-                            st.divider()
-                
-                # Save to file
-                filename = save_enhanced_persona_to_file(persona, username)
-                st.success(f"Enhanced persona saved to file: {filename}")
-                
-                # Download button
-                with open(filename, 'r', encoding='utf-8') as f:
-                    file_content = f.read()
-                
-                st.download_button(
-                    label="📄 Download Enhanced Persona Report",
-                    data=file_content,
-                    file_name=filename,
-                    mime="text/plain"
-                )
-                
-        except Exception as e:
-            # Ensure stdout and stderr are restored even if an error occurs
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
-            st.error(f"An error occurred: {str(e)}")
-            st.info("Please check your Reddit API credentials and try again.")
-            with st.expander("View Logs (Error)"):
-                st.code(redirected_output.getvalue())
+
+        job_id = session_jobs.get(result_key)
+        previous = jobs.get(job_id) if job_id and not refresh else None
+        if previous is None or previous['status'] == FAILED:
+            # The run happens on the worker pool; this script only submits it and polls
+            options = {
+                'limit': limit, 'token_budget': token_budget, 'ranking': ranking, 'chunked': chunked, 'dedupe': dedupe,
+                'fast_mode': fast_mode, 'stream': stream_output, 'use_scrape_cache': use_scrape_cache,
+                'use_persona_cache': use_persona_cache and not refresh, 'direct_listings': direct_listings,
+                'save_report': save_report
+            }
+            if save_report:
+                options['report_format'] = report_format
+            credentials = {'client_id': client_id, 'client_secret': client_secret, 'user_agent': user_agent,
+                           'google_api_key': google_api_key}
+            job_id = jobs.submit(username, options, credentials)
+            session_jobs.pop(result_key, None)
+            session_jobs[result_key] = job_id
+            while len(session_jobs) > MAX_SESSION_JOBS:
+                session_jobs.pop(next(iter(session_jobs)))
+        st.query_params['job'] = job_id
+
+    # The shown job is kept in the URL, so a browser refresh (a new session) comes back to it
+    job_id = st.query_params.get('job')
+    if job_id and job_id not in session_jobs.values():
+        session_jobs[('url', job_id)] = job_id
+    render_job_list(jobs, session_jobs, job_id)
+    pending = render_job(jobs, job_id, report_format) if job_id else False
     
     # Instructions section
     with st.expander("📖 How to Use This Application"):
@@ -493,6 +591,10 @@ def main():
         - Source citations with links
         """)
 
+    if pending:
+        time.sleep(POLL_SECONDS)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,156 @@
+import asyncio
+import inspect
+import logging
+from src.clients import get_gemini_model
+from src.enhanced_persona_generator import (
+    DEFAULT_CHUNK_TOKENS, apply_repair, build_persona_prompt, build_repair_prompt, check_persona, fill_persona_defaults,
+    finalize_persona, lookup_persona_cache, prepare_persona_prompt, usage_fields
+)
+from src.persona_merge import merge_partial_personas
+from src.persona_schema import parse_persona_text, persona_generation_config
+from src.prompt_builder import DEFAULT_TOKEN_BUDGET
+from src.reddit_scraper import comment_record, submission_record, scrape_counts
+from src.run_log import stage
+
+logger = logging.getLogger(__name__)
+
+async def _collect(listing, to_record, limit, seen_ids=None, since_utc=None):
+    """Async version of the scraper's listing loop: pages a newest-first listing until a known item is reached."""
+    items = []
+    async for item in listing.new(limit=limit):
+        if seen_ids and item.id in seen_ids:
+            break
+        if since_utc is not None and item.created_utc < since_utc:
+            break
+        items.append(to_record(item))
+    return items
+
+async def scrape_redditor_data_async(reddit, username, limit=None, seen_ids=None, since_utc=None):
+    """Async counterpart of scrape_redditor_data.
+
+    Both listings are paged concurrently on the event loop, so a scrape
+    holds no thread while it waits for Reddit. seen_ids and since_utc work
+    as in scrape_redditor_data.
+    """
+    redditor = reddit.redditor(username)
+    if inspect.isawaitable(redditor):
+        redditor = await redditor
+    seen_ids = seen_ids or {}
+    since_utc = since_utc or {}
+    with stage('scrape', concurrent=True) as fields:
+        comments, posts = await asyncio.gather(
+            _collect(redditor.comments, comment_record, limit, seen_ids.get('comments'), since_utc.get('comments')),
+            _collect(redditor.submissions, submission_record, limit, seen_ids.get('posts'), since_utc.get('posts'))
+        )
+        data = {'comments': comments, 'posts': posts}
+        fields.update(scrape_counts(data))
+    return data
+
+async def _generate_chunked_async(model, chunks, username, chunk_tokens, max_concurrency, features):
+    """Async map-reduce generation; at most max_concurrency chunk requests are in flight."""
+    logger.info(f"Chunked mode: {len(chunks)} chunks of up to ~{chunk_tokens} tokens, "
+                f"{max_concurrency} concurrent requests")
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def analyze(chunk):
+        prompt, _ = build_persona_prompt(chunk, username, token_budget=chunk_tokens, ranking='recency', features=features)
+        async with semaphore:
+            with stage('llm_chunk') as fields:
+                response = await model.generate_content_async(prompt, generation_config=persona_generation_config())
+                fields.update(usage_fields(response))
+        return parse_persona_text(response.text)
+
+    partials = await asyncio.gather(*(analyze(chunk) for chunk in chunks))
+    weights = [len(chunk['comments']) + len(chunk['posts']) for chunk in chunks]
+    return merge_partial_personas(partials, weights)
+
+async def _repair_persona_async(model, persona, problems, scraped_data, username, features=None):
+    """Async counterpart of generate_enhanced_persona's repair step."""
+    if problems:
+        logger.warning(f"Persona answer had missing or invalid fields ({', '.join(problems)}); re-requesting only those")
+        try:
+            with stage('repair', repaired=','.join(problems)) as fields:
+                prompt = await asyncio.to_thread(build_repair_prompt, scraped_data, username, problems)
+                response = await model.generate_content_async(
+                    prompt, generation_config=persona_generation_config(problems)
+                )
+                fields.update(usage_fields(response))
+            apply_repair(persona, response, problems)
+        except Exception as e:
+            logger.warning(f"Repair request failed, using defaults: {e}")
+    return await asyncio.to_thread(fill_persona_defaults, persona, scraped_data, username, features)
+
+async def generate_enhanced_persona_async(scraped_data, username, google_api_key, token_budget=DEFAULT_TOKEN_BUDGET,
+                                          ranking='score', chunked=False, chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                                          max_concurrency=4, model=None, cache=None, dedupe=True, features=None):
+    """Async counterpart of generate_enhanced_persona with the same options and result.
+
+    It runs the same steps (prepare_persona_prompt, check_persona,
+    finalize_persona, ...); the LLM is called through the model's
+    generate_content_async, and the CPU-bound steps (item filtering,
+    prompt building, local analysis, citation lookup) and cache I/O run on
+    the loop's default executor so they do not stall other requests
+    sharing the event loop.
+    """
+    cache_key = None
+    if cache is not None:
+        options = {'token_budget': token_budget, 'ranking': ranking, 'chunked': chunked, 'chunk_tokens': chunk_tokens,
+                   'dedupe': dedupe}
+        cache_key, cached_persona = await asyncio.to_thread(lookup_persona_cache, cache, scraped_data, username, options)
+        if cached_persona is not None:
+            return cached_persona
+
+    if model is None:
+        model = get_gemini_model(google_api_key)
+
+    try:
+        request = await asyncio.to_thread(prepare_persona_prompt, scraped_data, username, token_budget, ranking, chunked,
+                                          chunk_tokens, dedupe, features)
+        features = request['features']
+        if request['chunks']:
+            chunks = request['chunks']
+            with stage('llm', chunks=len(chunks)):
+                merged = await _generate_chunked_async(model, chunks, username, chunk_tokens, max_concurrency, features)
+            with stage('parse'):
+                persona, problems = check_persona(merged)
+        else:
+            with stage('llm') as fields:
+                response = await model.generate_content_async(request['prompt'],
+                                                              generation_config=persona_generation_config())
+                fields.update(usage_fields(response))
+            with stage('parse'):
+                persona, problems = check_persona(parse_persona_text(response.text))
+        persona = await _repair_persona_async(model, persona, problems, request['prompt_data'], username, features)
+        return await asyncio.to_thread(finalize_persona, persona, scraped_data, cache, cache_key)
+    except Exception as e:
+        logger.error(f"Error generating persona with LLM: {e}")
+        raise Exception(f"Failed to generate persona using LLM: {e}")
+
+async def _with_timeout(stage, username, timeout, awaitable):
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{stage} for {username} timed out after {timeout}s")
+
+async def generate_persona_for_user_async(reddit, username, google_api_key, limit=None, scrape_timeout=None,
+                                          llm_timeout=None, **generation_options):
+    """Scrapes a user and generates their persona without blocking the event loop.
+
+    This is the entry point for async services: many calls can share one
+    event loop, one asyncpraw client (see src.async_reddit) and the
+    pooled Gemini model. Each stage can be given its own timeout in
+    seconds (scrape_timeout, llm_timeout); when one expires the stage is
+    cancelled and TimeoutError is raised. Cancelling the calling task
+    cancels whichever stage is running. generation_options are passed to
+    generate_enhanced_persona_async.
+    """
+    scraped_data = await _with_timeout(
+        "Scraping", username, scrape_timeout, scrape_redditor_data_async(reddit, username, limit=limit)
+    )
+    if not scraped_data['comments'] and not scraped_data['posts']:
+        raise ValueError(f"No comments or posts found for {username}")
+    persona = await _with_timeout(
+        "Persona generation", username, llm_timeout,
+        generate_enhanced_persona_async(scraped_data, username, google_api_key, **generation_options)
+    )
+    return scraped_data, persona
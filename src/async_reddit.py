@@ -0,0 +1,50 @@
+import asyncio
+import asyncpraw
+import asyncprawcore
+import logging
+import time
+from src.rate_limiter import backoff_delay, get_default_scheduler
+from src.run_log import record_stage
+
+logger = logging.getLogger(__name__)
+
+class AsyncScheduledRequestor(asyncprawcore.Requestor):
+    """asyncpraw counterpart of ScheduledRequestor: waits for the shared bucket on the event loop."""
+
+    def __init__(self, *args, bucket=None, max_retries=5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bucket = bucket
+        self.max_retries = max_retries
+
+    async def request(self, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire_async()
+            start = time.perf_counter()
+            response = await super().request(*args, **kwargs)
+            record_stage('reddit_request', time.perf_counter() - start, status=response.status)
+            remaining = response.headers.get('x-ratelimit-remaining')
+            reset = response.headers.get('x-ratelimit-reset')
+            if remaining is not None and reset is not None:
+                self.bucket.limit_to(float(remaining), float(reset))
+            if response.status != 429 or attempt == self.max_retries:
+                return response
+            response.release()
+            delay = backoff_delay(attempt, retry_after=response.headers.get('retry-after'))
+            logger.warning(f"Reddit rate limited, retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+def initialize_async_reddit(client_id, client_secret, user_agent, scheduler=None):
+    """Returns an asyncpraw Reddit instance that shares the process-wide Reddit quota.
+
+    Create it inside the event loop that will use it (e.g. on application
+    startup) and `await reddit.close()` on shutdown; its HTTP session and
+    OAuth token are then reused by every request served by that loop.
+    """
+    scheduler = scheduler or get_default_scheduler()
+    return asyncpraw.Reddit(
+        client_id=client_id,
+        client_secret=client_secret,
+        user_agent=user_agent,
+        requestor_class=AsyncScheduledRequestor,
+        requestor_kwargs={'bucket': scheduler.reddit_bucket(client_id), 'max_retries': scheduler.max_retries}
+    )
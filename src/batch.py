@@ -0,0 +1,277 @@
+"""Headless batch persona generation for lists of Reddit users.
+
+Usage:
+    python -m src.batch users.txt --output personas.jsonl
+
+users.txt holds one profile URL or username per line. Credentials are read
+from the REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT and
+GOOGLE_API_KEY environment variables unless given as options.
+
+Scraping and LLM generation run in separate worker pools connected by a
+bounded queue, each with its own rate limit. Every finished user is
+recorded in a progress journal, so an interrupted run picks up where it
+stopped when started again with the same arguments.
+
+With --history, every persona is also stored as a new version in a
+persona history database. Users that already have a stored persona are
+then refreshed from their activity since it was generated, instead of
+from their whole history (see src.persona_history).
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from src.clients import get_listing_client, get_reddit
+from src.enhanced_persona_generator import generate_enhanced_persona, generate_fast_persona
+from src.local_analysis import HistoryStats
+from src.metrics import prometheus_text
+from src.persona_history import PersonaHistory, apply_update, newest_item_utc, update_since
+from src.prompt_builder import DEFAULT_TOKEN_BUDGET, select_from_stream
+from src.rate_limiter import TokenBucket
+from src.reddit_scraper import extract_username_from_url, iter_redditor_items, scrape_redditor_data
+from src.report import REPORT_FORMATS, write_report
+from src.run_log import LOG_FORMAT
+
+_DONE = object()
+
+def read_usernames(path):
+    """Reads profile URLs or bare usernames, one per line, skipping blanks, comments and repeats."""
+    usernames = []
+    seen = set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            username = extract_username_from_url(line) if 'reddit.com' in line else line.split('/')[-1]
+            if username and username.lower() not in seen:
+                seen.add(username.lower())
+                usernames.append(username)
+    return usernames
+
+def read_journal(path):
+    """Returns the usernames the journal records as successfully completed."""
+    completed = set()
+    if not os.path.exists(path):
+        return completed
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a crash mid-write
+                continue
+            if entry.get('status') == 'ok':
+                completed.add(entry['username'].lower())
+    return completed
+
+class BatchRunner:
+    """Runs the scrape -> generate pipeline over many users."""
+
+    def __init__(self, args):
+        self.args = args
+        # Per-stage caps on top of the process-wide API quotas enforced by the rate-limit scheduler
+        self.scrape_limiter = TokenBucket(args.scrape_rpm, burst=1) if args.scrape_rpm else None
+        self.llm_limiter = TokenBucket(args.llm_rpm, burst=1) if args.llm_rpm else None
+        self.usernames = queue.Queue()
+        self.scraped = queue.Queue(maxsize=max(1, 2 * args.llm_workers))
+        self.write_lock = threading.Lock()
+        self.reports = None
+        self.history = PersonaHistory(args.history) if args.history else None
+        self.succeeded = 0
+        self.failed = 0
+
+    def _reddit(self):
+        if self.args.direct_listings:
+            # Thread-safe, so all scrape workers share its connection pool
+            return get_listing_client(self.args.client_id, self.args.client_secret, self.args.user_agent)
+        # PRAW instances are not thread-safe; get_reddit keeps one per scrape worker thread
+        return get_reddit(self.args.client_id, self.args.client_secret, self.args.user_agent)
+
+    def _record(self, username, persona=None, error=None, counts=None):
+        """Appends to the output before the journal, so a crash can only cause a duplicate, never a loss."""
+        with self.write_lock:
+            if persona is not None:
+                self.output.write(json.dumps({'username': username, 'persona': persona, **counts}) + "\n")
+                self.output.flush()
+                os.fsync(self.output.fileno())
+                if self.reports is not None:
+                    write_report(self.reports, persona, username, self.args.report_format)
+                    self.reports.flush()
+                self.succeeded += 1
+                entry = {'username': username, 'status': 'ok'}
+            else:
+                self.failed += 1
+                entry = {'username': username, 'status': 'failed', 'error': error}
+            self.journal.write(json.dumps(entry) + "\n")
+            self.journal.flush()
+            os.fsync(self.journal.fileno())
+
+    def _scrape_worker(self):
+        while True:
+            username = self.usernames.get()
+            if username is _DONE:
+                return
+            previous = None
+            features = None
+            newest_utc = None
+            try:
+                if self.scrape_limiter:
+                    self.scrape_limiter.acquire()
+                if self.history is not None:
+                    previous = self.history.latest(username)
+                if previous is not None:
+                    scraped_data = scrape_redditor_data(self._reddit(), username, limit=self.args.limit, concurrent=True,
+                                                        since_utc=update_since(previous))
+                elif self.args.chunked:
+                    scraped_data = scrape_redditor_data(self._reddit(), username, limit=self.args.limit, concurrent=True)
+                else:
+                    # Only the items a prompt can use are held while waiting for an LLM worker; the local
+                    # statistics and counts are taken from every item as it streams past. Twice the prompt
+                    # budget is kept so the spam and repeat filter can drop items and still fill the prompt.
+                    stats = HistoryStats()
+                    items = iter_redditor_items(self._reddit(), username, limit=self.args.limit, concurrent=True)
+                    scraped_data, _ = select_from_stream(stats.observe(items), token_budget=2 * DEFAULT_TOKEN_BUDGET)
+                    features = stats.features()
+                    # The newest item may not be among the kept ones; history updates start from this
+                    newest_utc = stats.last_utc
+            except Exception as e:
+                print(f"Scrape failed for {username}: {e}", file=sys.stderr)
+                self._record(username, error=f"scrape: {e}")
+                continue
+            if previous is None and not scraped_data['comments'] and not scraped_data['posts']:
+                self._record(username, error="no public comments or posts")
+                continue
+            if newest_utc is None:
+                newest_utc = newest_item_utc(scraped_data)
+            self.scraped.put((username, scraped_data, previous, features, newest_utc))
+
+    def _llm_worker(self):
+        while True:
+            job = self.scraped.get()
+            if job is _DONE:
+                return
+            username, scraped_data, previous, features, newest_utc = job
+            if features is not None:
+                counts = {'comments': features['activity'].get('comments', 0), 'posts': features['activity'].get('posts', 0)}
+            else:
+                counts = {'comments': len(scraped_data['comments']), 'posts': len(scraped_data['posts'])}
+            try:
+                if self.llm_limiter:
+                    self.llm_limiter.acquire()
+                if previous is not None:
+                    entry = apply_update(self.history, username, previous, scraped_data, self.args.google_api_key)
+                    persona = entry['persona']
+                    counts.update(version=entry['version'], mode=entry['mode'] if entry is not previous else 'unchanged')
+                elif self.args.fast:
+                    persona = generate_fast_persona(scraped_data, username, features)
+                else:
+                    persona = generate_enhanced_persona(
+                        scraped_data, username, self.args.google_api_key, chunked=self.args.chunked, features=features
+                    )
+                if previous is None and self.history is not None:
+                    entry = self.history.add(username, persona, newest_utc, 'full',
+                                             counts['comments'] + counts['posts'])
+                    counts.update(version=entry['version'], mode='full')
+            except Exception as e:
+                print(f"Generation failed for {username}: {e}", file=sys.stderr)
+                self._record(username, error=f"generate: {e}")
+                continue
+            self._record(username, persona=persona, counts=counts)
+
+    def run(self, usernames):
+        total = len(usernames)
+        start = time.monotonic()
+        if self.args.reports == '-':
+            self.reports = sys.stdout
+        elif self.args.reports:
+            self.reports = open(self.args.reports, 'a', encoding='utf-8')
+        try:
+            self._run(usernames, total, start)
+        finally:
+            if self.reports not in (None, sys.stdout):
+                self.reports.close()
+        self._report(total, start)
+
+    def _run(self, usernames, total, start):
+        with open(self.args.output, 'a', encoding='utf-8') as self.output, \
+                open(self.args.journal, 'a', encoding='utf-8') as self.journal:
+            scrapers = [threading.Thread(target=self._scrape_worker, daemon=True) for _ in range(self.args.scrape_workers)]
+            generators = [threading.Thread(target=self._llm_worker, daemon=True) for _ in range(self.args.llm_workers)]
+            for worker in scrapers + generators:
+                worker.start()
+            for username in usernames:
+                self.usernames.put(username)
+            for _ in scrapers:
+                self.usernames.put(_DONE)
+
+            for worker in scrapers:
+                worker.join(timeout=self.args.report_interval)
+                while worker.is_alive():
+                    self._report(total, start)
+                    worker.join(timeout=self.args.report_interval)
+            for _ in generators:
+                self.scraped.put(_DONE)
+            for worker in generators:
+                worker.join()
+
+    def _report(self, total, start):
+        elapsed = time.monotonic() - start
+        done = self.succeeded + self.failed
+        rate = done / elapsed * 60 if elapsed else 0.0
+        print(f"{done}/{total} users ({self.succeeded} ok, {self.failed} failed) "
+              f"in {elapsed:.0f}s - {rate:.1f} users/min", file=sys.stderr)
+        if self.args.metrics_file:
+            # Replaced atomically so a Prometheus textfile collector never reads a partial file
+            temp_path = self.args.metrics_file + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(prometheus_text())
+            os.replace(temp_path, self.args.metrics_file)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Reddit user personas for a list of users.")
+    parser.add_argument('input', help="File with one Reddit profile URL or username per line")
+    parser.add_argument('--output', default='personas.jsonl', help="JSONL file personas are appended to")
+    parser.add_argument('--journal', help="Progress journal used to resume (default: <output>.journal)")
+    parser.add_argument('--limit', type=int, default=100, help="Comments and posts to scrape per user")
+    parser.add_argument('--chunked', action='store_true', help="Use chunked map-reduce generation")
+    parser.add_argument('--fast', action='store_true', help="Compute personas locally without the LLM")
+    parser.add_argument('--history', help="Persona history database; users already in it are updated from new activity only")
+    parser.add_argument('--direct-listings', action='store_true',
+                        help="Read listings from Reddit's JSON API directly instead of through PRAW (less CPU per item)")
+    parser.add_argument('--scrape-workers', type=int, default=4)
+    parser.add_argument('--llm-workers', type=int, default=4)
+    parser.add_argument('--scrape-rpm', type=float, help="Max users scraped per minute")
+    parser.add_argument('--llm-rpm', type=float, help="Max persona generations started per minute")
+    parser.add_argument('--report-interval', type=float, default=10.0, help="Seconds between progress reports")
+    parser.add_argument('--reports', help="Also write a readable report per user to this file ('-' for stdout)")
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='txt', help="Format of --reports")
+    parser.add_argument('--metrics-file', help="Write stage timings and counts in Prometheus text format at every report")
+    parser.add_argument('--client-id', default=os.environ.get('REDDIT_CLIENT_ID'))
+    parser.add_argument('--client-secret', default=os.environ.get('REDDIT_CLIENT_SECRET'))
+    parser.add_argument('--user-agent', default=os.environ.get('REDDIT_USER_AGENT', 'PersonaGenerator/2.0'))
+    parser.add_argument('--google-api-key', default=os.environ.get('GOOGLE_API_KEY'))
+    args = parser.parse_args(argv)
+    if not all([args.client_id, args.client_secret]) or not (args.google_api_key or args.fast):
+        parser.error("Reddit and Google credentials are required (options or environment variables)")
+    if args.history and args.fast:
+        parser.error("--history needs LLM personas and cannot be combined with --fast")
+    args.journal = args.journal or args.output + '.journal'
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    usernames = read_usernames(args.input)
+    completed = read_journal(args.journal)
+    pending = [username for username in usernames if username.lower() not in completed]
+    print(f"{len(usernames)} users in input, {len(usernames) - len(pending)} already done, {len(pending)} to process",
+          file=sys.stderr)
+    BatchRunner(args).run(pending)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+import heapq
+import math
+from collections import Counter
+from src.local_analysis import STOPWORDS, tokenize
+from src.prompt_builder import clean_text
+from src.records import column
+
+def _terms(text):
+    return [t for t in tokenize(clean_text(text)) if t not in STOPWORDS and len(t) > 2]
+
+class CitationIndex:
+    """In-memory BM25 index over one user's comments and posts.
+
+    The index is built once per persona (one pass over the items) and then
+    answers each persona statement with its best-supporting items. Scores
+    are precomputed per posting and a query only walks the postings of its
+    own terms, so lookups stay in the low milliseconds even for histories
+    of thousands of items.
+    """
+
+    def __init__(self, scraped_data, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.items = []
+        self.postings = {}
+        lengths = []
+        for kind in ('comments', 'posts'):
+            items = scraped_data[kind]
+            if kind == 'comments':
+                texts = column(items, 'body')
+            else:
+                texts = [f"{title} {selftext}" for title, selftext in zip(column(items, 'title'), column(items, 'selftext'))]
+            for item, text in zip(items, texts):
+                counts = Counter(_terms(text))
+                doc_id = len(self.items)
+                self.items.append((kind, item))
+                lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    self.postings.setdefault(term, []).append((doc_id, tf))
+        n_docs = len(self.items)
+        average_length = (sum(lengths) / n_docs) if n_docs else 0.0
+        norms = [k1 * (1 - b + b * length / average_length) if average_length else k1 for length in lengths]
+        # Each posting's BM25 contribution only depends on the document, so it is
+        # computed once here and a query just sums the postings of its terms
+        for term, postings in self.postings.items():
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            self.postings[term] = [
+                (doc_id, idf * tf * (k1 + 1) / (tf + norms[doc_id])) for doc_id, tf in postings
+            ]
+
+    def search(self, statement, k=3):
+        """Returns up to k (score, kind, item) tuples that best support a statement, best first."""
+        scores = {}
+        get = scores.get
+        for term in set(_terms(statement)):
+            for doc_id, impact in self.postings.get(term, ()):
+                scores[doc_id] = get(doc_id, 0.0) + impact
+        best = heapq.nlargest(k, scores.items(), key=lambda entry: entry[1])
+        return [(score, *self.items[doc_id]) for doc_id, score in best]
@@ -0,0 +1,73 @@
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+# Clients kept per registry; the least recently used are dropped beyond this
+MAX_CLIENTS = int(os.environ.get('PERSONA_MAX_CLIENTS', 32))
+
+def credentials_key(kind, *credentials):
+    """A key for pooling by credentials that does not hold them: kind plus a sha256 digest."""
+    digest = hashlib.sha256("\0".join(str(c) for c in credentials).encode('utf-8')).hexdigest()
+    return f"{kind}:{digest}"
+
+class ClientRegistry:
+    """Pool of API clients keyed by their credentials.
+
+    Reusing a client keeps its HTTP session (and PRAW's OAuth token) alive
+    between requests instead of paying for setup, token fetches and new
+    connection handshakes on every run. Credentials are hashed before being
+    used as keys. At most max_clients are kept; the least recently used
+    client is dropped for a new one, and is closed by garbage collection
+    once no caller holds it any more.
+    """
+
+    def __init__(self, max_clients=MAX_CLIENTS):
+        self.clients = OrderedDict()
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+
+    key = staticmethod(credentials_key)
+
+    def get(self, key, factory):
+        """Returns the client stored under key, building it with factory() on first use."""
+        with self.lock:
+            client = self.clients.get(key)
+            if client is None:
+                client = factory()
+                self.clients[key] = client
+                while len(self.clients) > self.max_clients:
+                    self.clients.popitem(last=False)
+            else:
+                self.clients.move_to_end(key)
+            return client
+
+    def invalidate(self, key=None):
+        """Drops one client, or every client when key is None, so the next call builds a fresh one."""
+        with self.lock:
+            if key is None:
+                self.clients.clear()
+            else:
+                self.clients.pop(key, None)
+
+_threads = threading.local()
+# Every live thread's registry, so invalidation reaches them all; a thread's goes away with it
+_thread_registries = weakref.WeakSet()
+_thread_registries_lock = threading.Lock()
+
+def thread_registry():
+    """The calling thread's registry, for clients that must not be shared between threads (like PRAW's)."""
+    registry = getattr(_threads, 'registry', None)
+    if registry is None:
+        registry = _threads.registry = ClientRegistry()
+        with _thread_registries_lock:
+            _thread_registries.add(registry)
+    return registry
+
+def invalidate_threads(key=None):
+    """Drops the client under key, or every client, from every thread's registry."""
+    with _thread_registries_lock:
+        registries = list(_thread_registries)
+    for registry in registries:
+        registry.invalidate(key)
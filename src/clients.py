@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import weakref
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from src.client_registry import ClientRegistry, invalidate_threads, thread_registry
+from src.rate_limiter import ScheduledModel, get_default_scheduler
+from src.reddit_listings import ListingClient
+from src.reddit_scraper import initialize_reddit
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+class KeyedModel:
+    """A GenerativeModel that always calls Gemini with its own API key.
+
+    genai.configure sets one process-wide key, and a GenerativeModel picks
+    up the process-wide client on its first call, so a model built for one
+    key would send its requests with whichever key was configured last.
+    Here the model gets a client of its own instead. gRPC async clients
+    are bound to the event loop they first run on, so async calls use a
+    model per running loop, each with its own client.
+    """
+
+    def __init__(self, model_name, api_key):
+        self.model_name = model_name
+        self.client_options = {'api_key': api_key}
+        self.model = genai.GenerativeModel(model_name)
+        self.model._client = glm.GenerativeServiceClient(client_options=self.client_options)
+        self.loop_models = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_content(self, *args, **kwargs):
+        return self.model.generate_content(*args, **kwargs)
+
+    async def generate_content_async(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            model = self.loop_models.get(loop)
+            if model is None:
+                # A client keeps its loop alive, so the weak keys alone would never let closed loops go
+                for closed in [other for other in self.loop_models if other.is_closed()]:
+                    del self.loop_models[closed]
+                model = self.loop_models[loop] = genai.GenerativeModel(self.model_name)
+                model._async_client = glm.GenerativeServiceAsyncClient(client_options=self.client_options)
+        return await model.generate_content_async(*args, **kwargs)
+
+_registry = ClientRegistry()
+
+def get_reddit(client_id, client_secret, user_agent):
+    """Returns a PRAW instance for these credentials, shared by every call from the calling thread.
+
+    PRAW instances are not thread-safe (their session, rate limiter and
+    token refresh are unlocked), so each thread, e.g. each job worker or
+    each Streamlit script run, keeps its own instance per credentials.
+    """
+    key = ClientRegistry.key('reddit', client_id, client_secret, user_agent)
+    return thread_registry().get(key, lambda: initialize_reddit(client_id, client_secret, user_agent))
+
+def get_gemini_model(google_api_key, model_name=MODEL_NAME):
+    """Returns a shared, rate-limited Gemini model for this API key."""
+    key = ClientRegistry.key('gemini', google_api_key, model_name)
+
+    def build():
+        return ScheduledModel(KeyedModel(model_name, google_api_key), get_default_scheduler(), google_api_key)
+
+    return _registry.get(key, build)
+
+def get_listing_client(client_id, client_secret, user_agent):
+    """Returns a shared direct JSON listing client (see src.reddit_listings) for these credentials."""
+    key = ClientRegistry.key('listings', client_id, client_secret, user_agent)
+    return _registry.get(key, lambda: ListingClient(client_id, client_secret, user_agent))
+
+def invalidate_reddit(client_id, client_secret, user_agent):
+    # The spare instances scrapes use for a second listing (see reddit_scraper) go too
+    for kind in ('reddit', 'reddit-spare'):
+        invalidate_threads(ClientRegistry.key(kind, client_id, client_secret, user_agent))
+    _registry.invalidate(ClientRegistry.key('listings', client_id, client_secret, user_agent))
+
+def invalidate_gemini(google_api_key, model_name=MODEL_NAME):
+    _registry.invalidate(ClientRegistry.key('gemini', google_api_key, model_name))
+
+def invalidate_all():
+    """Drops every pooled client, e.g. after credentials were rotated."""
+    invalidate_threads()
+    _registry.invalidate()
@@ -1,23 +1,40 @@
-import google.generativeai as genai
 import json
+import logging
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.citation_index import CitationIndex
+from src.clients import MODEL_NAME, get_gemini_model
+from src.item_filter import filter_items
+from src.local_analysis import analyze_history, format_features
+from src.persona_cache import persona_cache_key
+from src.persona_merge import merge_partial_personas
+from src.persona_schema import (
+    FIELD_HINTS, LOCAL_FIELDS, PERSONA_FIELDS, REPAIRABLE_FIELDS, coerce_field, fill_defaults, parse_persona_text,
+    persona_generation_config, validate_persona
+)
+from src.prompt_builder import DEFAULT_TOKEN_BUDGET, build_prompt_content, split_into_chunks
+from src.run_log import in_current_context, record_stage, stage
+from src.streaming_json import IncrementalObjectParser
 
-def generate_enhanced_persona(scraped_data, username, google_api_key):
-    """Generates a comprehensive user persona using the Gemini LLM."""
-    genai.configure(api_key=google_api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash')
+logger = logging.getLogger(__name__)
 
-    all_comments = [comment['body'] for comment in scraped_data['comments']]
-    all_posts = []
-    for post in scraped_data['posts']:
-        all_posts.append(post['title'])
-        if post['selftext']:
-            all_posts.append(post['selftext'])
+# Bump whenever PERSONA_PROMPT_TEMPLATE changes so cached personas are not reused
+PROMPT_TEMPLATE_VERSION = 4
+# Per-chunk content budget for chunked (map-reduce) generation
+DEFAULT_CHUNK_TOKENS = 8000
+# Content budget of the follow-up prompt that re-requests invalid fields
+REPAIR_TOKEN_BUDGET = 2000
+# Content budget of the prompt that updates a stored persona from new activity
+DELTA_TOKEN_BUDGET = 2500
+# With less new activity than this an update keeps the stored persona without calling the LLM
+DELTA_MIN_ITEMS = 5
+DELTA_MIN_TOKENS = 200
+# Fields an update may change; the name always stays
+DELTA_FIELDS = tuple(field for field in PERSONA_FIELDS if field != 'name')
 
-    combined_text = " ".join(all_comments + all_posts)
-
-    # Prepare the prompt for the LLM
-    prompt = f"""
+# Prompt sent to the LLM; {username}, {features} and {content} are filled in by build_persona_prompt
+PERSONA_PROMPT_TEMPLATE = """
     Analyze the following Reddit user's comments and posts to generate a detailed user persona.
     The persona should be returned as a JSON object with the following structure:
 
@@ -48,73 +65,473 @@ def generate_enhanced_persona(scraped_data, username, google_api_key):
         "frustrations": ["string"], // List of inferred frustrations
         "common_topics": ["string"], // List of top 5-10 common topics
         "sentiment": "string", // Overall sentiment ("Positive", "Negative", "Neutral")
-        "quote": "string", // A representative quote from their content
-        "citations": [ // Up to 5 relevant citations (comments/posts)
-            {{
-                "id": "integer",
-                "type": "string", // "comment" or "post"
-                "content": "string", // Snippet of the content
-                "permalink": "string", // Full permalink to the Reddit content
-                "score": "integer" // Score of the comment/post
-            }}
-        ]
+        "quote": "string" // A representative quote from their content
     }}
 
     Reddit Username: {username}
 
-    User's Comments:
-    {all_comments}
+    Statistics computed from the user's full history (keep "tier", "sentiment" and "common_topics" consistent with them):
+    {features}
+
+    User's Comments and Posts (one per line, [C] = comment, [P] = post):
+    {content}
+    """
+
+# Follow-up prompt that asks again for only the fields the first answer got wrong
+REPAIR_PROMPT_TEMPLATE = """
+    Analyze the following Reddit user's comments and posts and return a JSON object with only these fields of their user persona:
+    {fields}
+
+    Reddit Username: {username}
+
+    User's Comments and Posts (one per line, [C] = comment, [P] = post):
+    {content}
+    """
+
+# Prompt that sends a stored persona and only the activity since it was generated
+DELTA_PROMPT_TEMPLATE = """
+    Below is an existing user persona for a Reddit user, generated from their earlier activity, followed by the
+    comments and posts they have made since. Return a JSON object with only the persona fields that the new
+    activity changes, each with its complete new value in the same format as in the existing persona.
+    Return {{}} if the new activity does not change anything.
+
+    Reddit Username: {username}
+
+    Existing persona:
+    {persona}
+
+    New comments and posts (one per line, [C] = comment, [P] = post):
+    {content}
+    """
+
+def build_persona_prompt(scraped_data, username, token_budget=DEFAULT_TOKEN_BUDGET, ranking='score', features=None):
+    """Builds the persona prompt and returns it with the prompt statistics.
+
+    features is the analyze_history output to include; it is computed from
+    scraped_data when not given.
+    """
+    content, stats = build_prompt_content(scraped_data, token_budget=token_budget, ranking=ranking)
+    features = features or analyze_history(scraped_data)
+    prompt = PERSONA_PROMPT_TEMPLATE.format(username=username, features=format_features(features), content=content)
+    return prompt, stats
+
+def build_repair_prompt(scraped_data, username, fields, token_budget=REPAIR_TOKEN_BUDGET):
+    """Builds the follow-up prompt that asks for only the given persona fields."""
+    content, _ = build_prompt_content(scraped_data, token_budget=token_budget, ranking='score')
+    hints = "\n    ".join(f'"{field}": {FIELD_HINTS[field]}' for field in fields)
+    return REPAIR_PROMPT_TEMPLATE.format(fields=hints, username=username, content=content)
 
-    User's Posts:
-    {all_posts}
+def build_delta_prompt(persona, new_data, username, token_budget=DELTA_TOKEN_BUDGET):
+    """Builds the prompt that asks how new_data changes persona; returns it with the prompt statistics."""
+    content, stats = build_prompt_content(new_data, token_budget=token_budget, ranking='score')
+    current = json.dumps({field: persona[field] for field in DELTA_FIELDS if field in persona}, indent=2)
+    prompt = DELTA_PROMPT_TEMPLATE.format(username=username, persona=current.replace("\n", "\n    "), content=content)
+    return prompt, stats
 
-    Combined Text for Analysis:
-    {combined_text}
+def check_persona(data):
+    """Validates a parsed answer; returns its valid fields and the invalid ones worth asking for again."""
+    persona, problems = validate_persona(data)
+    if not persona:
+        raise ValueError("Model response did not contain a persona JSON object")
+    return persona, [field for field in problems if field in REPAIRABLE_FIELDS]
+
+def apply_repair(persona, response, fields):
+    """Merges the valid fields of a repair answer into persona."""
+    repaired, still_invalid = validate_persona(parse_persona_text(response.text), fields)
+    if still_invalid:
+        logger.warning(f"Repair answer still had invalid fields ({', '.join(still_invalid)}); using defaults")
+    persona.update(repaired)
+
+def fill_persona_defaults(persona, scraped_data, username, features=None):
+    """Fills fields that are still missing, from local analysis where possible."""
+    if features is None and any(field not in persona for field in LOCAL_FIELDS if field != 'name'):
+        features = analyze_history(scraped_data)
+    return fill_defaults(persona, username, features)
+
+def _repair_persona(model, persona, problems, scraped_data, username, features=None):
+    """Re-requests only the problem fields with one small follow-up prompt, then fills in defaults.
+
+    A failed repair is not fatal: the fields it could not fix get
+    placeholder values instead of failing the whole persona.
     """
+    if problems:
+        logger.warning(f"Persona answer had missing or invalid fields ({', '.join(problems)}); re-requesting only those")
+        try:
+            with stage('repair', repaired=','.join(problems)) as fields:
+                prompt = build_repair_prompt(scraped_data, username, problems)
+                response = model.generate_content(prompt, generation_config=persona_generation_config(problems))
+                fields.update(usage_fields(response))
+            apply_repair(persona, response, problems)
+        except Exception as e:
+            logger.warning(f"Repair request failed, using defaults: {e}")
+    return fill_persona_defaults(persona, scraped_data, username, features)
+
+def usage_fields(response):
+    """Prompt and response token counts from a Gemini response's usage_metadata, when it has one."""
+    usage = getattr(response, 'usage_metadata', None)
+    fields = {}
+    if getattr(usage, 'prompt_token_count', None) is not None:
+        fields['prompt_tokens'] = usage.prompt_token_count
+    if getattr(usage, 'candidates_token_count', None) is not None:
+        fields['response_tokens'] = usage.candidates_token_count
+    return fields
+
+def _citation(citation_id, kind, item, statement=None):
+    citation = {
+        "id": citation_id,
+        "type": "comment" if kind == 'comments' else "post",
+        # Truncate content for brevity
+        "content": (item['body'] if kind == 'comments' else item['title'] + " " + item['selftext'])[:200],
+        "permalink": f"https://www.reddit.com{item['permalink']}",
+        "score": item['score']
+    }
+    if statement:
+        citation["statement"] = statement
+    return citation
+
+def _statements(persona):
+    """The persona statements that citations ground: behaviors, goals, frustrations and the quote."""
+    return (persona.get('behaviors_habits', []) + persona.get('goals_needs', [])
+            + persona.get('frustrations', []) + [persona.get('quote', '')])
+
+def _cite_statements(citations, statements, scraped_data, max_citations=10):
+    """Appends a citation from scraped_data for each statement, skipping items that are already cited."""
+    index = CitationIndex(scraped_data)
+    cited = {(citation['type'], citation['permalink']) for citation in citations}
+    for statement in statements:
+        if not statement or len(citations) >= max_citations:
+            continue
+        for _, kind, item in index.search(statement, k=3):
+            citation = _citation(len(citations) + 1, kind, item, statement)
+            if (citation['type'], citation['permalink']) not in cited:
+                cited.add((citation['type'], citation['permalink']))
+                citations.append(citation)
+                break
+    return citations
+
+def build_citations(persona, scraped_data, max_citations=10):
+    """Grounds the persona's statements in the items that best support them.
+
+    Each behavior, goal, frustration and the quote is looked up in a BM25
+    index over the user's items and cited with its best match that is not
+    already cited. Falls back to the first comments and posts when nothing
+    in the history matches.
+    """
+    citations = _cite_statements([], _statements(persona), scraped_data, max_citations)
+    if citations:
+        return citations
+
+    for kind in ('comments', 'posts'):
+        for item in scraped_data[kind][:5]: # Limit to 5 of each
+            citations.append(_citation(len(citations) + 1, kind, item))
+    return citations
+
+def _generate_chunked(model, chunks, username, chunk_tokens, max_concurrency, features):
+    """Map-reduce generation: one partial persona per chunk, merged locally."""
+    logger.info(f"Chunked mode: {len(chunks)} chunks of up to ~{chunk_tokens} tokens, "
+                f"{max_concurrency} concurrent requests")
+
+    def analyze(chunk):
+        prompt, _ = build_persona_prompt(chunk, username, token_budget=chunk_tokens, ranking='recency', features=features)
+        with stage('llm_chunk') as fields:
+            response = model.generate_content(prompt, generation_config=persona_generation_config())
+            fields.update(usage_fields(response))
+        # Partials are merged as they are; only the merged persona is validated and repaired
+        return parse_persona_text(response.text)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        partials = list(executor.map(in_current_context(analyze), chunks))
+    weights = [len(chunk['comments']) + len(chunk['posts']) for chunk in chunks]
+    return merge_partial_personas(partials, weights)
+
+def lookup_persona_cache(cache, scraped_data, username, options):
+    """Returns the cache key for this request and the cached persona, if any."""
+    cache_key = persona_cache_key(scraped_data, username, MODEL_NAME, PROMPT_TEMPLATE_VERSION, options)
+    cached_persona = cache.get(cache_key)
+    if cached_persona is not None:
+        logger.info(f"Persona cache hit for {username}")
+    return cache_key, cached_persona
+
+def filter_for_prompt(scraped_data):
+    """The items prompts are built from: scraped_data without spam and near-duplicates (see src.item_filter)."""
+    with stage('filter') as fields:
+        filtered, filter_stats = filter_items(scraped_data)
+        fields.update(items=filter_stats['items'], kept=filter_stats['kept'],
+                      tokens_removed=filter_stats['tokens_removed'])
+    if filter_stats['removed']:
+        reasons = ', '.join(f"{count} {reason}" for reason, count in filter_stats['removed'].items())
+        logger.info(f"Dropped {filter_stats['items'] - filter_stats['kept']} of {filter_stats['items']} items "
+                    f"({reasons}), ~{filter_stats['tokens_removed']} tokens")
+    return filtered
+
+def prepare_persona_prompt(scraped_data, username, token_budget=DEFAULT_TOKEN_BUDGET, ranking='score', chunked=False,
+                           chunk_tokens=DEFAULT_CHUNK_TOKENS, dedupe=True, features=None):
+    """Everything generate_enhanced_persona does before calling the LLM.
+
+    Filters the items (with dedupe), computes the local features unless
+    given and builds the prompt. Returns a dict with 'prompt_data' (the
+    items prompts are built from), 'features', 'chunks' (the chunk list
+    when chunked mode splits the history, else empty) and 'prompt' (the
+    single prompt, None when there are chunks).
+    """
+    prompt_data = filter_for_prompt(scraped_data) if dedupe else scraped_data
+    chunks = split_into_chunks(prompt_data, chunk_tokens) if chunked else []
+    if len(chunks) > 1:
+        return {'prompt_data': prompt_data, 'features': features or analyze_history(scraped_data), 'chunks': chunks,
+                'prompt': None}
+    with stage('prompt'):
+        features = features or analyze_history(scraped_data)
+        prompt, prompt_stats = build_persona_prompt(prompt_data, username, token_budget=token_budget, ranking=ranking,
+                                                    features=features)
+    logger.info(f"Prompt content: {prompt_stats['items_included']}/{prompt_stats['items_total']} items, "
+                f"~{prompt_stats['tokens_before']} tokens before deduplication, ~{prompt_stats['tokens_after']} after")
+    return {'prompt_data': prompt_data, 'features': features, 'chunks': [], 'prompt': prompt}
+
+def finalize_persona(persona, scraped_data, cache=None, cache_key=None):
+    """Everything generate_enhanced_persona does after the persona is complete: cites it and caches it."""
+    with stage('citations'):
+        persona['citations'] = build_citations(persona, scraped_data)
+    if cache is not None:
+        cache.put(cache_key, persona)
+    return persona
+
+def generate_enhanced_persona(scraped_data, username, google_api_key, token_budget=DEFAULT_TOKEN_BUDGET, ranking='score',
+                              chunked=False, chunk_tokens=DEFAULT_CHUNK_TOKENS, max_concurrency=4, model=None, cache=None,
+                              dedupe=True, features=None):
+    """Generates a comprehensive user persona using the Gemini LLM.
+
+    The user's items are included once each, cleaned and trimmed to
+    token_budget by prompt_builder; see build_prompt_content for the
+    ranking options.
+
+    With chunked=True a history that does not fit in one chunk_tokens
+    prompt is split into chunks that are analyzed concurrently (at most
+    max_concurrency requests in flight) and merged by
+    merge_partial_personas without another LLM call. Every item is
+    analyzed, so token_budget and ranking are not applied in this mode.
+
+    With dedupe=True (the default) deleted, link-only and repeated items
+    are dropped before any prompt is built (see src.item_filter). The
+    local statistics and citations still come from every item.
+
+    features is the analyze_history output for the user's whole history,
+    for when scraped_data holds only part of it (e.g. the items
+    select_from_stream kept from a stream counted by HistoryStats). By
+    default it is computed from scraped_data.
+
+    model may be any object with a GenerativeModel-compatible
+    generate_content method; by default the pooled model for
+    google_api_key is used (see src.clients). It is wrapped in a
+    ScheduledModel, so calls queue for the shared Gemini quota and
+    rate-limit errors are retried instead of failing the request.
+
+    The model is asked for JSON matching the persona schema (see
+    src.persona_schema). The answer is parsed tolerantly and validated;
+    fields that are missing or invalid are re-requested together in one
+    small follow-up prompt rather than regenerating the whole persona,
+    and whatever is still missing gets a default.
+
+    cache is an optional PersonaCache. Personas are cached under a hash of
+    the input items, username, model name, prompt template version and
+    generation options, and a hit is returned without calling the LLM.
+    """
+    cache_key = None
+    if cache is not None:
+        options = {'token_budget': token_budget, 'ranking': ranking, 'chunked': chunked, 'chunk_tokens': chunk_tokens,
+                   'dedupe': dedupe}
+        cache_key, cached_persona = lookup_persona_cache(cache, scraped_data, username, options)
+        if cached_persona is not None:
+            return cached_persona
+
+    if model is None:
+        model = get_gemini_model(google_api_key)
 
     try:
-        response = model.generate_content(prompt)
-        persona_json_str = response.text
-        
-        # Clean the response to ensure it's valid JSON
-        # Sometimes the LLM might add markdown or extra text
-        persona_json_str = persona_json_str.strip()
-        if persona_json_str.startswith("```json"):
-            persona_json_str = persona_json_str[len("```json"):].strip()
-        if persona_json_str.endswith("```"):
-            persona_json_str = persona_json_str[:-len("```")].strip()
-
-        persona = json.loads(persona_json_str)
-
-        # Ensure citations are properly formatted and limited
-        citations = []
-        citation_id = 1
-        for comment in scraped_data['comments'][:5]: # Limit to 5 comments
-            citations.append({
-                "id": citation_id,
-                "type": "comment",
-                "content": comment['body'][:200], # Truncate content for brevity
-                "permalink": f"https://www.reddit.com{comment['permalink']}",
-                "score": comment['score']
-            })
-            citation_id += 1
-        for post in scraped_data['posts'][:5]: # Limit to 5 posts
-            citations.append({
-                "id": citation_id,
-                "type": "post",
-                "content": (post['title'] + " " + post['selftext'])[:200], # Truncate content
-                "permalink": f"https://www.reddit.com{post['permalink']}",
-                "score": post['score']
-            })
-            citation_id += 1
-        persona['citations'] = citations
-
-        return persona
+        request = prepare_persona_prompt(scraped_data, username, token_budget, ranking, chunked, chunk_tokens, dedupe,
+                                         features)
+        features = request['features']
+        if request['chunks']:
+            chunks = request['chunks']
+            with stage('llm', chunks=len(chunks)):
+                merged = _generate_chunked(model, chunks, username, chunk_tokens, max_concurrency, features)
+            with stage('parse'):
+                persona, problems = check_persona(merged)
+        else:
+            with stage('llm') as fields:
+                response = model.generate_content(request['prompt'], generation_config=persona_generation_config())
+                fields.update(usage_fields(response))
+            with stage('parse'):
+                persona, problems = check_persona(parse_persona_text(response.text))
+        persona = _repair_persona(model, persona, problems, request['prompt_data'], username, features)
+        return finalize_persona(persona, scraped_data, cache, cache_key)
     except Exception as e:
-        print(f"Error generating persona with LLM: {e}")
+        logger.error(f"Error generating persona with LLM: {e}")
         # Fallback or raise an error
         raise Exception(f"Failed to generate persona using LLM: {e}")
 
+def generate_fast_persona(scraped_data, username, features=None):
+    """Builds a persona from local features only, with no LLM call.
+
+    Fields that need language understanding (age, occupation, personality,
+    motivations, goals, frustrations) are left unknown or empty.
+    """
+    if features is None:
+        with stage('local_analysis', items=len(scraped_data['comments']) + len(scraped_data['posts'])):
+            features = analyze_history(scraped_data)
+    activity = features['activity']
+    behaviors = []
+    if features['subreddits']:
+        top = features['subreddits'][0]
+        behaviors.append(f"Most active in r/{top['name']} ({top['share']:.0%} of activity)")
+    if activity['items']:
+        behaviors.append(f"Averages {activity['items_per_day']} posts/comments per day")
+        behaviors.append("Mostly comments on others' posts" if activity['comments'] >= activity['posts']
+                         else "Mostly starts new posts")
+    if features['active_hours_utc']:
+        behaviors.append(f"Usually active around {features['active_hours_utc'][0]:02d}:00 UTC")
+    persona = {
+        'name': username.capitalize(),
+        'age': 'Unknown',
+        'occupation': 'Unknown',
+        'status': 'Unknown',
+        'location': 'Unknown',
+        'tier': features['tier'],
+        'archetype': 'Unknown',
+        'personality': {},
+        'motivations': {},
+        'behaviors_habits': behaviors,
+        'goals_needs': [],
+        'frustrations': [],
+        'common_topics': features['common_topics'],
+        'sentiment': features['sentiment'],
+        'quote': features['quote'],
+        'citations': []
+    }
+    persona['citations'] = build_citations(persona, scraped_data)
+    return persona
+
+def _update_citations(previous, persona, new_data, max_citations=10):
+    """Keeps the stored citations that still apply and cites statements that have none from new_data."""
+    statements = _statements(persona)
+    # Citations without a statement are the fallback ones, which never go stale
+    kept = [citation for citation in previous if 'statement' not in citation or citation['statement'] in statements]
+    citations = [dict(citation, id=i + 1) for i, citation in enumerate(kept[:max_citations])]
+    cited = {citation.get('statement') for citation in citations}
+    return _cite_statements(citations, [s for s in statements if s not in cited], new_data, max_citations)
+
+def update_enhanced_persona(persona, new_data, username, google_api_key, min_items=DELTA_MIN_ITEMS,
+                            min_tokens=DELTA_MIN_TOKENS, token_budget=DELTA_TOKEN_BUDGET, model=None, dedupe=True):
+    """Updates a previously generated persona from only the activity that came after it.
+
+    new_data holds just the items created since the stored persona was
+    generated (see src.persona_history). Rather than resending the whole
+    history, one prompt carries the stored persona and the new items, cut
+    to token_budget, and the model answers with only the fields that
+    change. Those are validated like a full answer; an invalid one keeps
+    its stored value. Citations of statements that are still in the
+    persona are kept and new statements are cited from new_data.
+
+    With dedupe=True the new items are filtered like in
+    generate_enhanced_persona first. With fewer than min_items new items
+    left or under min_tokens tokens of new content, no LLM call is made
+    and the persona is returned as it was.
+
+    Returns (persona, update), where update is {'mode': 'delta' or
+    'skipped', 'new_items': n, 'changed': [fields that changed]}.
+    """
+    new_items = len(new_data['comments']) + len(new_data['posts'])
+    update = {'mode': 'skipped', 'new_items': new_items, 'changed': []}
+    try:
+        prompt_data = filter_for_prompt(new_data) if dedupe and new_items else new_data
+        with stage('prompt', mode='delta', items=new_items):
+            prompt, prompt_stats = build_delta_prompt(persona, prompt_data, username, token_budget)
+        if prompt_stats['items_total'] < min_items or prompt_stats['tokens_after'] < min_tokens:
+            logger.info(f"Only {prompt_stats['items_total']} new items (~{prompt_stats['tokens_after']} tokens) for {username}; "
+                        f"keeping the stored persona")
+            return persona, update
+
+        if model is None:
+            model = get_gemini_model(google_api_key)
+        with stage('llm', mode='delta') as fields:
+            response = model.generate_content(prompt, generation_config=persona_generation_config(DELTA_FIELDS, required=False))
+            fields.update(usage_fields(response))
+        with stage('parse'):
+            answer = parse_persona_text(response.text)
+            changes, invalid = validate_persona(answer, [field for field in DELTA_FIELDS if field in answer])
+        if invalid:
+            logger.warning(f"Update answer had invalid fields ({', '.join(invalid)}); keeping their stored values")
+
+        updated = dict(persona)
+        updated.update(changes)
+        update['mode'] = 'delta'
+        update['changed'] = [field for field in changes if changes[field] != persona.get(field)]
+        with stage('citations'):
+            updated['citations'] = _update_citations(persona.get('citations', []), updated, new_data)
+        return updated, update
+    except Exception as e:
+        logger.error(f"Error updating persona with LLM: {e}")
+        raise Exception(f"Failed to update persona using LLM: {e}")
+
+def stream_enhanced_persona(scraped_data, username, google_api_key, token_budget=DEFAULT_TOKEN_BUDGET, ranking='score',
+                            model=None, cache=None, dedupe=True):
+    """Generates a persona like generate_enhanced_persona, yielding fields as the LLM streams them.
+
+    Yields (field, value) pairs in the order the model closes them, e.g.
+    ('name', ...) long before the full response has arrived, and finally
+    ('citations', [...]). dict() of the yielded pairs is the same persona
+    generate_enhanced_persona returns. Chunked mode is not available here
+    because partial personas can only be merged once all chunks finish.
+    """
+    cache_key = None
+    if cache is not None:
+        options = {'token_budget': token_budget, 'ranking': ranking, 'chunked': False, 'chunk_tokens': DEFAULT_CHUNK_TOKENS,
+                   'dedupe': dedupe}
+        cache_key, cached_persona = lookup_persona_cache(cache, scraped_data, username, options)
+        if cached_persona is not None:
+            yield from cached_persona.items()
+            return
+
+    if model is None:
+        model = get_gemini_model(google_api_key)
+
+    persona = {}
+    try:
+        request = prepare_persona_prompt(scraped_data, username, token_budget, ranking, dedupe=dedupe)
+        parser = IncrementalObjectParser(strict=False)
+        start = time.perf_counter()
+        usage = {}
+        for chunk in model.generate_content(request['prompt'], stream=True, generation_config=persona_generation_config()):
+            # Each chunk carries the running usage; the last one has the totals
+            usage = usage_fields(chunk) or usage
+            for field, value in parser.feed(chunk.text):
+                # Unknown keys are dropped and invalid values held back for the repair request
+                value = coerce_field(field, value) if field in PERSONA_FIELDS else None
+                if value is None:
+                    continue
+                if not persona:
+                    record_stage('llm_first_field', time.perf_counter() - start)
+                persona[field] = value
+                yield field, value
+        if not persona:
+            raise ValueError("Model response did not contain a persona JSON object")
+        if not parser.finished:
+            logger.warning("Streamed response ended before the JSON object was complete")
+        # Includes the time the caller spent handling the yielded fields
+        record_stage('llm', time.perf_counter() - start, streamed=True, **usage)
+    except Exception as e:
+        logger.error(f"Error generating persona with LLM: {e}")
+        raise Exception(f"Failed to generate persona using LLM: {e}")
+
+    problems = [field for field in REPAIRABLE_FIELDS if field not in persona]
+    repaired = _repair_persona(model, dict(persona), problems, request['prompt_data'], username, request['features'])
+    for field, value in repaired.items():
+        if field not in persona:
+            persona[field] = value
+            yield field, value
+
+    finalize_persona(persona, scraped_data, cache, cache_key)
+    yield 'citations', persona['citations']
+
 if __name__ == '__main__':
     # Example usage with dummy data
     dummy_scraped_data = {
@@ -0,0 +1,171 @@
+import re
+import zlib
+from collections import Counter
+from src.prompt_builder import clean_text, estimate_tokens
+from src.records import fields_of, to_record
+
+REMOVED_MARKERS = ('[deleted]', '[removed]')
+# Items with fewer words than this once links are stripped are link-only
+MIN_WORDS = 3
+# A line repeated in this many items is boilerplate (signatures, bot footers) and is cut from each of them
+BOILERPLATE_MIN_ITEMS = 5
+BOILERPLATE_MIN_CHARS = 20
+# MinHash signature of word 3-grams, split into LSH bands; items are near-duplicates
+# when their estimated Jaccard similarity reaches NEAR_DUPLICATE_THRESHOLD
+SHINGLE_WORDS = 3
+BANDS = 8
+ROWS = 4
+NEAR_DUPLICATE_THRESHOLD = 0.7
+_BINS = range(BANDS * ROWS)
+_BIN_MASK = BANDS * ROWS - 1
+
+_WORD = re.compile(r"[a-z0-9']+")
+_URL = re.compile(r'https?://|www\.')
+_BODY = fields_of('body')
+_POST_TEXT = fields_of('title', 'selftext')
+_POST_LINK = fields_of('selftext', 'permalink', 'url')
+_SCORE = fields_of('score')
+
+def _raw_text(kind, item):
+    if kind == 'comments':
+        return _BODY(item)
+    title, selftext = _POST_TEXT(item)
+    return f"{title}\n{selftext}"
+
+def _is_link_post(kind, item):
+    if kind != 'posts':
+        return False
+    selftext, permalink, url = _POST_LINK(item)
+    return not selftext.strip() and permalink not in url
+
+def _signature(words):
+    """One-permutation MinHash of the word shingles.
+
+    Each shingle is hashed once (CRC32, so results do not depend on the
+    interpreter's hash seed); the low bits of the hash pick one of
+    BANDS * ROWS bins, which keeps the smallest hash that falls into it.
+    Bins no shingle fell into are None.
+    """
+    shingles = map(' '.join, zip(*(words[i:] for i in range(SHINGLE_WORDS))))
+    hashes = sorted(map(zlib.crc32, map(str.encode, shingles)), reverse=True)
+    # Sorted largest first, so the value left in each bin is its smallest
+    bins = dict(zip(map(_BIN_MASK.__and__, hashes), hashes))
+    return list(map(bins.get, _BINS))
+
+def _similarity(a, b):
+    """Estimated Jaccard similarity: the share of bins filled in either signature that hold the same hash."""
+    filled = matching = 0
+    for x, y in zip(a, b):
+        if x is not None or y is not None:
+            filled += 1
+            matching += x == y
+    return matching / filled
+
+def _strip_lines(text, boilerplate):
+    return "\n".join(line for line in text.split("\n") if line.strip().lower() not in boilerplate)
+
+def _replace_text(kind, item, boilerplate):
+    """item with boilerplate lines and removed-markers cut from its text, or item itself when nothing changes."""
+    if kind == 'comments':
+        original = _BODY(item)
+        body = _strip_lines(original, boilerplate)
+        return item if body == original else to_record(kind, dict(item, body=body))
+    original = _POST_TEXT(item)[1]
+    selftext = '' if original.strip() in REMOVED_MARKERS else original
+    selftext = _strip_lines(selftext, boilerplate)
+    return item if selftext == original else to_record(kind, dict(item, selftext=selftext))
+
+def filter_items(scraped_data, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Drops spam, junk and repeats from a scraped history before it is turned into prompts.
+
+    Removed are comments whose body is empty, [deleted] or [removed],
+    link-only items (fewer than MIN_WORDS words besides their links),
+    exact repeats of another item's text (after lowercasing and dropping
+    punctuation, links and markdown) and near-duplicates found with
+    MinHash/LSH over word 3-grams. Of each group of repeats the
+    highest-scored item is kept. Lines that recur in BOILERPLATE_MIN_ITEMS
+    or more items, like signatures or bot footers, are cut from every item
+    that has other text; post bodies that were removed leave the title.
+
+    Every step is a single pass with hash lookups, except that an item is
+    compared with every kept item sharing one of its LSH bands; common
+    phrasing fills some bands as the history grows, so the cost per item
+    rises slowly with its size. Kept items stay in their original order.
+
+    Returns the filtered {'comments': [...], 'posts': [...]} and a stats
+    dict with the number of items removed per reason, the boilerplate
+    lines cut and the estimated prompt tokens before and after.
+    """
+    entries = []
+    removed = Counter()
+    tokens_before = 0
+    line_items = Counter()
+    for kind in ('comments', 'posts'):
+        for item in scraped_data[kind]:
+            raw = _raw_text(kind, item)
+            text = clean_text(raw)
+            words = _WORD.findall(text.lower())
+            tokens_before += estimate_tokens(text) if words else 0
+            if kind == 'comments' and (not raw.strip() or raw.strip() in REMOVED_MARKERS):
+                removed['deleted'] += 1
+            elif len(words) < MIN_WORDS and (_URL.search(raw) or _is_link_post(kind, item)):
+                removed['link_only'] += 1
+            else:
+                entries.append([kind, item, words, text])
+                line_items.update({line.strip().lower() for line in raw.split("\n")
+                                   if len(line.strip()) >= BOILERPLATE_MIN_CHARS})
+
+    boilerplate = {line for line, count in line_items.items() if count >= BOILERPLATE_MIN_ITEMS}
+    for entry in entries:
+        kind, item = entry[0], entry[1]
+        stripped = _replace_text(kind, item, boilerplate)
+        if stripped is not item:
+            text = clean_text(_raw_text(kind, stripped))
+            words = _WORD.findall(text.lower())
+            # An item that is nothing but boilerplate is left whole for the duplicate check
+            if words:
+                entry[1:] = stripped, words, text
+
+    # Highest score first, so the copy kept of each group of repeats is the best-received one
+    order = sorted(range(len(entries)), key=lambda i: _SCORE(entries[i][1]), reverse=True)
+    exact = set()
+    buckets = {}
+    signatures = {}
+    kept = set()
+    for i in order:
+        words = entries[i][2]
+        normalized = ' '.join(words)
+        if normalized in exact:
+            removed['duplicate'] += 1
+            continue
+        exact.add(normalized)
+        if len(words) > SHINGLE_WORDS:
+            signature = _signature(words)
+            keys = [(band, rows) for band, rows in enumerate(zip(*[iter(signature)] * ROWS)) if any(rows)]
+            # Every kept item sharing a band is a candidate, not only the first one that claimed it
+            candidates = {j for key in keys for j in buckets.get(key, ())}
+            if any(_similarity(signature, signatures[j]) >= threshold for j in candidates):
+                removed['near_duplicate'] += 1
+                continue
+            signatures[i] = signature
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+        kept.add(i)
+
+    filtered = {'comments': [], 'posts': []}
+    tokens_after = 0
+    for i, (kind, item, words, text) in enumerate(entries):
+        if i in kept:
+            filtered[kind].append(item)
+            tokens_after += estimate_tokens(text) if words else 0
+    items = len(scraped_data['comments']) + len(scraped_data['posts'])
+    stats = {
+        'items': items,
+        'kept': items - sum(removed.values()),
+        'removed': dict(removed),
+        'boilerplate_lines': len(boilerplate),
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'tokens_removed': tokens_before - tokens_after
+    }
+    return filtered, stats
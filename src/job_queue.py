@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_PATH = os.path.join('.cache', 'jobs.sqlite3')
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+# Running jobs touch their heartbeat this often; one silent for STALE_AFTER seconds lost its worker
+HEARTBEAT_SECONDS = 10
+STALE_AFTER = 60
+# A job whose worker died this many times is failed instead of being queued again
+MAX_ATTEMPTS = 3
+# Finished jobs kept for the UI's job list; older ones are deleted
+DEFAULT_KEEP_FINISHED = 200
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    partial TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_key ON jobs (key, status);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, submitted_at);
+"""
+_JSON_COLUMNS = ('params', 'partial', 'result')
+
+class JobStore:
+    """SQLite job queue shared by every thread and process that opens the same file.
+
+    Jobs carry JSON params and a coalescing key: submitting a job whose
+    key matches one that is still queued or running returns the existing
+    job instead of adding another, so identical requests share one run.
+    Workers claim the oldest queued job, report progress (a stage label,
+    a 0-1 fraction and optionally a partial result) and finish it with a
+    JSON result or an error. State changes run in IMMEDIATE transactions,
+    so two workers can never claim the same job.
+    """
+
+    def __init__(self, path=DEFAULT_JOBS_PATH, keep_finished=DEFAULT_KEEP_FINISHED):
+        self.path = path
+        self.keep_finished = keep_finished
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._read() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _read(self):
+        """An autocommit connection; reads do not take the write lock workers contend for."""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _job(self, cursor, row):
+        job = {column[0]: value for column, value in zip(cursor.description, row)}
+        for column in _JSON_COLUMNS:
+            if job[column] is not None:
+                job[column] = json.loads(job[column])
+        return job
+
+    def submit(self, key, params):
+        """Queues a job unless one with the same key is queued or running; returns (job_id, created)."""
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY submitted_at LIMIT 1",
+                (key, QUEUED, RUNNING)
+            ).fetchone()
+            if row is not None:
+                return row[0], False
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, key, params, status, submitted_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, key, json.dumps(params), QUEUED, time.time())
+            )
+        return job_id, True
+
+    def claim(self):
+        """Marks the oldest queued job as running and returns it, or returns None when nothing is queued."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY submitted_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, now, now, row[0])
+            )
+            cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (row[0],))
+            return self._job(cursor, cursor.fetchone())
+
+    def progress(self, job_id, stage=None, progress=None, partial=None):
+        """Records how far a running job got; fields left as None keep their previous value."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = COALESCE(?, stage), progress = COALESCE(?, progress), "
+                "partial = COALESCE(?, partial), heartbeat_at = ? WHERE id = ? AND status = ?",
+                (stage, progress, json.dumps(partial) if partial is not None else None, time.time(), job_id, RUNNING)
+            )
+
+    def heartbeat(self, job_ids):
+        if not job_ids:
+            return
+        now = time.time()
+        with self._transaction() as conn:
+            conn.executemany("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                             [(now, job_id, RUNNING) for job_id in job_ids])
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, progress = 1, partial = NULL, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status IN (?, ?) "
+                "ORDER BY finished_at DESC LIMIT -1 OFFSET ?)",
+                (DONE, FAILED, self.keep_finished)
+            )
+
+    def finish(self, job_id, result):
+        self._finish(job_id, DONE, result=result)
+
+    def fail(self, job_id, error):
+        self._finish(job_id, FAILED, error=error)
+
+    def requeue_stale(self, stale_after=STALE_AFTER, max_attempts=MAX_ATTEMPTS):
+        """Queues running jobs whose worker stopped sending heartbeats again; returns how many there were.
+
+        A job that already lost max_attempts workers is failed instead,
+        so a job that crashes its process cannot loop forever.
+        """
+        cutoff = time.time() - stale_after
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'Worker stopped responding', finished_at = ? "
+                "WHERE status = ? AND heartbeat_at < ? AND attempts >= ?",
+                (FAILED, time.time(), RUNNING, cutoff, max_attempts)
+            )
+            requeued = conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, progress = 0, partial = NULL "
+                "WHERE status = ? AND heartbeat_at < ?",
+                (QUEUED, RUNNING, cutoff)
+            ).rowcount
+        if requeued:
+            logger.warning(f"Requeued {requeued} jobs whose worker stopped responding")
+        return requeued
+
+    def get(self, job_id):
+        with self._read() as conn:
+            cursor = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
+            row = cursor.fetchone()
+            return self._job(cursor, row) if row else None
+
+    def position(self, job_id):
+        """Number of queued jobs that will be claimed before this one."""
+        with self._read() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND submitted_at < "
+                "(SELECT submitted_at FROM jobs WHERE id = ?)",
+                (QUEUED, job_id)
+            ).fetchone()
+        return row[0]
+
+    def recent(self, limit=20, job_ids=None):
+        """The most recently submitted jobs, newest first, without their results.
+
+        With job_ids only those jobs are considered.
+        """
+        where, args = "", ()
+        if job_ids is not None:
+            job_ids = tuple(job_ids)
+            if not job_ids:
+                return []
+            where, args = f"WHERE id IN ({', '.join('?' * len(job_ids))}) ", job_ids
+        with self._read() as conn:
+            cursor = conn.execute(
+                "SELECT id, key, params, status, stage, progress, NULL AS partial, NULL AS result, error, attempts, "
+                f"submitted_at, started_at, heartbeat_at, finished_at FROM jobs {where}ORDER BY submitted_at DESC LIMIT ?",
+                args + (limit,)
+            )
+            return [self._job(cursor, row) for row in cursor.fetchall()]
+
+    def counts(self):
+        """Number of jobs per status."""
+        with self._read() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+class JobWorkerPool:
+    """Worker threads that claim jobs from a JobStore and run them with handler(job, progress).
+
+    handler returns the job's JSON result or raises; progress(stage=...,
+    progress=..., partial=...) records how far it got. While a job runs a
+    heartbeat thread keeps it marked as alive, and jobs left running by a
+    worker that died (e.g. a previous server process) are queued again.
+    Several pools, in the same or other processes, can serve one store.
+    """
+
+    def __init__(self, store, handler, workers=2, poll_interval=1.0, stale_after=STALE_AFTER):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.running = set()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self.store.requeue_stale(self.stale_after)
+        self.threads = [threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                        for i in range(self.workers)]
+        self.threads.append(threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True))
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def notify(self):
+        """Wakes idle workers so a newly submitted job starts without waiting for the next poll."""
+        self.wake.set()
+
+    def stop(self, timeout=None):
+        self.stopping.set()
+        self.wake.set()
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def _worker(self):
+        while not self.stopping.is_set():
+            try:
+                job = self.store.claim()
+            except sqlite3.Error as e:
+                logger.error(f"Could not claim a job: {e}")
+                job = None
+            if job is None:
+                self.wake.wait(self.poll_interval)
+                self.wake.clear()
+                continue
+            self._run(job)
+
+    def _run(self, job):
+        job_id = job['id']
+        with self.lock:
+            self.running.add(job_id)
+        start = time.perf_counter()
+        try:
+            result = self.handler(job, lambda **fields: self.store.progress(job_id, **fields))
+            self.store.finish(job_id, result)
+            logger.info(f"Job {job_id} finished in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self.store.fail(job_id, str(e))
+        finally:
+            with self.lock:
+                self.running.discard(job_id)
+
+    def _heartbeat(self):
+        while not self.stopping.wait(HEARTBEAT_SECONDS):
+            with self.lock:
+                running = list(self.running)
+            try:
+                self.store.heartbeat(running)
+                self.store.requeue_stale(self.stale_after)
+            except sqlite3.Error as e:
+                logger.error(f"Job heartbeat failed: {e}")
@@ -0,0 +1,258 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from src.prompt_builder import clean_text, subreddit_from_permalink
+from src.records import column
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z][a-z']+")
+_NEGATIONS = {'not', 'no', 'never', "don't", "doesn't", "didn't", "isn't", "wasn't", "can't", "won't", "wouldn't"}
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are aren't as at be because been before being below
+between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down during each even
+few for from further get got had hadn't has hasn't have haven't having he he'd he'll he's her here here's hers
+herself him himself his how how's i i'd i'll i'm i've if in into is isn't it it's its itself just know let's like
+lot make me more most much mustn't my myself no nor not now of off on once one only or other ought our ours
+ourselves out over own people really same say shan't she she'd she'll she's should shouldn't so some still such
+than that that's the their theirs them themselves then there there's these they they'd they'll they're they've
+thing things think this those through to too under until up us very want was wasn't way we we'd we'll we're
+we've well were weren't what what's when when's where where's which while who who's whom why why's will with
+won't would wouldn't yeah yes you you'd you'll you're you've your yours yourself yourselves
+amp deleted edit gt http https removed www com
+""".split())
+
+# Used when NLTK's VADER lexicon is not installed
+_FALLBACK_LEXICON = {
+    'love': 3.2, 'loved': 2.9, 'great': 3.1, 'good': 1.9, 'awesome': 3.1, 'amazing': 2.8, 'excellent': 2.7,
+    'best': 3.2, 'happy': 2.7, 'glad': 2.0, 'nice': 1.8, 'thanks': 1.9, 'thank': 1.5, 'fun': 2.3,
+    'enjoy': 2.2, 'enjoyed': 2.3, 'recommend': 1.5, 'helpful': 1.8, 'beautiful': 2.9, 'cool': 1.3,
+    'interesting': 1.7, 'excited': 1.4, 'perfect': 2.7, 'wonderful': 2.7, 'favorite': 2.0, 'agree': 1.5,
+    'bad': -2.5, 'terrible': -2.1, 'awful': -2.0, 'hate': -2.7, 'hated': -3.2, 'worst': -3.1, 'sad': -2.1,
+    'angry': -2.3, 'annoying': -1.7, 'disappointing': -2.2, 'disappointed': -1.9, 'wrong': -2.1,
+    'stupid': -2.4, 'boring': -1.3, 'problem': -1.7, 'problems': -1.7, 'broken': -1.1, 'wasted': -2.2,
+    'sucks': -1.5, 'horrible': -2.5, 'fail': -2.5, 'failed': -2.3, 'frustrating': -1.9, 'worse': -2.1,
+    'sorry': -0.3, 'pain': -2.3, 'scared': -1.9, 'worried': -1.2, 'difficult': -1.5, 'ugly': -2.3
+}
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+
+def get_sentiment_lexicon():
+    """Loads NLTK's VADER word valences once if they are installed (see README), else the built-in word list.
+
+    Nothing is downloaded here: this runs on the request path, under a lock
+    every analysis waits on.
+    """
+    global _lexicon
+    with _lexicon_lock:
+        if _lexicon is None:
+            try:
+                import nltk
+                nltk.data.find('sentiment/vader_lexicon.zip')
+                from nltk.sentiment.vader import SentimentIntensityAnalyzer
+                _lexicon = dict(SentimentIntensityAnalyzer().lexicon)
+            except LookupError:
+                logger.warning("VADER lexicon not installed (python -m nltk.downloader vader_lexicon), "
+                               "using built-in word list")
+                _lexicon = _FALLBACK_LEXICON
+            except Exception as e:
+                logger.warning(f"VADER lexicon unavailable, using built-in word list: {e}")
+                _lexicon = _FALLBACK_LEXICON
+        return _lexicon
+
+def tokenize(text):
+    """Lowercased words of text, as used for keywords, sentiment and citation search."""
+    return _WORD.findall(text.lower())
+
+def _item_texts(kind, items):
+    """Cleaned text of every item, built from whole columns."""
+    if kind == 'comments':
+        return [clean_text(body) for body in column(items, 'body')]
+    return [clean_text(f"{title} {selftext}") for title, selftext in zip(column(items, 'title'), column(items, 'selftext'))]
+
+def _sentiment(tokens, lexicon):
+    """Sum of word valences with simple negation flipping, squashed to -1..1 like VADER's compound score."""
+    total = 0.0
+    for i, token in enumerate(tokens):
+        valence = lexicon.get(token)
+        if valence is None:
+            continue
+        if any(t in _NEGATIONS for t in tokens[max(0, i - 3):i]):
+            valence = -0.74 * valence
+        total += valence
+    return total / math.sqrt(total * total + 15) if total else 0.0
+
+def activity_tier(items_per_day, mean_score):
+    """Maps posting frequency and typical score to the persona's activity tier labels."""
+    if items_per_day >= 5 or (items_per_day >= 2 and mean_score >= 50):
+        return "Power User"
+    if items_per_day >= 0.5:
+        return "Active Contributor"
+    return "Casual User"
+
+def _median(counts, total):
+    """Median of values held as a Counter of value -> occurrences, like statistics.median of the values."""
+    positions = {(total - 1) // 2, total // 2}
+    middle = []
+    seen = 0
+    for value, count in sorted(counts.items()):
+        middle.extend(value for position in positions if seen <= position < seen + count)
+        seen += count
+    return middle[0] if len(middle) == 1 else (middle[0] + middle[1]) / 2
+
+class HistoryStats:
+    """Running totals behind analyze_history, so features can be computed from a stream of items.
+
+    Items are added a list at a time (update) or one by one (add, or
+    observe to count a stream while passing it on). Nothing per item is
+    kept: keyword weights, subreddits, hours and scores are counters, so
+    memory grows with the vocabulary rather than the history length.
+    features() gives the same result as analyze_history over every item
+    added.
+    """
+
+    def __init__(self):
+        self.lexicon = get_sentiment_lexicon()
+        self.counts = {'comments': 0, 'posts': 0}
+        self.documents = 0
+        self.doc_freq = Counter()
+        # Each term's share of the words of every item it appears in, summed; times its idf this is its TF-IDF weight
+        self.term_share = Counter()
+        self.sentiment_total = 0.0
+        self.sentiment_items = 0
+        self.quote = None
+        self.fallback_quote = None
+        self.scores = Counter()
+        self.score_total = 0
+        self.first_utc = None
+        self.last_utc = None
+        self.subreddits = Counter()
+        self.hours = Counter()
+
+    def update(self, kind, items):
+        """Adds a list of 'comments' or 'posts' items, read a whole column at a time."""
+        texts = _item_texts(kind, items)
+        for text in texts:
+            tokens = tokenize(text)
+            self.documents += 1
+            if tokens:
+                self.sentiment_total += _sentiment(tokens, self.lexicon)
+                self.sentiment_items += 1
+            counts = Counter(t for t in tokens if t not in STOPWORDS and len(t) > 2)
+            self.doc_freq.update(counts.keys())
+            length = sum(counts.values())
+            for term, tf in counts.items():
+                self.term_share[term] += tf / length
+        item_scores = column(items, 'score')
+        item_timestamps = column(items, 'created_utc')
+        for text, score in zip(texts, item_scores):
+            if 40 <= len(text) <= 280:
+                self.quote = max(self.quote or (score, text), (score, text))
+            elif text:
+                self.fallback_quote = max(self.fallback_quote or (score, text[:280]), (score, text[:280]))
+        self.counts[kind] += len(items)
+        self.scores.update(item_scores)
+        self.score_total += sum(item_scores)
+        if item_timestamps:
+            first, last = min(item_timestamps), max(item_timestamps)
+            self.first_utc = first if self.first_utc is None else min(self.first_utc, first)
+            self.last_utc = last if self.last_utc is None else max(self.last_utc, last)
+        self.subreddits.update(subreddit_from_permalink(permalink) or 'unknown' for permalink in column(items, 'permalink'))
+        # POSIX timestamps have no leap seconds, so the UTC hour is plain arithmetic
+        self.hours.update(int(timestamp // 3600) % 24 for timestamp in item_timestamps)
+
+    def add(self, kind, item):
+        self.update(kind, (item,))
+
+    def observe(self, items):
+        """Adds each (kind, item) pair of a stream such as iter_redditor_items while yielding it on."""
+        for kind, item in items:
+            self.add(kind, item)
+            yield kind, item
+
+    def _top_keywords(self, count):
+        """Ranks terms by their summed TF-IDF weight over the items."""
+        scores = Counter()
+        for term, share in self.term_share.items():
+            # Smoothed idf; terms used in a single item are noise rather than topics
+            if self.doc_freq[term] > 1 or self.documents < 5:
+                scores[term] = share * (math.log((1 + self.documents) / (1 + self.doc_freq[term])) + 1)
+        return [term for term, _ in scores.most_common(count)]
+
+    def features(self, topic_count=10):
+        """The analyze_history result for the items added so far."""
+        total_items = self.counts['comments'] + self.counts['posts']
+        if not total_items:
+            return {
+                'common_topics': [], 'sentiment': 'Neutral', 'sentiment_score': 0.0, 'tier': 'Casual User',
+                'quote': '', 'activity': {'items': 0}, 'subreddits': [], 'active_hours_utc': []
+            }
+
+        span_days = max((self.last_utc - self.first_utc) / 86400, 1.0)
+        items_per_day = total_items / span_days
+        mean_score = self.score_total / total_items
+        sentiment_score = self.sentiment_total / self.sentiment_items if self.sentiment_items else 0.0
+        if sentiment_score >= 0.05:
+            sentiment = 'Positive'
+        elif sentiment_score <= -0.05:
+            sentiment = 'Negative'
+        else:
+            sentiment = 'Neutral'
+        quote = self.quote or self.fallback_quote
+
+        return {
+            'common_topics': self._top_keywords(topic_count),
+            'sentiment': sentiment,
+            'sentiment_score': round(sentiment_score, 3),
+            'tier': activity_tier(items_per_day, mean_score),
+            'quote': quote[1] if quote else "",
+            'activity': {
+                'items': total_items,
+                'comments': self.counts['comments'],
+                'posts': self.counts['posts'],
+                'span_days': round(span_days, 1),
+                'items_per_day': round(items_per_day, 2),
+                'mean_score': round(mean_score, 1),
+                'median_score': _median(self.scores, total_items),
+                'max_score': max(self.scores)
+            },
+            'subreddits': [
+                {'name': name, 'share': round(count / total_items, 3)} for name, count in self.subreddits.most_common(10)
+            ],
+            'active_hours_utc': [hour for hour, _ in self.hours.most_common(3)]
+        }
+
+def analyze_history(scraped_data, topic_count=10):
+    """Computes persona features from scraped items without calling the LLM.
+
+    Returns common topics (TF-IDF keywords), lexicon-based sentiment,
+    an activity tier derived from posting frequency and scores, score
+    statistics, the subreddit distribution, the most active hours and a
+    representative quote. Everything is a single pass of counting, so
+    a 1,000-item history is analyzed in milliseconds. For a history that
+    is streamed rather than held, see HistoryStats.
+    """
+    stats = HistoryStats()
+    for kind in ('comments', 'posts'):
+        stats.update(kind, scraped_data[kind])
+    return stats.features(topic_count)
+
+def format_features(features):
+    """Renders analyze_history output as a few compact lines for the LLM prompt."""
+    activity = features['activity']
+    if not activity['items']:
+        return "No activity."
+    subreddits = ", ".join(f"r/{s['name']} {s['share']:.0%}" for s in features['subreddits'])
+    return "\n".join([
+        f"Activity: {activity['comments']} comments, {activity['posts']} posts over {activity['span_days']} days "
+        f"({activity['items_per_day']}/day), mean score {activity['mean_score']}, max {activity['max_score']} "
+        f"-> tier {features['tier']}",
+        f"Subreddits: {subreddits}",
+        f"Most active hours (UTC): {', '.join(str(h) for h in features['active_hours_utc'])}",
+        f"Keywords: {', '.join(features['common_topics'])}",
+        f"Lexicon sentiment: {features['sentiment']} ({features['sentiment_score']:+.2f})"
+    ])
@@ -0,0 +1,101 @@
+import bisect
+import threading
+import time
+
+# Stage event fields that are summed into counters; other fields are only descriptive
+COUNTED_FIELDS = ('items', 'comments', 'posts', 'bytes', 'text_bytes', 'prompt_tokens', 'response_tokens', 'chunks',
+                  'tokens_removed')
+# Histogram buckets in seconds, from a single Reddit page up to a long chunked generation
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class MetricsRegistry:
+    """Process-wide stage durations and counts, exportable in the Prometheus text format.
+
+    Every stage event (see src.run_log.record_stage) adds its duration to
+    the persona_stage_seconds histogram and its COUNTED_FIELDS to
+    persona_stage_<field>_total counters, both labelled with the stage.
+    """
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, seconds, fields):
+        with self.lock:
+            histogram = self.histograms.setdefault(stage, {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0})
+            histogram['counts'][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram['sum'] += seconds
+            for field in COUNTED_FIELDS:
+                value = fields.get(field)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    key = (field, stage)
+                    self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self):
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def prometheus_text(self):
+        """Renders all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            lines = [
+                "# HELP persona_stage_seconds Time spent in each persona pipeline stage.",
+                "# TYPE persona_stage_seconds histogram"
+            ]
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), histogram['counts']):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'persona_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'persona_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+                lines.append(f'persona_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+            for field in COUNTED_FIELDS:
+                series = sorted((stage, value) for (name, stage), value in self.counters.items() if name == field)
+                if not series:
+                    continue
+                lines.append(f"# TYPE persona_stage_{field}_total counter")
+                lines.extend(f'persona_stage_{field}_total{{stage="{stage}"}} {value}' for stage, value in series)
+        return "\n".join(lines) + "\n"
+
+_registry = MetricsRegistry()
+_tracer = None
+_tracer_lock = threading.Lock()
+
+def get_registry():
+    """Returns the registry shared by every pipeline run in this process."""
+    return _registry
+
+def _get_tracer():
+    """Returns an OpenTelemetry tracer when the opentelemetry package is installed, else False."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            try:
+                from opentelemetry import trace
+                _tracer = trace.get_tracer('reddit-persona-generator')
+            except ImportError:
+                _tracer = False
+        return _tracer
+
+def observe_stage(stage, seconds, fields):
+    """Records a finished stage in the registry and, if OpenTelemetry is available, as a span.
+
+    Spans are created after the fact with the stage's real start and end
+    times, as children of whatever span is current (e.g. the web request
+    that ran the pipeline); exporting them is up to the configured
+    OpenTelemetry SDK.
+    """
+    _registry.observe(stage, seconds, fields)
+    tracer = _get_tracer()
+    if tracer:
+        end_ns = time.time_ns()
+        attributes = {key: value for key, value in fields.items() if isinstance(value, (str, bool, int, float))}
+        span = tracer.start_span(stage, start_time=end_ns - int(seconds * 1e9), attributes=attributes)
+        span.end(end_time=end_ns)
+
+def prometheus_text():
+    return _registry.prometheus_text()
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from src.records import fields_of
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_DISK_PATH = os.path.join('.cache', 'personas.sqlite3')
+# Where personas are cached; see backend_from_url
+CACHE_URL = os.environ.get('PERSONA_CACHE_URL')
+_COMMENT_KEY_FIELDS = fields_of('id', 'body', 'score', 'created_utc', 'permalink')
+_POST_KEY_FIELDS = fields_of('id', 'title', 'selftext', 'score', 'created_utc', 'permalink')
+
+def persona_cache_key(scraped_data, username, model_name, template_version, options=None):
+    """Hashes everything that determines a generated persona.
+
+    Items are normalized to the fields that reach the prompt and sorted by
+    id, so the key does not depend on listing order. options holds the
+    generation settings (token budget, ranking, chunking) that change the
+    prompt.
+    """
+    comments = sorted(map(list, map(_COMMENT_KEY_FIELDS, scraped_data['comments'])))
+    posts = sorted(map(list, map(_POST_KEY_FIELDS, scraped_data['posts'])))
+    payload = json.dumps({
+        'username': username.lower(),
+        'model': model_name,
+        'template_version': template_version,
+        'options': options or {},
+        'comments': comments,
+        'posts': posts
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class MemoryBackend:
+    """Process-local LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl if ttl else None, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+class DiskBackend:
+    """SQLite-backed LRU store that survives restarts and is shared between processes."""
+
+    def __init__(self, path=DEFAULT_DISK_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS personas ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS personas_by_access ON personas (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value, expires_at FROM personas WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] is not None and row[1] < now:
+                conn.execute("DELETE FROM personas WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE personas SET last_access = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO personas (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl if ttl else None, now)
+            )
+            conn.execute(
+                "DELETE FROM personas WHERE key IN ("
+                "SELECT key FROM personas ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM personas")
+
+class RedisBackend:
+    """Store on a Redis server, or any client with the same get/set/delete/z* methods.
+
+    Expiry uses Redis TTLs. A sorted set of last-access times tracks LRU
+    order so the number of entries stays bounded even without a
+    maxmemory eviction policy on the server.
+    """
+
+    def __init__(self, client, max_entries=DEFAULT_MAX_ENTRIES, prefix='persona:'):
+        self.client = client
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.index_key = prefix + 'lru'
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            self.client.zrem(self.index_key, key)
+            return None
+        self.client.zadd(self.index_key, {key: time.time()})
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=int(ttl) if ttl else None)
+        self.client.zadd(self.index_key, {key: time.time()})
+        excess = self.client.zcard(self.index_key) - self.max_entries
+        if excess > 0:
+            evicted = [k.decode('utf-8') if isinstance(k, bytes) else k
+                       for k in self.client.zrange(self.index_key, 0, excess - 1)]
+            self.client.delete(*[self.prefix + k for k in evicted])
+            self.client.zrem(self.index_key, *evicted)
+
+    def clear(self):
+        keys = [k.decode('utf-8') if isinstance(k, bytes) else k for k in self.client.zrange(self.index_key, 0, -1)]
+        if keys:
+            self.client.delete(*[self.prefix + k for k in keys])
+        self.client.delete(self.index_key)
+
+def backend_from_url(url=None):
+    """Builds the backend a PERSONA_CACHE_URL-style setting names.
+
+    'memory' is a MemoryBackend, 'disk' (the default) a DiskBackend at
+    DEFAULT_DISK_PATH, a redis:// or rediss:// URL a RedisBackend (which
+    needs the redis package), and anything else the path of a DiskBackend.
+    """
+    url = url or 'disk'
+    if url == 'memory':
+        return MemoryBackend()
+    if url == 'disk':
+        return DiskBackend()
+    if url.startswith(('redis://', 'rediss://')):
+        try:
+            import redis
+        except ImportError:
+            raise Exception("A Redis persona cache needs the redis package (pip install redis)")
+        return RedisBackend(redis.Redis.from_url(url))
+    return DiskBackend(url)
+
+class PersonaCache:
+    """Persona JSON cache with TTL, bounded LRU eviction and hit/miss counters."""
+
+    def __init__(self, backend=None, ttl=DEFAULT_TTL):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns a copy of the cached persona, or None on a miss."""
+        value = self.backend.get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, key, persona):
+        self.backend.set(key, json.dumps(persona), ttl=self.ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        """Returns hit/miss counters; every hit is one LLM generation saved."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+from src.enhanced_persona_generator import generate_enhanced_persona, update_enhanced_persona
+from src.reddit_scraper import scrape_redditor_data
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = os.path.join('.cache', 'persona_history.sqlite3')
+# Versions kept per user; a year of weekly refreshes
+DEFAULT_MAX_VERSIONS = 52
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS persona_versions (
+    username TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    generated_at REAL NOT NULL,
+    newest_utc REAL,
+    mode TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    changed TEXT NOT NULL,
+    persona TEXT NOT NULL,
+    PRIMARY KEY (username, version)
+);
+"""
+_COLUMNS = ('version', 'generated_at', 'newest_utc', 'mode', 'items', 'changed', 'persona')
+
+def newest_item_utc(scraped_data):
+    """created_utc of the newest comment or post, or None for an empty history."""
+    return max((item['created_utc'] for kind in ('comments', 'posts') for item in scraped_data[kind]), default=None)
+
+def update_since(entry):
+    """The since_utc for scrape_redditor_data that fetches the activity a stored version has not seen.
+
+    Items from newest_utc's own second come back too, since one posted
+    just after the generation cannot be told apart by its timestamp.
+    """
+    # A persona generated from an empty history has seen everything up to its generation
+    since = entry['newest_utc'] if entry['newest_utc'] is not None else entry['generated_at']
+    return {'comments': since, 'posts': since}
+
+class PersonaHistory:
+    """SQLite store of every version of each user's persona.
+
+    A version records the persona, when it was generated, how ('full' for
+    a generation from the whole history, 'delta' for an update from new
+    activity), the fields the update changed and newest_utc, the created_utc
+    of the newest item the persona has seen. Updates only analyze items
+    newer than that. Only the newest max_versions versions per user are
+    kept.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, max_versions=DEFAULT_MAX_VERSIONS):
+        self.path = path
+        self.max_versions = max_versions
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _entry(self, row):
+        entry = dict(zip(_COLUMNS, row))
+        entry['changed'] = json.loads(entry['changed'])
+        entry['persona'] = json.loads(entry['persona'])
+        return entry
+
+    def latest(self, username):
+        """Returns the newest version of a user's persona as a dict, or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM persona_versions WHERE username = ? ORDER BY version DESC LIMIT 1",
+                (username.lower(),)
+            ).fetchone()
+        return self._entry(row) if row else None
+
+    def versions(self, username):
+        """Returns every stored version of a user's persona, oldest first."""
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM persona_versions WHERE username = ? ORDER BY version",
+                (username.lower(),)
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def add(self, username, persona, newest_utc, mode, items, changed=None):
+        """Stores a new version and returns it; version numbers count up from 1 per user."""
+        generated_at = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO persona_versions (username, version, generated_at, newest_utc, mode, items, changed, persona) "
+                "SELECT ?, COALESCE(MAX(version), 0) + 1, ?, ?, ?, ?, ?, ? FROM persona_versions WHERE username = ?",
+                (username.lower(), generated_at, newest_utc, mode, items, json.dumps(changed or []),
+                 json.dumps(persona), username.lower())
+            )
+            conn.execute(
+                "DELETE FROM persona_versions WHERE username = ? AND version <= "
+                "(SELECT MAX(version) FROM persona_versions WHERE username = ?) - ?",
+                (username.lower(), username.lower(), self.max_versions)
+            )
+        return self.latest(username)
+
+    def invalidate(self, username):
+        """Drops every version of a user's persona, so the next refresh is a full generation."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM persona_versions WHERE username = ?", (username.lower(),))
+
+def refresh_persona(reddit, username, google_api_key, history=None, limit=None, model=None, **generation_kwargs):
+    """Returns the newest version of a user's persona, generating or updating it as needed.
+
+    The first refresh of a user scrapes up to limit items and generates
+    the persona from the whole history. Later refreshes scrape only the
+    items created after the newest one the stored persona has seen, which
+    usually takes one page request per listing, and hand them to
+    update_enhanced_persona. When that skips the LLM call because there
+    is too little new activity, the stored version is returned and no
+    version is added, so the new items are analyzed together with the
+    next week's. generation_kwargs go to generate_enhanced_persona.
+    """
+    history = history or PersonaHistory()
+    previous = history.latest(username)
+    if previous is None:
+        scraped_data = scrape_redditor_data(reddit, username, limit=limit)
+        persona = generate_enhanced_persona(scraped_data, username, google_api_key, model=model, **generation_kwargs)
+        items = len(scraped_data['comments']) + len(scraped_data['posts'])
+        return history.add(username, persona, newest_item_utc(scraped_data), 'full', items)
+
+    new_data = scrape_redditor_data(reddit, username, limit=limit, since_utc=update_since(previous))
+    return apply_update(history, username, previous, new_data, google_api_key, model=model)
+
+def apply_update(history, username, previous, new_data, google_api_key, model=None):
+    """Updates the stored version previous from new_data and stores the result; see refresh_persona."""
+    persona, update = update_enhanced_persona(previous['persona'], new_data, username, google_api_key, model=model)
+    if update['mode'] == 'skipped':
+        return previous
+    newest_utc = max((utc for utc in (previous['newest_utc'], newest_item_utc(new_data)) if utc is not None), default=None)
+    entry = history.add(username, persona, newest_utc, 'delta', update['new_items'], update['changed'])
+    logger.info(f"Updated persona of {username} to version {entry['version']} from {update['new_items']} new items; "
+                f"changed: {', '.join(update['changed']) or 'nothing'}")
+    return entry
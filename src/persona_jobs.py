@@ -0,0 +1,227 @@
+"""Persona generation as background jobs.
+
+The Streamlit app submits jobs to a JobStore and polls them; a worker
+pool in the app's process (PERSONA_JOB_WORKERS threads, 2 by default)
+scrapes and generates the personas, so closing or refreshing the browser
+does not lose a run. More workers can run in their own processes against
+the same job database:
+
+    REDDIT_CLIENT_ID=... REDDIT_CLIENT_SECRET=... GOOGLE_API_KEY=... \\
+        python -m src.persona_jobs --workers 4
+
+Credentials are never written to the job database, only a hash of them
+is part of the coalescing key. Jobs use the ones they were submitted
+with, which the submitting process holds in memory until a worker claims
+the job; jobs run by another process fall back to the environment
+variables.
+
+Reports are written to disk only into the folder the server is configured
+with (PERSONA_REPORT_DIR, or --report-dir for worker processes); a job can
+only ask for its report to be saved there.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from src.clients import MODEL_NAME, get_listing_client, get_reddit
+from src.enhanced_persona_generator import generate_enhanced_persona, generate_fast_persona, stream_enhanced_persona
+from src.job_queue import DEFAULT_JOBS_PATH, JobStore, JobWorkerPool
+from src.persona_cache import CACHE_URL, PersonaCache, backend_from_url
+from src.persona_schema import PERSONA_FIELDS
+from src.reddit_scraper import scrape_redditor_data
+from src.report import render_report, report_filename, save_report
+from src.run_log import LOG_FORMAT, capture_run, stage
+from src.scrape_cache import scrape_redditor_data_cached
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = int(os.environ.get('PERSONA_JOB_WORKERS', 2))
+# Server-side folder reports are saved to; jobs cannot choose another one
+REPORT_DIR = os.environ.get('PERSONA_REPORT_DIR') or None
+CREDENTIAL_FIELDS = ('client_id', 'client_secret', 'user_agent', 'google_api_key')
+# Options a job runs with by default; every option is part of the coalescing key
+DEFAULT_OPTIONS = {
+    'limit': 100,
+    'token_budget': None,
+    'ranking': 'score',
+    'chunked': False,
+    'dedupe': True,
+    'fast_mode': False,
+    'stream': True,
+    'use_scrape_cache': True,
+    'use_persona_cache': True,
+    'direct_listings': False,
+    'report_format': 'txt',
+    'save_report': False
+}
+
+def credentials_from_env():
+    return {
+        'client_id': os.environ.get('REDDIT_CLIENT_ID'),
+        'client_secret': os.environ.get('REDDIT_CLIENT_SECRET'),
+        'user_agent': os.environ.get('REDDIT_USER_AGENT', 'PersonaGenerator/2.0'),
+        'google_api_key': os.environ.get('GOOGLE_API_KEY')
+    }
+
+def job_key(username, options, credentials):
+    """Identifies requests that would produce the same persona, so in-flight duplicates share one job.
+
+    The credentials are part of the key, so only requests made with the
+    same API keys share a job and nobody's job runs on someone else's keys.
+    """
+    secrets = json.dumps([credentials.get(field) for field in CREDENTIAL_FIELDS])
+    payload = json.dumps({'username': username.lower(), 'model': MODEL_NAME, 'options': options,
+                          'credentials': hashlib.sha256(secrets.encode('utf-8')).hexdigest()}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _progress_fraction(persona):
+    # Scraping is done by the time fields stream in; citations arrive last
+    return 0.3 + 0.7 * len(persona) / (len(PERSONA_FIELDS) + 1)
+
+def run_persona_job(username, options, credentials, progress, persona_cache=None, report_dir=None):
+    """Scrapes and generates one persona, reporting progress; returns the job's JSON result.
+
+    With options['stream'] the persona fields are published as the job's
+    partial result as soon as the model writes them. With
+    options['save_report'] the report is also saved into report_dir, if
+    the server has one.
+    """
+    with capture_run() as run_log:
+        progress(stage='scraping', progress=0.05)
+        if options['direct_listings']:
+            reddit = get_listing_client(credentials['client_id'], credentials['client_secret'], credentials['user_agent'])
+        else:
+            reddit = get_reddit(credentials['client_id'], credentials['client_secret'], credentials['user_agent'])
+        with stage('history', limit=options['limit'], cached=options['use_scrape_cache']):
+            if options['use_scrape_cache']:
+                scraped_data = scrape_redditor_data_cached(reddit, username, limit=options['limit'], concurrent=True)
+            else:
+                scraped_data = scrape_redditor_data(reddit, username, limit=options['limit'], concurrent=True)
+        if not scraped_data['comments'] and not scraped_data['posts']:
+            raise Exception("No data found for this user. They might have no posts/comments or their profile might be private.")
+
+        progress(stage=f"generating from {len(scraped_data['comments'])} comments and {len(scraped_data['posts'])} posts",
+                 progress=0.3)
+        generation = {'ranking': options['ranking'], 'dedupe': options['dedupe']}
+        if options['token_budget']:
+            generation['token_budget'] = options['token_budget']
+        cache = persona_cache if options['use_persona_cache'] else None
+        streamed = options['stream'] and not options['chunked'] and not options['fast_mode']
+        with stage('generate', fast=options['fast_mode'], streamed=streamed):
+            if options['fast_mode']:
+                persona = generate_fast_persona(scraped_data, username)
+            elif streamed:
+                persona = {}
+                for field, value in stream_enhanced_persona(scraped_data, username, credentials['google_api_key'],
+                                                            cache=cache, **generation):
+                    persona[field] = value
+                    progress(partial=persona, progress=_progress_fraction(persona))
+            else:
+                persona = generate_enhanced_persona(scraped_data, username, credentials['google_api_key'],
+                                                    chunked=options['chunked'], cache=cache, **generation)
+
+        generated_at = datetime.now()
+        report_path = None
+        if options.get('save_report') and report_dir:
+            progress(stage='saving report')
+            with stage('export', format=options['report_format']):
+                report = render_report(persona, username, options['report_format'], generated_at)
+                filename = report_filename(username, options['report_format'], generated_at)
+                report_path = save_report(report, filename, report_dir)
+
+    return {
+        'persona': persona,
+        'counts': {'comments': len(scraped_data['comments']), 'posts': len(scraped_data['posts'])},
+        'log': run_log.text(),
+        'timings': run_log.timings(),
+        'seconds': time.perf_counter() - run_log.started,
+        'generated_at': generated_at.timestamp(),
+        'report_path': report_path
+    }
+
+class PersonaJobs:
+    """Process-wide persona job queue: the job store, a worker pool and the credentials of submitted jobs."""
+
+    def __init__(self, store=None, workers=DEFAULT_WORKERS, persona_cache=None, report_dir=REPORT_DIR):
+        self.store = store or JobStore()
+        self.persona_cache = persona_cache
+        self.report_dir = report_dir
+        self.credentials = {}
+        self.lock = threading.Lock()
+        self.pool = JobWorkerPool(self.store, self._handle, workers=workers) if workers else None
+
+    def start(self):
+        if self.pool is not None:
+            self.pool.start()
+        return self
+
+    def stop(self, timeout=None):
+        if self.pool is not None:
+            self.pool.stop(timeout)
+
+    def submit(self, username, options, credentials):
+        """Queues a persona job and returns its id; an identical queued or running job is reused.
+
+        options are merged over DEFAULT_OPTIONS.
+        """
+        options = dict(DEFAULT_OPTIONS, **options)
+        key = job_key(username, options, credentials)
+        # Stored before the job exists, so a worker that claims it at once finds them
+        with self.lock:
+            added = key not in self.credentials
+            if added:
+                self.credentials[key] = {field: credentials.get(field) for field in CREDENTIAL_FIELDS}
+        job_id, created = self.store.submit(key, {'username': username, 'options': options})
+        if not created and added:
+            # Joined a job that is finishing or was queued by another process; nothing here will pop them
+            with self.lock:
+                self.credentials.pop(key, None)
+        if created:
+            logger.info(f"Queued persona job {job_id} for {username}")
+            if self.pool is not None:
+                self.pool.notify()
+        else:
+            logger.info(f"Joined the persona job {job_id} already in flight for {username}")
+        return job_id
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def recent(self, limit=20, job_ids=None):
+        return self.store.recent(limit, job_ids)
+
+    def _handle(self, job, progress):
+        # Secrets are only kept in memory while their job may still need them
+        with self.lock:
+            credentials = self.credentials.pop(job['key'], None)
+        credentials = credentials or credentials_from_env()
+        if not credentials['client_id'] or not credentials['client_secret']:
+            raise Exception("The credentials for this job are no longer available; please submit it again")
+        params = job['params']
+        return run_persona_job(params['username'], params['options'], credentials, progress, self.persona_cache,
+                               self.report_dir)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run persona jobs submitted by the Streamlit app.")
+    parser.add_argument('--jobs', default=DEFAULT_JOBS_PATH, help="Job database shared with the app")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--cache', default=CACHE_URL,
+                        help="Persona cache: 'disk' (default), 'memory', a SQLite path or a redis:// URL")
+    parser.add_argument('--report-dir', default=REPORT_DIR, help="Folder jobs that ask for it save their report to")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    jobs = PersonaJobs(JobStore(args.jobs), workers=args.workers, persona_cache=PersonaCache(backend_from_url(args.cache)),
+                       report_dir=args.report_dir).start()
+    logger.info(f"Running {args.workers} persona job workers on {args.jobs}")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        jobs.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+from collections import Counter
+
+# Fields the model answers with a single label, merged by weighted vote
+SCALAR_FIELDS = ('age', 'occupation', 'status', 'location', 'tier', 'archetype', 'sentiment')
+LIST_FIELDS = {
+    'behaviors_habits': 8,
+    'goals_needs': 8,
+    'frustrations': 8,
+    'common_topics': 10
+}
+
+def _vote(values, weights):
+    """Returns the label with the highest total weight, preferring anything over 'Unknown'."""
+    totals = Counter()
+    first_seen = {}
+    for value, weight in zip(values, weights):
+        if not isinstance(value, str) or not value.strip():
+            continue
+        key = value.strip().lower()
+        totals[key] += weight
+        first_seen.setdefault(key, value.strip())
+    known = [key for key in totals if key != 'unknown']
+    if not known:
+        return 'Unknown'
+    best = max(known, key=lambda key: totals[key])
+    return first_seen[best]
+
+def _merge_lists(lists, weights, max_items):
+    """Merges list fields, ranking entries by how much of the history mentioned them."""
+    totals = Counter()
+    first_seen = {}
+    for values, weight in zip(lists, weights):
+        for value in values or []:
+            if not isinstance(value, str) or not value.strip():
+                continue
+            key = value.strip().lower()
+            totals[key] += weight
+            first_seen.setdefault(key, value.strip())
+    ranked = sorted(totals, key=lambda key: totals[key], reverse=True)
+    return [first_seen[key] for key in ranked[:max_items]]
+
+def _average_scores(score_dicts, weights):
+    """Weighted average of 0-100 score dicts, rounded to integers."""
+    sums = {}
+    weight_totals = {}
+    for scores, weight in zip(score_dicts, weights):
+        for key, value in (scores or {}).items():
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                continue
+            sums[key] = sums.get(key, 0.0) + value * weight
+            weight_totals[key] = weight_totals.get(key, 0) + weight
+    return {key: int(round(sums[key] / weight_totals[key])) for key in sums}
+
+def merge_partial_personas(partials, weights=None):
+    """Reduces per-chunk personas into a single persona with the same schema.
+
+    weights is typically the number of items behind each partial so larger
+    chunks count for more. Labels are merged by weighted vote, motivation
+    scores by weighted average and list fields by weighted frequency, so
+    the reduce step needs no further LLM call.
+    """
+    if not partials:
+        raise ValueError("No partial personas to merge")
+    weights = weights or [1] * len(partials)
+
+    merged = {'name': next((p['name'] for p in partials if p.get('name')), 'Unknown')}
+    for field in SCALAR_FIELDS:
+        merged[field] = _vote([p.get(field) for p in partials], weights)
+
+    dimensions = []
+    for partial in partials:
+        for key in (partial.get('personality') or {}):
+            if key not in dimensions:
+                dimensions.append(key)
+    merged['personality'] = {
+        key: _vote([(p.get('personality') or {}).get(key) for p in partials], weights).lower()
+        for key in dimensions
+    }
+    merged['motivations'] = _average_scores([p.get('motivations') for p in partials], weights)
+
+    for field, max_items in LIST_FIELDS.items():
+        merged[field] = _merge_lists([p.get(field) for p in partials], weights, max_items)
+
+    heaviest = max(range(len(partials)), key=lambda i: weights[i] if partials[i].get('quote') else -1)
+    merged['quote'] = partials[heaviest].get('quote', '')
+    merged['citations'] = []
+    return merged
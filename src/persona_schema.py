@@ -0,0 +1,174 @@
+import json
+from src.streaming_json import IncrementalObjectParser
+
+LIST_FIELDS = ('behaviors_habits', 'goals_needs', 'frustrations', 'common_topics')
+PERSONALITY_TRAITS = {
+    'extrovert_introvert': ('extrovert', 'introvert'),
+    'thinking_feeling': ('thinking', 'feeling'),
+    'judging_perceiving': ('judging', 'perceiving'),
+    'sensing_intuition': ('sensing', 'intuition')
+}
+MOTIVATIONS = ('convenience', 'wellness', 'speed', 'preferences', 'comfort', 'dietary_needs')
+# Every field the model answers; citations are built locally from the scraped items
+PERSONA_FIELDS = ('name', 'age', 'occupation', 'status', 'location', 'tier', 'archetype', 'personality',
+                  'motivations', 'behaviors_habits', 'goals_needs', 'frustrations', 'common_topics',
+                  'sentiment', 'quote')
+# Fields that local analysis (or the username) can fill in, so they are never re-requested from the LLM
+LOCAL_FIELDS = ('name', 'tier', 'sentiment', 'common_topics', 'quote')
+REPAIRABLE_FIELDS = tuple(field for field in PERSONA_FIELDS if field not in LOCAL_FIELDS)
+
+# One-line descriptions used when a single field is re-requested
+FIELD_HINTS = {
+    'age': 'string, estimated age range (e.g. "20-25", "30-40", "Unknown")',
+    'occupation': 'string, estimated occupation (e.g. "Software Engineer", "Student", "Unknown")',
+    'status': 'string, relationship or life status (e.g. "Single", "Married", "Working Professional", "Unknown")',
+    'location': 'string, general location (e.g. "North America", "Europe", "Unknown")',
+    'archetype': 'string, a user archetype (e.g. "The Explorer", "The Analyst", "The Helper")',
+    'personality': 'object with ' + ', '.join(
+        f'"{trait}": "{first}" or "{second}"' for trait, (first, second) in PERSONALITY_TRAITS.items()
+    ),
+    'motivations': 'object with integer scores 0-100 for ' + ', '.join(f'"{key}"' for key in MOTIVATIONS),
+    'behaviors_habits': 'list of strings, observed behaviors and habits',
+    'goals_needs': 'list of strings, inferred goals and needs',
+    'frustrations': 'list of strings, inferred frustrations'
+}
+
+def response_schema(fields=PERSONA_FIELDS, required=True):
+    """The persona (or the given subset of its fields) as a Gemini response_schema.
+
+    With required=False the model may leave out any top-level field.
+    """
+    properties = {}
+    for field in fields:
+        if field in LIST_FIELDS:
+            properties[field] = {'type': 'ARRAY', 'items': {'type': 'STRING'}}
+        elif field == 'personality':
+            properties[field] = {
+                'type': 'OBJECT',
+                'properties': {trait: {'type': 'STRING', 'format': 'enum', 'enum': list(values)}
+                               for trait, values in PERSONALITY_TRAITS.items()},
+                'required': list(PERSONALITY_TRAITS)
+            }
+        elif field == 'motivations':
+            properties[field] = {
+                'type': 'OBJECT',
+                'properties': {key: {'type': 'INTEGER'} for key in MOTIVATIONS},
+                'required': list(MOTIVATIONS)
+            }
+        else:
+            properties[field] = {'type': 'STRING'}
+    schema = {'type': 'OBJECT', 'properties': properties}
+    if required:
+        schema['required'] = list(fields)
+    return schema
+
+def persona_generation_config(fields=PERSONA_FIELDS, required=True):
+    """generation_config that makes Gemini answer with bare JSON matching the persona schema."""
+    return {'response_mime_type': 'application/json', 'response_schema': response_schema(fields, required)}
+
+def parse_persona_text(text):
+    """Extracts the outermost JSON object from a model answer and returns its fields.
+
+    Markdown fences and prose around the object are ignored. If the object
+    is malformed or truncated, the fields that did parse are still
+    returned, so only the broken ones need to be asked for again.
+    """
+    start = text.find('{')
+    if start < 0:
+        return {}
+    try:
+        data, _ = json.JSONDecoder().raw_decode(text, start)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+    parser = IncrementalObjectParser(strict=False)
+    parser.feed(text[start:])
+    return parser.fields
+
+def _as_string(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    if isinstance(value, str) and value.strip():
+        return value.strip()
+    return None
+
+def _as_list(value):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    return [entry.strip() for entry in value if isinstance(entry, str) and entry.strip()]
+
+def _as_personality(value):
+    if not isinstance(value, dict):
+        return None
+    personality = {}
+    for trait, allowed in PERSONALITY_TRAITS.items():
+        label = value.get(trait)
+        label = label.strip().lower() if isinstance(label, str) else None
+        if label not in allowed:
+            return None
+        personality[trait] = label
+    return personality
+
+def _as_motivations(value):
+    if not isinstance(value, dict):
+        return None
+    motivations = {}
+    for key in MOTIVATIONS:
+        try:
+            score = float(value.get(key))
+        except (TypeError, ValueError):
+            return None
+        if score != score: # NaN
+            return None
+        motivations[key] = min(100, max(0, int(round(score))))
+    return motivations
+
+def coerce_field(field, value):
+    """Returns value converted to the field's schema type, or None when it cannot be."""
+    if field in LIST_FIELDS:
+        return _as_list(value)
+    if field == 'personality':
+        return _as_personality(value)
+    if field == 'motivations':
+        return _as_motivations(value)
+    return _as_string(value)
+
+def validate_persona(data, fields=PERSONA_FIELDS):
+    """Checks data against the persona schema.
+
+    Returns (persona, problems): the valid fields, coerced to their schema
+    types (numeric strings become integer scores clamped to 0-100, a
+    lone string becomes a one-item list, labels are normalized), and the
+    names of the fields that were missing or invalid.
+    """
+    persona = {}
+    problems = []
+    for field in fields:
+        value = coerce_field(field, data.get(field)) if isinstance(data, dict) else None
+        if value is None:
+            problems.append(field)
+        else:
+            persona[field] = value
+    return persona, problems
+
+def default_value(field, username, features=None):
+    """Placeholder for a field the model did not answer; analyze_history features fill what they can."""
+    if field == 'name':
+        return username.capitalize()
+    if features is not None and field in LOCAL_FIELDS:
+        return features[field]
+    if field in LIST_FIELDS:
+        return []
+    if field in ('personality', 'motivations'):
+        return {}
+    return 'Unknown'
+
+def fill_defaults(persona, username, features=None):
+    """Sets a default_value for every persona field that is still missing."""
+    for field in PERSONA_FIELDS:
+        if field not in persona:
+            persona[field] = default_value(field, username, features)
+    return persona
@@ -0,0 +1,200 @@
+import heapq
+import html
+import re
+from itertools import zip_longest
+from src.records import column, fields_of
+
+# Rough average for English text with the Gemini tokenizer; close enough for budgeting
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 24000
+# Single items longer than this are truncated so one wall of text cannot use up the budget
+MAX_ITEM_CHARS = 2000
+RANKINGS = ('score', 'recency', 'diversity')
+
+_QUOTE_LINE = re.compile(r'^\s*(&gt;|>).*$', re.MULTILINE)
+_CODE_FENCE = re.compile(r'```.*?```', re.DOTALL)
+_MARKDOWN_LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+_BARE_URL = re.compile(r'https?://\S+')
+_HEADER = re.compile(r'^\s*#{1,6}\s*', re.MULTILINE)
+_EMPHASIS = re.compile(r'(\*{1,3}|_{2,3}|~~|\^|`)')
+_WHITESPACE = re.compile(r'\s+')
+_SUBREDDIT = re.compile(r'^/r/([^/]+)/')
+# The fields a prompt candidate is built from, read in one call per item
+_COMMENT_FIELDS = fields_of('body', 'score', 'created_utc', 'permalink')
+_POST_FIELDS = fields_of('title', 'selftext', 'score', 'created_utc', 'permalink')
+
+def estimate_tokens(text):
+    """Estimates the number of tokens in a piece of text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def clean_text(text):
+    """Strips quoted replies, code blocks, markdown syntax and links from Reddit text."""
+    if not text:
+        return ""
+    text = _QUOTE_LINE.sub(' ', text)
+    text = _CODE_FENCE.sub(' ', text)
+    text = html.unescape(text)
+    text = _MARKDOWN_LINK.sub(r'\1', text)
+    text = _BARE_URL.sub(' ', text)
+    text = _HEADER.sub('', text)
+    text = _EMPHASIS.sub('', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+def subreddit_from_permalink(permalink):
+    """Returns the subreddit name from a permalink, or an empty string."""
+    match = _SUBREDDIT.match(permalink or '')
+    return match.group(1) if match else ''
+
+def subreddit_of(item):
+    """Returns the subreddit name from an item's permalink, or an empty string."""
+    return subreddit_from_permalink(item.get('permalink'))
+
+def _candidate(kind, item):
+    """Turns a comment or post into a cleaned prompt candidate, or None if nothing is left of it.
+
+    The fields ranking and formatting need are copied into the candidate,
+    so they are read from the item only once.
+    """
+    if kind == 'comments':
+        body, score, created_utc, permalink = _COMMENT_FIELDS(item)
+        text = clean_text(body)
+    else:
+        title, selftext, score, created_utc, permalink = _POST_FIELDS(item)
+        text = clean_text(title)
+        selftext = clean_text(selftext)
+        if selftext:
+            text = f"{text} - {selftext}" if text else selftext
+    if not text:
+        return None
+    return {'type': 'comment' if kind == 'comments' else 'post', 'item': item, 'text': text[:MAX_ITEM_CHARS],
+            'score': score, 'created_utc': created_utc, 'subreddit': subreddit_from_permalink(permalink)}
+
+def _candidates(scraped_data):
+    """Turns comments and posts into cleaned, non-empty prompt candidates."""
+    candidates = []
+    for kind in ('comments', 'posts'):
+        for item in scraped_data[kind]:
+            candidate = _candidate(kind, item)
+            if candidate:
+                candidates.append(candidate)
+    return candidates
+
+def _rank(candidates, ranking):
+    if ranking == 'score':
+        return sorted(candidates, key=lambda c: c['score'], reverse=True)
+    if ranking == 'recency':
+        return sorted(candidates, key=lambda c: c['created_utc'], reverse=True)
+    if ranking == 'diversity':
+        # Round-robin over subreddits, taking each community's best-scored items first
+        by_subreddit = {}
+        for candidate in sorted(candidates, key=lambda c: c['score'], reverse=True):
+            by_subreddit.setdefault(candidate['subreddit'], []).append(candidate)
+        return [c for group in zip_longest(*by_subreddit.values()) for c in group if c is not None]
+    raise ValueError(f"Unknown ranking '{ranking}', expected one of {RANKINGS}")
+
+def _format_line(candidate):
+    prefix = 'C' if candidate['type'] == 'comment' else 'P'
+    subreddit = candidate['subreddit']
+    location = f"r/{subreddit}, " if subreddit else ""
+    return f"[{prefix}] ({location}score {candidate['score']}) {candidate['text']}"
+
+def legacy_content_tokens(scraped_data):
+    """Token estimate for the content section of the original prompt, which listed every item twice."""
+    all_comments = column(scraped_data['comments'], 'body')
+    all_posts = []
+    posts = scraped_data['posts']
+    for title, selftext in zip(column(posts, 'title'), column(posts, 'selftext')):
+        all_posts.append(title)
+        if selftext:
+            all_posts.append(selftext)
+    combined_text = " ".join(all_comments + all_posts)
+    return estimate_tokens(str(all_comments)) + estimate_tokens(str(all_posts)) + estimate_tokens(combined_text)
+
+def build_prompt_content(scraped_data, token_budget=DEFAULT_TOKEN_BUDGET, ranking='score'):
+    """Builds the user-content section of the persona prompt.
+
+    Every comment and post appears at most once, cleaned of quoting and
+    markdown noise. If the content does not fit in token_budget, items are
+    picked in ranking order ('score', 'recency' or 'diversity') until the
+    budget is used up; the chosen items are then listed newest first.
+
+    Returns the content text and a dict of prompt statistics.
+    """
+    candidates = _candidates(scraped_data)
+    selected = []
+    used_tokens = 0
+    for candidate in _rank(candidates, ranking):
+        line = _format_line(candidate)
+        line_tokens = estimate_tokens(line) + 1
+        if used_tokens + line_tokens > token_budget:
+            continue
+        selected.append((candidate, line))
+        used_tokens += line_tokens
+
+    selected.sort(key=lambda pair: pair[0]['created_utc'], reverse=True)
+    content = "\n".join(line for _, line in selected)
+    stats = {
+        'items_total': len(scraped_data['comments']) + len(scraped_data['posts']),
+        'items_included': len(selected),
+        'tokens_before': legacy_content_tokens(scraped_data),
+        'tokens_after': estimate_tokens(content)
+    }
+    return content, stats
+
+def split_into_chunks(scraped_data, chunk_tokens):
+    """Splits a history into newest-first chunks whose prompt content fits chunk_tokens each.
+
+    Each chunk has the same {'comments': [...], 'posts': [...]} shape as the
+    scraper output, so it can be passed straight to build_prompt_content.
+    """
+    candidates = sorted(_candidates(scraped_data), key=lambda c: c['created_utc'], reverse=True)
+    chunks = []
+    current = {'comments': [], 'posts': []}
+    used_tokens = 0
+    for candidate in candidates:
+        line_tokens = estimate_tokens(_format_line(candidate)) + 1
+        if used_tokens + line_tokens > chunk_tokens and used_tokens:
+            chunks.append(current)
+            current = {'comments': [], 'posts': []}
+            used_tokens = 0
+        current['comments' if candidate['type'] == 'comment' else 'posts'].append(candidate['item'])
+        used_tokens += line_tokens
+    if used_tokens:
+        chunks.append(current)
+    return chunks
+
+def select_from_stream(items, token_budget=DEFAULT_TOKEN_BUDGET, ranking='score'):
+    """Keeps only the items a token_budget prompt can use from a stream of (kind, item) pairs.
+
+    items is typically reddit_scraper.iter_redditor_items. A min-heap holds
+    the best items seen so far by score (or by created_utc for 'recency')
+    and the weakest are dropped as soon as the kept text exceeds the
+    budget, so memory is bounded by the budget rather than the history
+    length. For 'diversity' a pool of twice the budget is kept so
+    build_prompt_content can still spread the final pick across
+    subreddits.
+
+    Returns a {'comments': [...], 'posts': [...]} dict of the kept items in
+    stream order, and the number of items seen.
+    """
+    if ranking not in RANKINGS:
+        raise ValueError(f"Unknown ranking '{ranking}', expected one of {RANKINGS}")
+    pool_budget = token_budget * 2 if ranking == 'diversity' else token_budget
+    rank_field = 'created_utc' if ranking == 'recency' else 'score'
+    heap = []
+    used_tokens = 0
+    seen = 0
+    for seen, (kind, item) in enumerate(items, start=1):
+        candidate = _candidate(kind, item)
+        if candidate is None:
+            continue
+        tokens = estimate_tokens(_format_line(candidate)) + 1
+        heapq.heappush(heap, (candidate[rank_field], seen, kind, item, tokens))
+        used_tokens += tokens
+        while used_tokens > pool_budget:
+            used_tokens -= heapq.heappop(heap)[4]
+
+    selected = {'comments': [], 'posts': []}
+    for _, _, kind, item, _ in sorted(heap, key=lambda entry: entry[1]):
+        selected[kind].append(item)
+    return selected, seen
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from src.client_registry import credentials_key
+from src.prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Reddit allows 100 OAuth requests per minute per client id
+REDDIT_REQUESTS_PER_MINUTE = float(os.environ.get('REDDIT_RPM', 100))
+GEMINI_REQUESTS_PER_MINUTE = float(os.environ.get('GEMINI_RPM', 1000))
+GEMINI_TOKENS_PER_MINUTE = float(os.environ.get('GEMINI_TPM', 1000000))
+MAX_RETRIES = 5
+# Buckets kept after the last client using them is gone, so a client rebuilt for the same
+# credentials soon after still sees the quota already spent
+MAX_IDLE_BUCKETS = 256
+
+class TokenBucket:
+    """Thread-safe token bucket that queues callers instead of rejecting them.
+
+    acquire() takes its tokens immediately, letting the balance go negative,
+    and then sleeps until the debt is repaid. Callers are therefore served
+    in arrival order and the long-run rate never exceeds `per_minute`.
+    """
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, per_minute / 60.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount=1):
+        """Takes `amount` tokens and returns how long the caller must wait before using them."""
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def acquire(self, amount=1):
+        """Blocks until `amount` tokens are available and returns the time waited."""
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, amount=1):
+        """Like acquire, but waits on the event loop instead of blocking the thread."""
+        wait = self.reserve(amount)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def consume(self, amount):
+        """Charges tokens without waiting, e.g. to settle an estimate once the real usage is known."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+
+    def limit_to(self, remaining, reset_in):
+        """Caps the balance at what the server reports as left in its current window.
+
+        With nothing left, the bucket is drained so that the next token is
+        only handed out once the window resets.
+        """
+        with self.lock:
+            self._refill(time.monotonic())
+            if remaining < 1:
+                self.tokens = min(self.tokens, 1 - reset_in * self.rate)
+            else:
+                self.tokens = min(self.tokens, remaining)
+
+def backoff_delay(attempt, base=1.0, cap=60.0, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than a server-provided retry-after."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after:
+        delay = max(delay, float(retry_after))
+    return delay
+
+def is_rate_limit_error(exc):
+    """Whether an exception from an API client means "slow down" rather than a real failure."""
+    code = getattr(exc, 'code', None) or getattr(getattr(exc, 'response', None), 'status_code', None)
+    return code in (429, 503) or type(exc).__name__ in ('ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable')
+
+class RateLimitScheduler:
+    """Process-wide registry of token buckets shared by every Reddit and Gemini client.
+
+    A bucket lives as long as a client holds it, and the MAX_IDLE_BUCKETS
+    most recently used ones are kept beyond that. Buckets are named by a
+    digest of the credentials, never the credentials themselves.
+    """
+
+    def __init__(self, reddit_rpm=REDDIT_REQUESTS_PER_MINUTE, gemini_rpm=GEMINI_REQUESTS_PER_MINUTE,
+                 gemini_tpm=GEMINI_TOKENS_PER_MINUTE, max_retries=MAX_RETRIES):
+        self.reddit_rpm = reddit_rpm
+        self.gemini_rpm = gemini_rpm
+        self.gemini_tpm = gemini_tpm
+        self.max_retries = max_retries
+        self.buckets = weakref.WeakValueDictionary()
+        self.recent = OrderedDict()
+        self.lock = threading.Lock()
+
+    def bucket(self, name, per_minute, burst=None):
+        """Returns the bucket called `name`, creating it on first use."""
+        with self.lock:
+            bucket = self.buckets.get(name)
+            if bucket is None:
+                bucket = self.buckets[name] = TokenBucket(per_minute, burst)
+            self.recent[name] = bucket
+            self.recent.move_to_end(name)
+            while len(self.recent) > MAX_IDLE_BUCKETS:
+                self.recent.popitem(last=False)
+            return bucket
+
+    def reddit_bucket(self, client_id):
+        # Reddit's quota is per OAuth client, so clients sharing an id share a bucket
+        return self.bucket(credentials_key('reddit', client_id), self.reddit_rpm)
+
+    def gemini_buckets(self, api_key):
+        return (
+            self.bucket(credentials_key('gemini-requests', api_key), self.gemini_rpm),
+            self.bucket(credentials_key('gemini-tokens', api_key), self.gemini_tpm, burst=self.gemini_tpm / 6)
+        )
+
+class ScheduledModel:
+    """Wraps a Gemini model so every call waits for RPM/TPM quota and retries 429s with backoff."""
+
+    def __init__(self, model, scheduler, api_key):
+        self.model = model
+        self.scheduler = scheduler
+        self.request_bucket, self.token_bucket = scheduler.gemini_buckets(api_key)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def generate_content(self, prompt, **kwargs):
+        estimated_tokens = estimate_tokens(prompt) if isinstance(prompt, str) else 0
+        for attempt in range(self.scheduler.max_retries + 1):
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(estimated_tokens)
+            try:
+                response = self.model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.scheduler.max_retries:
+                    raise
+                delay = backoff_delay(attempt, retry_after=getattr(e, 'retry_after', None))
+                logger.warning(f"Gemini rate limited, retrying in {delay:.1f}s ({e})")
+                time.sleep(delay)
+                continue
+            if kwargs.get('stream'):
+                # Usage is only known once the caller has consumed the stream
+                return response
+            self._settle(response, estimated_tokens)
+            return response
+
+    async def generate_content_async(self, prompt, **kwargs):
+        """Async counterpart of generate_content; waiting for quota never blocks the event loop."""
+        estimated_tokens = estimate_tokens(prompt) if isinstance(prompt, str) else 0
+        for attempt in range(self.scheduler.max_retries + 1):
+            await self.request_bucket.acquire_async()
+            await self.token_bucket.acquire_async(estimated_tokens)
+            try:
+                response = await self.model.generate_content_async(prompt, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt == self.scheduler.max_retries:
+                    raise
+                delay = backoff_delay(attempt, retry_after=getattr(e, 'retry_after', None))
+                logger.warning(f"Gemini rate limited, retrying in {delay:.1f}s ({e})")
+                await asyncio.sleep(delay)
+                continue
+            if not kwargs.get('stream'):
+                self._settle(response, estimated_tokens)
+            return response
+
+    def _settle(self, response, estimated_tokens):
+        usage = getattr(response, 'usage_metadata', None)
+        total_tokens = getattr(usage, 'total_token_count', None)
+        if total_tokens:
+            self.token_bucket.consume(total_tokens - estimated_tokens)
+
+_default_scheduler = RateLimitScheduler()
+
+def get_default_scheduler():
+    """Returns the scheduler shared by all clients in this process."""
+    return _default_scheduler
+
+def configure_default_scheduler(**quotas):
+    """Replaces the shared scheduler, e.g. to match a project's Gemini quota tier."""
+    global _default_scheduler
+    _default_scheduler = RateLimitScheduler(**quotas)
+    return _default_scheduler
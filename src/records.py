@@ -0,0 +1,94 @@
+from collections.abc import Mapping
+from operator import attrgetter, itemgetter
+
+class Record(Mapping):
+    """Base class of the scraped item records.
+
+    A record stores its fields in __slots__ instead of a per-item dict,
+    so a comment costs a fixed-size object rather than a hash table of
+    repeated string keys. It is also a read-only Mapping, so code written
+    for the old item dicts (item['body'], item.get('permalink'),
+    dict(item), json.dumps(dict(item))) keeps working; hot loops should
+    read attributes (item.body) or whole columns (see column).
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+    @classmethod
+    def from_mapping(cls, data):
+        """Builds a record from an item dict (e.g. one loaded from JSON); extra keys are dropped."""
+        return cls(*(data[name] for name in cls.__slots__))
+
+class Comment(Record):
+    __slots__ = ('id', 'body', 'score', 'created_utc', 'permalink')
+
+    def __init__(self, id, body, score, created_utc, permalink):
+        self.id = id
+        self.body = body
+        self.score = score
+        self.created_utc = created_utc
+        self.permalink = permalink
+
+class Post(Record):
+    __slots__ = ('id', 'title', 'selftext', 'score', 'created_utc', 'permalink', 'url')
+
+    def __init__(self, id, title, selftext, score, created_utc, permalink, url):
+        self.id = id
+        self.title = title
+        self.selftext = selftext
+        self.score = score
+        self.created_utc = created_utc
+        self.permalink = permalink
+        self.url = url
+
+RECORD_TYPES = {'comments': Comment, 'posts': Post}
+
+def to_record(kind, item):
+    """Returns item as a Comment or Post record ('comments' or 'posts' kind); records are returned as is."""
+    if isinstance(item, Record):
+        return item
+    return RECORD_TYPES[kind].from_mapping(item)
+
+def column(items, field):
+    """Returns one field of every item as a list, e.g. column(scraped_data['comments'], 'score').
+
+    Records are read with a single C-level attrgetter pass; lists that
+    still hold plain dicts fall back to key lookups.
+    """
+    try:
+        return list(map(attrgetter(field), items))
+    except AttributeError:
+        return [item[field] for item in items]
+
+def fields_of(*names):
+    """Returns a function that reads the named fields of one item in a single call.
+
+    Records are read with attrgetter; plain item dicts fall back to
+    itemgetter. With several names the function returns a tuple, e.g.
+    score, created_utc = fields_of('score', 'created_utc')(item).
+    """
+    by_attribute = attrgetter(*names)
+    by_key = itemgetter(*names)
+
+    def read(item):
+        try:
+            return by_attribute(item)
+        except AttributeError:
+            return by_key(item)
+    return read
@@ -0,0 +1,198 @@
+import gzip
+import http.client
+import json
+import logging
+import threading
+import time
+from base64 import b64encode
+from urllib.parse import quote, urlencode, urlsplit
+from src.rate_limiter import backoff_delay, get_default_scheduler
+from src.records import Comment, Post
+from src.run_log import record_stage
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+OAUTH_URL = 'https://oauth.reddit.com'
+TOKEN_URL = 'https://www.reddit.com/api/v1/access_token'
+PAGE_SIZE = 100
+# Refresh the OAuth token this many seconds before Reddit says it expires
+TOKEN_MARGIN = 60
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+class _ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, shared by every thread using the client."""
+
+    def __init__(self, url, max_idle=8, timeout=30):
+        parsed = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def request(self, method, path, body=None, headers=None):
+        """Sends one request and returns (status, headers, body bytes)."""
+        for attempt in range(2):
+            with self.lock:
+                connection = self.idle.pop() if self.idle else None
+            reused = connection is not None
+            connection = connection or self.connection_class(self.host, self.port, timeout=self.timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers or {})
+                response = connection.getresponse()
+                data = response.read()
+            except _STALE_CONNECTION_ERRORS:
+                connection.close()
+                # The server may close an idle keep-alive connection at any time; retry once on a new one
+                if reused and attempt == 0:
+                    continue
+                raise
+            if response.getheader('Content-Encoding') == 'gzip':
+                data = gzip.decompress(data)
+            if response.will_close:
+                connection.close()
+            else:
+                with self.lock:
+                    if len(self.idle) < self.max_idle:
+                        self.idle.append(connection)
+                        connection = None
+                if connection is not None:
+                    connection.close()
+            return response.status, response.headers, data
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+def _comment(data):
+    return Comment(data['id'], data['body'], data['score'], data['created_utc'], data['permalink'])
+
+def _post(data):
+    return Post(data['id'], data['title'], data['selftext'], data['score'], data['created_utc'], data['permalink'],
+                data['url'])
+
+class _UserListing:
+    """One of a user's listings, with the same new(limit=...) call as PRAW's SubListing."""
+
+    def __init__(self, client, username, path, to_record):
+        self.client = client
+        self.username = username
+        self.path = path
+        self.to_record = to_record
+
+    def new(self, limit=None):
+        return self.client.listing(self.username, self.path, self.to_record, limit)
+
+class _Redditor:
+    def __init__(self, client, username):
+        self.comments = _UserListing(client, username, 'comments', _comment)
+        self.submissions = _UserListing(client, username, 'submitted', _post)
+
+class ListingClient:
+    """Reads user listings straight from Reddit's JSON API, without PRAW.
+
+    PRAW builds a lazy model object for every item, of which the scraper
+    only copies a few attributes. This client requests the same
+    /user/<name>/comments and /submitted listings over pooled keep-alive
+    connections, parses each page with orjson (falling back to json) and
+    builds the Comment/Post records directly from the parsed dicts.
+
+    It is a drop-in for the reddit argument of scrape_redditor_data and
+    iter_redditor_items: reddit.redditor(name).comments.new(limit=...)
+    yields records. Requests draw from the same rate-limit bucket as PRAW
+    clients with this client_id, follow Reddit's rate-limit headers and
+    retry 429s with backoff. Unlike a PRAW instance, one client can be
+    shared by many threads.
+    """
+
+    def __init__(self, client_id, client_secret, user_agent, scheduler=None, oauth_url=OAUTH_URL, token_url=TOKEN_URL):
+        scheduler = scheduler or get_default_scheduler()
+        self.bucket = scheduler.reddit_bucket(client_id)
+        self.max_retries = scheduler.max_retries
+        self.user_agent = user_agent
+        self.credentials = b64encode(f"{client_id}:{client_secret}".encode('utf-8')).decode('ascii')
+        self.api = _ConnectionPool(oauth_url)
+        self.token_pool = _ConnectionPool(token_url, max_idle=1)
+        self.token_path = urlsplit(token_url).path
+        self.token = None
+        self.token_expires = 0.0
+        self.token_lock = threading.Lock()
+
+    def _access_token(self, refresh=False):
+        """Returns an application-only OAuth token, fetching a new one when it is missing or about to expire."""
+        with self.token_lock:
+            if refresh or self.token is None or time.monotonic() >= self.token_expires:
+                status, _, data = self.token_pool.request('POST', self.token_path, body=b'grant_type=client_credentials', headers={
+                    'Authorization': f"Basic {self.credentials}",
+                    'User-Agent': self.user_agent,
+                    'Content-Type': 'application/x-www-form-urlencoded'
+                })
+                if status != 200:
+                    raise Exception(f"Reddit OAuth token request failed with HTTP {status}")
+                payload = _loads(data)
+                self.token = payload['access_token']
+                self.token_expires = time.monotonic() + payload.get('expires_in', 3600) - TOKEN_MARGIN
+            return self.token
+
+    def get_json(self, path):
+        """GETs an API path and returns the parsed JSON body, with rate limiting and retries."""
+        refreshed = False
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            start = time.perf_counter()
+            status, headers, data = self.api.request('GET', path, headers={
+                'Authorization': f"bearer {self._access_token()}",
+                'User-Agent': self.user_agent,
+                'Accept-Encoding': 'gzip'
+            })
+            record_stage('reddit_request', time.perf_counter() - start, bytes=len(data), status=status, direct=True)
+            remaining = headers.get('x-ratelimit-remaining')
+            reset = headers.get('x-ratelimit-reset')
+            if remaining is not None and reset is not None:
+                self.bucket.limit_to(float(remaining), float(reset))
+            if status == 200:
+                return _loads(data)
+            if status == 401 and not refreshed:
+                # Token revoked or expired early
+                self._access_token(refresh=True)
+                refreshed = True
+                continue
+            if status != 429 or attempt == self.max_retries:
+                raise Exception(f"Reddit request failed with HTTP {status} for {path}")
+            delay = backoff_delay(attempt, retry_after=headers.get('retry-after'))
+            logger.warning(f"Reddit rate limited, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def listing(self, username, path, to_record, limit=None):
+        """Yields records from a newest-first user listing, one page request at a time."""
+        fetched = 0
+        after = None
+        while limit is None or fetched < limit:
+            params = {'sort': 'new', 'raw_json': 1, 'limit': PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - fetched)}
+            if after:
+                params['after'] = after
+            data = self.get_json(f"/user/{quote(username)}/{path}?{urlencode(params)}")['data']
+            children = data['children']
+            for child in children:
+                yield to_record(child['data'])
+            fetched += len(children)
+            after = data.get('after')
+            if not after or not children:
+                return
+
+    def redditor(self, username):
+        return _Redditor(self, username)
+
+    def close(self):
+        self.api.close()
+        self.token_pool.close()
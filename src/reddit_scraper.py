@@ -1,12 +1,66 @@
+import logging
 import praw
+import prawcore
+import queue
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from src.client_registry import credentials_key, thread_registry
+from src.rate_limiter import backoff_delay, get_default_scheduler
+from src.records import Comment, Post, column
+from src.run_log import in_current_context, record_stage, stage
 
-def initialize_reddit(client_id, client_secret, user_agent):
-    """Initializes and returns a Reddit instance using PRAW."""
+logger = logging.getLogger(__name__)
+
+# Marks the end of a listing in iter_redditor_items' queue
+_END = object()
+
+class ScheduledRequestor(prawcore.Requestor):
+    """PRAW requestor that draws every HTTP request from a shared rate-limit bucket.
+
+    The bucket is kept in line with Reddit's X-Ratelimit-Remaining and
+    X-Ratelimit-Reset headers, and 429 responses are retried with jittered
+    backoff instead of surfacing as errors.
+    """
+
+    def __init__(self, *args, bucket=None, max_retries=5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bucket = bucket
+        self.max_retries = max_retries
+
+    def request(self, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            start = time.perf_counter()
+            response = super().request(*args, **kwargs)
+            record_stage('reddit_request', time.perf_counter() - start, bytes=len(response.content),
+                         status=response.status_code)
+            remaining = response.headers.get('x-ratelimit-remaining')
+            reset = response.headers.get('x-ratelimit-reset')
+            if remaining is not None and reset is not None:
+                self.bucket.limit_to(float(remaining), float(reset))
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            delay = backoff_delay(attempt, retry_after=response.headers.get('retry-after'))
+            logger.warning(f"Reddit rate limited, retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+def initialize_reddit(client_id, client_secret, user_agent, scheduler=None, **praw_options):
+    """Initializes and returns a Reddit instance using PRAW.
+
+    Requests go through the process-wide rate-limit scheduler (or the one
+    given), so several clients with the same credentials share one quota.
+    praw_options are further praw.Reddit settings, e.g. oauth_url.
+    """
+    scheduler = scheduler or get_default_scheduler()
     reddit = praw.Reddit(
         client_id=client_id,
         client_secret=client_secret,
-        user_agent=user_agent
+        user_agent=user_agent,
+        requestor_class=ScheduledRequestor,
+        requestor_kwargs={'bucket': scheduler.reddit_bucket(client_id), 'max_retries': scheduler.max_retries},
+        **praw_options
     )
     return reddit
 
@@ -17,36 +71,187 @@ def extract_username_from_url(url):
         return match.group(1)
     return None
 
-def scrape_redditor_data(reddit, username, limit=None):
-    """Scrapes comments and posts from a given Redditor."""
-    redditor = reddit.redditor(username)
-    scraped_data = {
-        'comments': [],
-        'posts': []
+def comment_record(comment):
+    """Copies the fields the persona pipeline needs out of a PRAW comment."""
+    if isinstance(comment, Comment):
+        # Already a record, e.g. from src.reddit_listings.ListingClient
+        return comment
+    return Comment(comment.id, comment.body, comment.score, comment.created_utc, comment.permalink)
+
+def submission_record(submission):
+    """Copies the fields the persona pipeline needs out of a PRAW submission."""
+    if isinstance(submission, Post):
+        return submission
+    return Post(submission.id, submission.title, submission.selftext, submission.score, submission.created_utc,
+                submission.permalink, submission.url)
+
+def scrape_counts(scraped_data):
+    """Item counts and the UTF-8 size of the scraped text, for stage events."""
+    comments = scraped_data['comments']
+    posts = scraped_data['posts']
+    text_bytes = sum(len(body.encode('utf-8')) for body in column(comments, 'body'))
+    text_bytes += sum(len(title.encode('utf-8')) + len(selftext.encode('utf-8'))
+                      for title, selftext in zip(column(posts, 'title'), column(posts, 'selftext')))
+    return {
+        'comments': len(comments),
+        'posts': len(posts),
+        'items': len(comments) + len(posts),
+        'text_bytes': text_bytes
     }
 
-    # Scrape comments
-    for comment in redditor.comments.new(limit=limit):
-        scraped_data['comments'].append({
-            'id': comment.id,
-            'body': comment.body,
-            'score': comment.score,
-            'created_utc': comment.created_utc,
-            'permalink': comment.permalink
-        })
-
-    # Scrape posts
-    for submission in redditor.submissions.new(limit=limit):
-        scraped_data['posts'].append({
-            'id': submission.id,
-            'title': submission.title,
-            'selftext': submission.selftext,
-            'score': submission.score,
-            'created_utc': submission.created_utc,
-            'permalink': submission.permalink,
-            'url': submission.url
-        })
-    return scraped_data
+def _parallel_clients(reddit):
+    """Two clients with reddit's credentials for paging the comment and submission listings on two threads.
+
+    A PRAW instance must not be used by two threads at once (prawcore's
+    session, token refresh and rate limiter take no locks), so the second
+    listing gets a spare instance that belongs to the calling thread and is
+    reused by its later scrapes, which keeps its OAuth token. Spares live in
+    the thread's client registry, so src.clients' invalidation drops them
+    with the other PRAW instances. Other clients, like ListingClient, are
+    safe to share and are used for both.
+    """
+    if not isinstance(reddit, praw.Reddit):
+        return reddit, reddit
+    config = reddit.config
+    credentials = (config.client_id, config.client_secret, config.user_agent)
+    spare = thread_registry().get(
+        credentials_key('reddit-spare', *credentials),
+        lambda: initialize_reddit(*credentials, oauth_url=config.oauth_url, reddit_url=config.reddit_url)
+    )
+    return reddit, spare
+
+def _take_new(listing, limit, seen_ids=None, since_utc=None):
+    """Yields items from a newest-first listing until an already-known item is reached.
+
+    Stopping early leaves the PRAW generator unexhausted, so no further
+    pages are requested once the known part of the history begins.
+    """
+    for item in listing.new(limit=limit):
+        if seen_ids and item.id in seen_ids:
+            return
+        # Items from the same second as since_utc may still be new; seen_ids tells them apart
+        if since_utc is not None and item.created_utc < since_utc:
+            return
+        yield item
+
+def _scrape_comments(redditor, limit, seen_ids=None, since_utc=None):
+    return [comment_record(comment) for comment in _take_new(redditor.comments, limit, seen_ids, since_utc)]
+
+def _scrape_posts(redditor, limit, seen_ids=None, since_utc=None):
+    return [submission_record(submission) for submission in _take_new(redditor.submissions, limit, seen_ids, since_utc)]
+
+def scrape_redditor_data(reddit, username, limit=None, concurrent=False, max_workers=2, seen_ids=None, since_utc=None):
+    """Scrapes comments and posts from a given Redditor.
+
+    Items are returned as Comment and Post records (see src.records),
+    which can also be read like the item dicts used elsewhere.
+
+    With concurrent=True the comment and submission listings are paged in
+    parallel on a thread pool of at most max_workers threads, so the total
+    time is the slower of the two listings rather than their sum. Each
+    listing keeps a single page request in flight, which bounds the number
+    of concurrent requests against the Reddit API to max_workers.
+
+    seen_ids and since_utc are optional dicts keyed by 'comments' and
+    'posts'. When given, each listing stops paginating at the first item
+    whose id is already known or that is older than the timestamp, so only
+    new activity (and, without seen_ids, whatever else shares the
+    timestamp's second) is returned.
+
+    The scrape is logged as a 'scrape' stage with item counts and text
+    size, and each HTTP page as a 'reddit_request' stage (see src.run_log).
+    """
+    comments_client, posts_client = _parallel_clients(reddit) if concurrent else (reddit, reddit)
+    seen_ids = seen_ids or {}
+    since_utc = since_utc or {}
+    comment_args = (comments_client.redditor(username), limit, seen_ids.get('comments'), since_utc.get('comments'))
+    post_args = (posts_client.redditor(username), limit, seen_ids.get('posts'), since_utc.get('posts'))
+
+    with stage('scrape', concurrent=concurrent) as fields:
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, 2))) as executor:
+                comments_future = executor.submit(in_current_context(_scrape_comments), *comment_args)
+                posts_future = executor.submit(in_current_context(_scrape_posts), *post_args)
+                data = {
+                    'comments': comments_future.result(),
+                    'posts': posts_future.result()
+                }
+        else:
+            data = {
+                'comments': _scrape_comments(*comment_args),
+                'posts': _scrape_posts(*post_args)
+            }
+        fields.update(scrape_counts(data))
+    return data
+
+def _put(items, record, stop):
+    """Puts record into the bounded queue, waiting for room until the consumer stops; returns whether it was put."""
+    while not stop.is_set():
+        try:
+            items.put(record, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _produce(kind, listing, to_record, limit, items, stop):
+    """Pages one listing into a bounded queue until it is exhausted or the consumer stops.
+
+    The end marker and errors wait for room the same way items do, so a
+    consumer that stops with the queue full never leaves the thread blocked.
+    """
+    try:
+        for item in listing.new(limit=limit):
+            if not _put(items, (kind, to_record(item)), stop):
+                return
+        _put(items, (kind, _END), stop)
+    except Exception as e:
+        _put(items, (kind, e), stop)
+
+def iter_redditor_items(reddit, username, limit=None, concurrent=False, buffer_size=200):
+    """Yields ('comments', comment) and ('posts', post) pairs as listing pages arrive.
+
+    Items are the same records scrape_redditor_data returns, but nothing is
+    accumulated here: consumers keep only what they need, so memory stays
+    flat however long the history is. Each listing is yielded newest first.
+
+    With concurrent=True both listings are paged on background threads
+    that feed a queue of at most buffer_size items, so a slow consumer
+    pauses pagination instead of letting pages pile up. Closing the
+    generator early stops both threads.
+    """
+    comments_client, posts_client = _parallel_clients(reddit) if concurrent else (reddit, reddit)
+    sources = (
+        ('comments', comments_client.redditor(username).comments, comment_record),
+        ('posts', posts_client.redditor(username).submissions, submission_record)
+    )
+
+    if not concurrent:
+        for kind, listing, to_record in sources:
+            for item in listing.new(limit=limit):
+                yield kind, to_record(item)
+        return
+
+    items = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+    producers = [
+        threading.Thread(target=in_current_context(_produce), args=(kind, listing, to_record, limit, items, stop), daemon=True)
+        for kind, listing, to_record in sources
+    ]
+    for producer in producers:
+        producer.start()
+    try:
+        remaining = len(producers)
+        while remaining:
+            kind, record = items.get()
+            if record is _END:
+                remaining -= 1
+            elif isinstance(record, Exception):
+                raise record
+            else:
+                yield kind, record
+    finally:
+        stop.set()
 
 if __name__ == '__main__':
     # This is for testing purposes. Replace with your actual credentials.
@@ -0,0 +1,179 @@
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+REPORT_FORMATS = ('txt', 'markdown', 'json')
+FILE_EXTENSIONS = {'txt': 'txt', 'markdown': 'md', 'json': 'json'}
+MIME_TYPES = {'txt': 'text/plain', 'markdown': 'text/markdown', 'json': 'application/json'}
+REPORT_PREFIX = 'enhanced_persona_'
+# Reports kept in an output directory before the oldest are deleted
+DEFAULT_KEEP = 50
+
+def report_filename(username, fmt='txt', generated_at=None):
+    generated_at = generated_at or datetime.now()
+    return f"{REPORT_PREFIX}{username}_{generated_at.strftime('%Y%m%d_%H%M%S')}.{FILE_EXTENSIONS[fmt]}"
+
+def _write_text(f, persona, generated_at):
+    f.write("=" * 80 + "\n")
+    f.write("REDDIT USER PERSONA REPORT\n")
+    f.write("=" * 80 + "\n\n")
+
+    f.write(f"USERNAME: {persona['name']}\n")
+    f.write(f"GENERATED ON: {generated_at.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+
+    # Basic Information
+    f.write("BASIC INFORMATION\n")
+    f.write("-" * 40 + "\n")
+    f.write(f"Age: {persona['age']}\n")
+    f.write(f"Occupation: {persona['occupation']}\n")
+    f.write(f"Status: {persona['status']}\n")
+    f.write(f"Location: {persona['location']}\n")
+    f.write(f"Tier: {persona['tier']}\n")
+    f.write(f"Archetype: {persona['archetype']}\n\n")
+
+    # Personality
+    f.write("PERSONALITY\n")
+    f.write("-" * 40 + "\n")
+    for trait, value in persona['personality'].items():
+        f.write(f"{trait.replace('_', ' ').title()}: {value.title()}\n")
+    f.write("\n")
+
+    # Motivations
+    f.write("MOTIVATIONS\n")
+    f.write("-" * 40 + "\n")
+    for motivation, score in persona['motivations'].items():
+        f.write(f"{motivation.replace('_', ' ').title()}: {score}/100\n")
+    f.write("\n")
+
+    # Behavior & Habits
+    f.write("BEHAVIOR & HABITS\n")
+    f.write("-" * 40 + "\n")
+    for behavior in persona['behaviors_habits']:
+        f.write(f"• {behavior}\n")
+    f.write("\n")
+
+    # Goals & Needs
+    f.write("GOALS & NEEDS\n")
+    f.write("-" * 40 + "\n")
+    for goal in persona['goals_needs']:
+        f.write(f"• {goal}\n")
+    f.write("\n")
+
+    # Frustrations
+    f.write("FRUSTRATIONS\n")
+    f.write("-" * 40 + "\n")
+    for frustration in persona['frustrations']:
+        f.write(f"• {frustration}\n")
+    f.write("\n")
+
+    # Common Topics
+    f.write("COMMON TOPICS\n")
+    f.write("-" * 40 + "\n")
+    f.write(f"{', '.join(persona['common_topics'])}\n\n")
+
+    # Quote
+    f.write("REPRESENTATIVE QUOTE\n")
+    f.write("-" * 40 + "\n")
+    f.write(f'"{persona["quote"]}"\n\n')
+
+    # Citations
+    f.write("CITATIONS & SOURCES\n")
+    f.write("-" * 40 + "\n")
+    for citation in persona['citations']:
+        f.write(f"[{citation['id']}] ({citation['type'].upper()}) Score: {citation['score']}\n")
+        if citation.get('statement'):
+            f.write(f"Supports: {citation['statement']}\n")
+        f.write(f"Content: {citation['content'][:150]}...\n")
+        f.write(f"Source: {citation['permalink']}\n\n")
+
+def _write_markdown(f, persona, generated_at):
+    f.write(f"# Reddit User Persona: {persona['name']}\n\n")
+    f.write(f"_Generated on {generated_at.strftime('%Y-%m-%d %H:%M:%S')}_\n\n")
+
+    f.write("## Basic Information\n\n")
+    for label, field in (('Age', 'age'), ('Occupation', 'occupation'), ('Status', 'status'),
+                         ('Location', 'location'), ('Tier', 'tier'), ('Archetype', 'archetype')):
+        f.write(f"- **{label}:** {persona[field]}\n")
+    f.write("\n")
+
+    if persona['personality']:
+        f.write("## Personality\n\n")
+        for trait, value in persona['personality'].items():
+            f.write(f"- **{trait.replace('_', ' ').title()}:** {value.title()}\n")
+        f.write("\n")
+
+    if persona['motivations']:
+        f.write("## Motivations\n\n| Motivation | Score |\n| --- | --- |\n")
+        for motivation, score in persona['motivations'].items():
+            f.write(f"| {motivation.replace('_', ' ').title()} | {score}/100 |\n")
+        f.write("\n")
+
+    for title, field in (('Behavior & Habits', 'behaviors_habits'), ('Goals & Needs', 'goals_needs'),
+                         ('Frustrations', 'frustrations')):
+        if persona[field]:
+            f.write(f"## {title}\n\n")
+            for entry in persona[field]:
+                f.write(f"- {entry}\n")
+            f.write("\n")
+
+    f.write(f"## Common Topics\n\n{', '.join(persona['common_topics'])}\n\n")
+    f.write(f"**Sentiment:** {persona.get('sentiment', 'Unknown')}\n\n")
+    if persona['quote']:
+        f.write(f"## Representative Quote\n\n> {persona['quote']}\n\n")
+
+    f.write("## Citations & Sources\n\n")
+    for citation in persona['citations']:
+        f.write(f"{citation['id']}. [{citation['type'].title()} (score {citation['score']})]({citation['permalink']})")
+        if citation.get('statement'):
+            f.write(f" supports _{citation['statement']}_")
+        f.write(f"\n   > {citation['content'][:150]}...\n")
+
+def _write_json(f, persona, username, generated_at):
+    # One line per report, so a stream of reports is valid JSON Lines
+    document = {'username': username, 'generated_at': generated_at.isoformat(timespec='seconds'), 'persona': persona}
+    f.write(json.dumps(document, ensure_ascii=False) + "\n")
+
+def write_report(stream, persona, username, fmt='txt', generated_at=None):
+    """Writes a persona report to any text stream (a file, sys.stdout, a StringIO...)."""
+    generated_at = generated_at or datetime.now()
+    if fmt == 'txt':
+        _write_text(stream, persona, generated_at)
+    elif fmt == 'markdown':
+        _write_markdown(stream, persona, generated_at)
+    elif fmt == 'json':
+        _write_json(stream, persona, username, generated_at)
+    else:
+        raise ValueError(f"Unknown report format: {fmt} (expected one of {', '.join(REPORT_FORMATS)})")
+
+def render_report(persona, username, fmt='txt', generated_at=None):
+    """Returns a persona report as a string, built in memory."""
+    buffer = io.StringIO()
+    write_report(buffer, persona, username, fmt, generated_at)
+    return buffer.getvalue()
+
+def prune_reports(output_dir, keep=DEFAULT_KEEP, max_age=None):
+    """Deletes the oldest reports in output_dir beyond `keep`, and any older than max_age seconds."""
+    entries = []
+    with os.scandir(output_dir) as it:
+        for entry in it:
+            if entry.is_file() and entry.name.startswith(REPORT_PREFIX):
+                entries.append((entry.stat().st_mtime, entry.path))
+    entries.sort(reverse=True)
+    now = time.time()
+    for index, (mtime, path) in enumerate(entries):
+        if index >= keep or (max_age is not None and now - mtime > max_age):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+def save_report(report, filename, output_dir, keep=DEFAULT_KEEP, max_age=None):
+    """Writes an already rendered report into output_dir, then applies the retention policy."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, filename)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(report)
+    prune_reports(output_dir, keep=keep, max_age=max_age)
+    return path
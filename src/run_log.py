@@ -0,0 +1,128 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from src.metrics import COUNTED_FIELDS, observe_stage
+
+# Every module logs through a child of this logger (logging.getLogger(__name__) under src/)
+LOGGER_NAME = 'src'
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+_current_run = contextvars.ContextVar('run_log', default=None)
+_install_lock = threading.Lock()
+_installed = False
+logger = logging.getLogger(__name__)
+
+class RunLog:
+    """Log lines and stage timings captured for a single run, e.g. one Streamlit request."""
+
+    def __init__(self):
+        self.lines = []
+        self.events = []
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def add(self, line, event=None):
+        with self.lock:
+            self.lines.append(line)
+            if event is not None:
+                self.events.append(event)
+
+    def text(self):
+        with self.lock:
+            return "\n".join(self.lines)
+
+    def timings(self):
+        """Per-stage totals in the order the stages first finished.
+
+        Maps each stage name to {'calls', 'seconds'} plus the sums of its
+        counted fields (items, bytes, tokens, ...).
+        """
+        totals = {}
+        with self.lock:
+            for event in self.events:
+                total = totals.setdefault(event['stage'], {'calls': 0, 'seconds': 0.0})
+                total['calls'] += 1
+                total['seconds'] += event['seconds']
+                for field in COUNTED_FIELDS:
+                    if field in event:
+                        total[field] = total.get(field, 0) + event[field]
+        return totals
+
+class _RunLogHandler(logging.Handler):
+    """Routes each record to the RunLog of the context that emitted it, if any."""
+
+    def emit(self, record):
+        run_log = _current_run.get()
+        if run_log is None:
+            return
+        try:
+            run_log.add(self.format(record), getattr(record, 'event', None))
+        except Exception:
+            self.handleError(record)
+
+def install():
+    """Attaches the capture handler to the package logger once per process."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        handler = _RunLogHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        package_logger = logging.getLogger(LOGGER_NAME)
+        package_logger.addHandler(handler)
+        if package_logger.level == logging.NOTSET:
+            package_logger.setLevel(logging.INFO)
+        _installed = True
+
+@contextmanager
+def capture_run():
+    """Captures the log records of this thread or task (and the workers it starts) into a new RunLog.
+
+    Capture is keyed on a context variable rather than on sys.stdout, so
+    concurrent runs in other threads (other Streamlit sessions, batch
+    workers) keep their own logs.
+    """
+    install()
+    run_log = RunLog()
+    token = _current_run.set(run_log)
+    try:
+        yield run_log
+    finally:
+        _current_run.reset(token)
+
+def record_stage(name, seconds, **fields):
+    """Logs a structured {'stage', 'seconds', ...} timing event for a finished pipeline stage.
+
+    The event also feeds the process-wide metrics (see src.metrics).
+    """
+    event = dict(fields, stage=name, seconds=round(seconds, 4))
+    observe_stage(name, seconds, fields)
+    logger.info(f"stage {name} took {seconds * 1000:.0f} ms", extra={'event': event})
+
+@contextmanager
+def stage(name, **fields):
+    """Times the enclosed block as a pipeline stage, see record_stage.
+
+    Yields the event's fields so the block can add counts it only learns
+    while running, e.g. `with stage('llm') as fields: ...; fields['prompt_tokens'] = n`.
+    """
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        record_stage(name, time.perf_counter() - start, **fields)
+
+def in_current_context(fn):
+    """Wraps fn so it runs in (a copy of) the caller's context when called from a worker thread.
+
+    Threads start with an empty context, so without this the logs of
+    pool workers would not reach the RunLog of the run that started them.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
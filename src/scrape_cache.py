@@ -0,0 +1,144 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from src.reddit_scraper import scrape_redditor_data
+from src.records import to_record
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'scraped_histories.sqlite3')
+
+# Stored as the scrape limit of histories fetched with limit=None
+_UNLIMITED = -1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    scrape_limit INTEGER,
+    refreshed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    username TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (username, kind, id)
+);
+CREATE INDEX IF NOT EXISTS items_by_time ON items (username, kind, created_utc DESC);
+"""
+
+class ScrapeCache:
+    """SQLite store of scraped Reddit histories, keyed by username.
+
+    Items are stored as JSON objects and loaded back as the same
+    Comment/Post records produced by scrape_redditor_data. A new connection is opened per call so the
+    cache can be shared between Streamlit sessions running in threads.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_user(self, username):
+        """Returns (scrape_limit, refreshed_at) for a cached user, or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT scrape_limit, refreshed_at FROM users WHERE username = ?",
+                (username.lower(),)
+            ).fetchone()
+        return row
+
+    def load(self, username, limit=None):
+        """Returns the cached history, newest first, with at most `limit` items per kind."""
+        scraped_data = {'comments': [], 'posts': []}
+        with closing(self._connect()) as conn, conn:
+            for kind in scraped_data:
+                query = "SELECT data FROM items WHERE username = ? AND kind = ? ORDER BY created_utc DESC"
+                params = [username.lower(), kind]
+                if limit is not None:
+                    query += " LIMIT ?"
+                    params.append(limit)
+                scraped_data[kind] = [to_record(kind, json.loads(row[0])) for row in conn.execute(query, params)]
+        return scraped_data
+
+    def newest(self, username):
+        """Returns the ids and newest created_utc per kind, for incremental refreshes."""
+        seen_ids = {}
+        since_utc = {}
+        with closing(self._connect()) as conn, conn:
+            for kind in ('comments', 'posts'):
+                rows = conn.execute(
+                    "SELECT id, created_utc FROM items WHERE username = ? AND kind = ?",
+                    (username.lower(), kind)
+                ).fetchall()
+                seen_ids[kind] = {row[0] for row in rows}
+                since_utc[kind] = max((row[1] for row in rows), default=None)
+        return seen_ids, since_utc
+
+    def merge(self, username, scraped_data, scrape_limit=None):
+        """Inserts or updates scraped items and records the refresh time.
+
+        scrape_limit is only recorded for full scrapes; incremental merges
+        pass None and keep the previously recorded value.
+        """
+        with closing(self._connect()) as conn, conn:
+            for kind in ('comments', 'posts'):
+                conn.executemany(
+                    "INSERT OR REPLACE INTO items (username, kind, id, created_utc, data) VALUES (?, ?, ?, ?, ?)",
+                    [(username.lower(), kind, item['id'], item['created_utc'], json.dumps(dict(item)))
+                     for item in scraped_data[kind]]
+                )
+            conn.execute(
+                "INSERT INTO users (username, scrape_limit, refreshed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET "
+                "scrape_limit = COALESCE(excluded.scrape_limit, users.scrape_limit), "
+                "refreshed_at = excluded.refreshed_at",
+                (username.lower(), scrape_limit, time.time())
+            )
+
+    def invalidate(self, username):
+        """Drops everything cached for a user."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM items WHERE username = ?", (username.lower(),))
+            conn.execute("DELETE FROM users WHERE username = ?", (username.lower(),))
+
+def _covers(cached_limit, limit):
+    """Whether a history scraped with cached_limit already reaches back far enough for limit."""
+    if cached_limit == _UNLIMITED:
+        return True
+    return limit is not None and limit <= cached_limit
+
+def scrape_redditor_data_cached(reddit, username, limit=None, cache=None, max_age=None, **scrape_kwargs):
+    """Returns a user's history from the cache, fetching only activity newer than what is stored.
+
+    The first call for a user performs a full scrape. Later calls page the
+    listings newest-first and stop at the first already-cached item, which
+    usually costs a single page request per listing. If the history was
+    refreshed less than max_age seconds ago no request is made at all. A
+    request for a larger limit than was originally scraped triggers a
+    full scrape so older items are backfilled.
+    """
+    cache = cache or ScrapeCache()
+    user = cache.get_user(username)
+
+    if user is None or not _covers(user[0], limit):
+        scraped_data = scrape_redditor_data(reddit, username, limit=limit, **scrape_kwargs)
+        cache.merge(username, scraped_data, scrape_limit=limit if limit is not None else _UNLIMITED)
+        return cache.load(username, limit=limit)
+
+    if max_age is None or time.time() - user[1] > max_age:
+        seen_ids, since_utc = cache.newest(username)
+        new_data = scrape_redditor_data(
+            reddit, username, limit=limit, seen_ids=seen_ids, since_utc=since_utc, **scrape_kwargs
+        )
+        cache.merge(username, new_data)
+
+    return cache.load(username, limit=limit)
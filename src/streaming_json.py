@@ -0,0 +1,105 @@
+import json
+
+class IncrementalObjectParser:
+    """Parses a streamed JSON object and reports each top-level field as soon as its value closes.
+
+    Text before the opening brace (such as a ```json fence) is ignored.
+    Each character is scanned once, so feeding the whole response costs
+    O(n) however it is split into chunks.
+
+        parser = IncrementalObjectParser()
+        for chunk in stream:
+            for key, value in parser.feed(chunk.text):
+                ...
+
+    With strict=False a field whose value is not valid JSON is skipped and
+    its raw text kept in .invalid instead of failing the whole object.
+    """
+
+    def __init__(self, strict=True):
+        self.strict = strict
+        self.invalid = {}
+        self.buffer = ''
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.key = None
+        self.field_start = 0
+        self.value_start = None
+        self.fields = {}
+
+    def feed(self, text):
+        """Consumes more text and returns the (key, value) pairs completed by it."""
+        self.buffer += text
+        completed = []
+        while self.pos < len(self.buffer) and not self.finished:
+            char = self.buffer[self.pos]
+            if not self.started:
+                if char == '{':
+                    self.started = True
+                    self.depth = 1
+                    self._reset_field(self.pos + 1)
+                self.pos += 1
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                self.pos += 1
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+
+            if self.depth == 1 and char == ':' and self.key is None:
+                raw_key = self.buffer[self.field_start:self.pos].strip()
+                try:
+                    self.key = json.loads(raw_key)
+                except ValueError:
+                    if self.strict:
+                        raise
+                    # e.g. an unquoted or single-quoted key
+                    self.key = raw_key.strip('\'"')
+                self.value_start = self.pos + 1
+            elif (self.depth == 1 and char == ',') or self.depth == 0:
+                if self.key is not None:
+                    raw = self.buffer[self.value_start:self.pos]
+                    try:
+                        value = json.loads(raw)
+                    except ValueError:
+                        if self.strict:
+                            raise
+                        self.invalid[self.key] = raw.strip()
+                    else:
+                        self.fields[self.key] = value
+                        completed.append((self.key, value))
+                self._reset_field(self.pos + 1)
+                if self.depth == 0:
+                    self.finished = True
+            self.pos += 1
+
+        # Drop text that belongs to already-completed fields so the buffer stays small
+        cut = self.field_start if self.started else self.pos
+        if cut > 0:
+            self.buffer = self.buffer[cut:]
+            self.pos -= cut
+            self.field_start -= cut
+            if self.value_start is not None:
+                self.value_start -= cut
+        return completed
+
+    def _reset_field(self, start):
+        self.key = None
+        self.field_start = start
+        self.value_start = None